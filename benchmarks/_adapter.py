@@ -0,0 +1,92 @@
+"""Helpers running the fake debug adapter of `dap.fake` for the benchmarks.
+
+It answers every request with a successful response right away, so the measured
+latency is the overhead of the client and its I/O loop only.
+"""
+
+import asyncio
+import multiprocessing
+import socket
+import threading
+
+from dap.fake import FakeAdapter, serve
+
+_tasks = set()
+
+
+async def serve_unix(path: str) -> asyncio.Server:
+    """Start the adapter on a Unix domain socket on the running loop."""
+
+    return await serve(path=path)
+
+
+async def serve_socket(sock: socket.socket) -> None:
+    """Serve a single already connected socket on the running loop."""
+
+    adapter = FakeAdapter()
+    reader, writer = await asyncio.open_connection(sock=sock)
+
+    async def serve_connection():
+        try:
+            while data := await reader.read(65536):
+                adapter.feed(data)
+                while data := adapter.send():
+                    writer.write(data)
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()
+
+    task = asyncio.create_task(serve_connection())
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+
+def run_in_thread(coroutine_function, *args):
+    """Run `coroutine_function(*args)` on a new loop in a daemon thread.
+
+    The loop keeps running afterwards; the coroutine's result is returned."""
+
+    started = threading.Event()
+    results = []
+
+    async def main():
+        results.append(await coroutine_function(*args))
+        started.set()
+        await asyncio.Event().wait()
+
+    threading.Thread(target=asyncio.run, args=(main(),), daemon=True).start()
+    started.wait()
+    return results[0]
+
+
+def serve_in_thread(host: str = "127.0.0.1", port: int = 0) -> int:
+    """Run the adapter on its own loop in a daemon thread and return its port."""
+
+    server = run_in_thread(serve, host, port)
+    return server.sockets[0].getsockname()[1]
+
+
+def _serve_forever(host: str, port: int, path, adapter_factory, ports) -> None:
+    async def main():
+        server = await serve(host, port, path, adapter_factory)
+        ports.put(path or server.sockets[0].getsockname()[1])
+        await server.serve_forever()
+
+    asyncio.run(main())
+
+
+def serve_in_process(
+    host: str = "127.0.0.1", port: int = 0, path=None, adapter_factory=FakeAdapter
+):
+    """Run the adapter in a daemon process, so it does not compete for the GIL.
+
+    Returns its port, or the path of its Unix domain socket if one is given."""
+
+    ports = multiprocessing.Queue()
+    multiprocessing.Process(
+        target=_serve_forever,
+        args=(host, port, path, adapter_factory, ports),
+        daemon=True,
+    ).start()
+    return ports.get()
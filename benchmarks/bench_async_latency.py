@@ -0,0 +1,86 @@
+"""Request round-trip latency through `AsyncServer` against a local stand-in adapter.
+
+Compares the event-driven loop with the previous polling loop, which slept 100 ms
+after every `run_single`.
+
+    python benchmarks/bench_async_latency.py --iterations 2000
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from _adapter import serve
+
+from dap import AsyncServer
+
+
+class BenchServer(AsyncServer):
+    def handle_message(self, message):
+        pass
+
+
+class PollingServer(BenchServer):
+    """The loop `AsyncServer` used before reader and writer tasks."""
+
+    async def start(self):
+        await self.connection.start()
+        self.running = True
+        while self.running and self.connection.alive:
+            await self.run_single()
+            await asyncio.sleep(0.1)
+
+
+async def round_trip(server: AsyncServer) -> float:
+    done = asyncio.get_running_loop().create_future()
+    start = time.perf_counter()
+    server.client.send_request(
+        "threads", callback=lambda _: done.set_result(time.perf_counter())
+    )
+    return await done - start
+
+
+async def measure(server_cls: type, port: int, iterations: int) -> list[float]:
+    server = server_cls("bench", host="127.0.0.1", port=port)
+    initialized = asyncio.get_running_loop().create_future()
+    server.client.on_response(1, initialized.set_result)
+
+    task = asyncio.create_task(server.start())
+    await initialized
+
+    samples = [await round_trip(server) for _ in range(iterations)]
+
+    await server.stop()
+    task.cancel()
+    return samples
+
+
+def report(name: str, samples: list[float]) -> None:
+    samples = sorted(samples)
+    p50 = samples[len(samples) // 2]
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    print(
+        f"{name:<10} n={len(samples):<6} p50={p50 * 1e3:8.3f} ms  "
+        f"p99={p99 * 1e3:8.3f} ms  mean={statistics.fmean(samples) * 1e3:8.3f} ms  "
+        f"{len(samples) / sum(samples):10.1f} req/s"
+    )
+
+
+async def main(iterations: int, polling_iterations: int) -> None:
+    adapter = await serve()
+    port = adapter.sockets[0].getsockname()[1]
+
+    report("event", await measure(BenchServer, port, iterations))
+    report("polling", await measure(PollingServer, port, polling_iterations))
+
+    adapter.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--polling-iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.iterations, args.polling_iterations))
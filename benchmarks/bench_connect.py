@@ -0,0 +1,113 @@
+"""Time from a freshly spawned adapter listening to the client being connected.
+
+Each run spawns a process that starts listening on a free port after a random delay,
+like `debugpy --listen` does once it has imported and started up, and connects to it
+right away: with a fixed sleep before a single attempt, as wrappers commonly do, and
+with the retrying `connect_timeout` of `Connection` and `AsyncConnection`.
+
+    python benchmarks/bench_connect.py --runs 20
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import random
+import socket
+import statistics
+import time
+
+from dap import AsyncConnection, Connection
+
+
+def _listen_later(port: int, delay: float, listening) -> None:
+    time.sleep(delay)
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind(("127.0.0.1", port))
+    listener.listen()
+    listening.put(time.time())
+    with listener:
+        sock, _ = listener.accept()
+    with sock:
+        sock.recv(1)
+
+
+def spawn_adapter(delay: float):
+    with socket.create_server(("127.0.0.1", 0)) as probe:
+        port = probe.getsockname()[1]
+
+    context = multiprocessing.get_context("spawn")
+    listening = context.Queue()
+    process = context.Process(target=_listen_later, args=(port, delay, listening))
+    process.start()
+    return port, process, listening
+
+
+def fixed_sleep(port: int, sleep: float) -> Connection:
+    time.sleep(sleep)
+    connection = Connection("127.0.0.1", port)
+    connection.start()
+    return connection
+
+
+def retrying(port: int) -> Connection:
+    connection = Connection("127.0.0.1", port, connect_timeout=10)
+    connection.start()
+    return connection
+
+
+def async_retrying(port: int) -> AsyncConnection:
+    async def connect():
+        connection = AsyncConnection("127.0.0.1", port, connect_timeout=10)
+        await connection.start()
+        connection.transport.close()
+        return connection
+
+    return asyncio.run(connect())
+
+
+def run(name: str, connect, runs: int, max_delay: float) -> None:
+    lags, attempts = [], []
+    for _ in range(runs):
+        port, process, listening = spawn_adapter(random.uniform(0, max_delay))
+        connection = connect(port)
+        connected = time.time()
+
+        lags.append(connected - listening.get())
+        attempts.append(connection.connect_attempts)
+        if isinstance(connection, Connection):
+            connection.sock.close()
+        process.join()
+
+    lags.sort()
+    print(
+        f"{name:<18} lag p50={lags[len(lags) // 2] * 1e3:7.1f} ms  "
+        f"max={lags[-1] * 1e3:7.1f} ms  "
+        f"attempts={statistics.mean(attempts):5.1f}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument(
+        "--max-delay",
+        type=float,
+        default=0.5,
+        help="the longest time the adapter takes to listen, in seconds",
+    )
+    args = parser.parse_args()
+
+    sleep = args.max_delay + 0.5
+    run(
+        f"sleep {sleep:.1f}s",
+        lambda port: fixed_sleep(port, sleep),
+        args.runs,
+        args.max_delay,
+    )
+    run("retry", retrying, args.runs, args.max_delay)
+    run("retry (async)", async_retrying, args.runs, args.max_delay)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""End-to-end request latency and throughput of `ThreadedServer` and `AsyncServer`.
+
+Every server is measured over TCP, a Unix domain socket and the in-memory loopback
+transport, against the fake adapter, idle and under an output flood. The socket
+adapters run in their own processes, so they do not compete for the GIL.
+
+Requests are sent one at a time, each as soon as the previous response was handled.
+Under a flood, the adapter answers every request with `--flood` output events after
+the response, so the next request waits behind them, and their handling, like it
+would behind a debuggee printing in a loop.
+
+    python benchmarks/bench_end_to_end.py --iterations 2000 --flood 100
+"""
+
+import argparse
+import asyncio
+import functools
+import os
+import tempfile
+import threading
+import time
+
+from _adapter import serve_in_process
+
+from dap import (
+    AsyncConnection,
+    AsyncLoopbackConnection,
+    AsyncServer,
+    AsyncUnixConnection,
+    Connection,
+    FakeAdapter,
+    LoopbackConnection,
+    ThreadedServer,
+    UnixConnection,
+)
+
+THREADS = {"threads": [{"id": 1, "name": "MainThread"}]}
+
+
+def flooding_adapter(flood: int) -> FakeAdapter:
+    adapter = FakeAdapter()
+    if flood:
+        adapter.on("threads", lambda arguments: adapter.output_flood(flood) or THREADS)
+    return adapter
+
+
+class BenchThreadedServer(ThreadedServer):
+    def handle_message(self, message):
+        pass
+
+
+class BenchAsyncServer(AsyncServer):
+    def handle_message(self, message):
+        pass
+
+
+def threaded_samples(connection: Connection, iterations: int) -> list[float]:
+    server = BenchThreadedServer("bench", connection=connection)
+    server.start()
+
+    samples = []
+    for _ in range(iterations + 1):
+        done = threading.Event()
+        start = time.perf_counter()
+        server.client.send_request("threads", callback=lambda _: done.set())
+        done.wait()
+        samples.append(time.perf_counter() - start)
+
+    server.stop()
+    return samples[1:]
+
+
+async def async_samples(connection: AsyncConnection, iterations: int) -> list[float]:
+    server = BenchAsyncServer("bench", connection=connection)
+    task = asyncio.create_task(server.start())
+
+    samples = []
+    for _ in range(iterations + 1):
+        done = asyncio.get_running_loop().create_future()
+        start = time.perf_counter()
+        server.client.send_request("threads", callback=done.set_result)
+        await done
+        samples.append(time.perf_counter() - start)
+
+    await server.stop()
+    task.cancel()
+    return samples[1:]
+
+
+def report(server: str, transport: str, load: str, samples: list[float]) -> None:
+    ordered = sorted(samples)
+    p50 = ordered[len(ordered) // 2]
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    print(
+        f"{server:<9} {transport:<9} {load:<6} p50={p50 * 1e6:9.1f} us  "
+        f"p99={p99 * 1e6:9.1f} us  {len(samples) / sum(samples):9.0f} req/s"
+    )
+
+
+def main(iterations: int, flood: int) -> None:
+    for load, count in (("idle", 0), ("flood", flood)):
+        factory = functools.partial(flooding_adapter, count)
+        port = serve_in_process(adapter_factory=factory)
+        path = serve_in_process(
+            path=os.path.join(tempfile.mkdtemp(), "adapter.sock"),
+            adapter_factory=factory,
+        )
+
+        for transport, connection in (
+            ("tcp", lambda: Connection("127.0.0.1", port)),
+            ("unix", lambda: UnixConnection(path)),
+            ("loopback", lambda: LoopbackConnection(factory())),
+        ):
+            samples = threaded_samples(connection(), iterations)
+            report("threaded", transport, load, samples)
+
+        for transport, connection in (
+            ("tcp", lambda: AsyncConnection("127.0.0.1", port)),
+            ("unix", lambda: AsyncUnixConnection(path)),
+            ("loopback", lambda: AsyncLoopbackConnection(factory())),
+        ):
+            samples = asyncio.run(async_samples(connection(), iterations))
+            report("async", transport, load, samples)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument(
+        "--flood",
+        type=int,
+        default=100,
+        help="the number of output events following every response under a flood",
+    )
+    args = parser.parse_args()
+
+    main(args.iterations, args.flood)
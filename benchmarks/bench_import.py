@@ -0,0 +1,114 @@
+"""Import time of the package, and the first use it defers, in fresh interpreters.
+
+Every statement runs `--runs` times in a new interpreter, and the median time of the
+statement itself is reported, without the startup of the interpreter. The script
+fails if `import dap`, or what `from dap import Client` adds to importing pydantic
+and its models, take longer than their targets.
+
+Models build their validators on first use, so the first messages of every type a
+client handles pay for them instead of the import; the last statements measure that.
+
+    python benchmarks/bench_import.py --runs 10
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+SETUP_SESSION = """
+from dap import Client, FakeAdapter
+client = Client("bench")
+adapter = FakeAdapter()
+adapter.feed(client.send())
+list(client.receive(adapter.send()))
+client.threads()
+client.stack_trace(1)
+adapter.stop()
+adapter.feed(client.send())
+"""
+
+STATEMENTS = [
+    ("import pydantic", "", "import pydantic; from pydantic import BaseModel, Field"),
+    ("import dap", "", "import dap"),
+    ("from dap import Client", "", "from dap import Client"),
+    ("Client()", "from dap import Client", "Client('bench')"),
+    ("first stop handled", SETUP_SESSION, "list(client.receive(adapter.send()))"),
+    (
+        "second stop handled",
+        SETUP_SESSION
+        + "list(client.receive(adapter.send()))\n"
+        + "client.threads(); client.stack_trace(1); adapter.stop()\n"
+        + "adapter.feed(client.send())",
+        "list(client.receive(adapter.send()))",
+    ),
+]
+
+TIMED = """
+import time
+{setup}
+start = time.perf_counter()
+{statement}
+print(time.perf_counter() - start)
+"""
+
+
+def measure(setup: str, statement: str, runs: int) -> float:
+    env = dict(os.environ)
+    src = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [src, env.get("PYTHONPATH")]))
+
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", TIMED.format(setup=setup, statement=statement)],
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        samples.append(float(output))
+    return statistics.median(samples)
+
+
+def main(runs: int, import_target: float, client_target: float) -> None:
+    failed = []
+    results = {}
+    for name, setup, statement in STATEMENTS:
+        elapsed = results[name] = measure(setup, statement, runs) * 1e3
+        line = f"{name:<24} {elapsed:8.1f} ms"
+
+        target = None
+        if name == "import dap":
+            target = import_target
+        elif name == "from dap import Client":
+            elapsed -= results["import pydantic"]
+            line += f"  pydantic +{elapsed:.1f} ms"
+            target = client_target
+        if target is not None:
+            line += f"  target {target:.0f} ms"
+            if elapsed > target:
+                line += "  FAILED"
+                failed.append(name)
+        print(line)
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument(
+        "--import-target", type=float, default=50, help="milliseconds for `import dap`"
+    )
+    parser.add_argument(
+        "--client-target",
+        type=float,
+        default=150,
+        help="milliseconds `from dap import Client` takes on top of pydantic",
+    )
+    args = parser.parse_args()
+
+    main(args.runs, args.import_target, args.client_target)
@@ -0,0 +1,79 @@
+"""Overhead of `ClientMetrics` on requests and events, and of exporting them.
+
+Round trips of `threads` requests, and a stream of output events, are fed through a
+client and the fake adapter without any I/O, with and without metrics, taking turns
+`--repeat` times. The best run of each counts.
+
+    python benchmarks/bench_metrics.py --requests 10000 --events 100000
+"""
+
+import argparse
+import time
+from typing import Optional
+
+from dap import Client, ClientMetrics, FakeAdapter
+
+
+def round_trips(count: int, metrics: Optional[ClientMetrics]) -> float:
+    client = Client("bench", metrics=metrics)
+    adapter = FakeAdapter()
+    adapter.feed(client.send())
+    for _ in client.receive(adapter.send()):
+        pass
+
+    start = time.perf_counter()
+    for _ in range(count):
+        client.threads()
+        adapter.feed(client.send())
+        for _ in client.receive(adapter.send()):
+            pass
+    return time.perf_counter() - start
+
+
+def events(count: int, metrics: Optional[ClientMetrics]) -> float:
+    client = Client("bench", metrics=metrics)
+    adapter = FakeAdapter()
+    adapter.output_flood(count)
+    stream = adapter.send(1 << 30)
+
+    start = time.perf_counter()
+    for _ in client.receive(stream):
+        pass
+    return time.perf_counter() - start
+
+
+def main(requests: int, count: int, repeat: int) -> None:
+    metrics = ClientMetrics()
+    for name, function, operations in (
+        ("request", round_trips, requests),
+        ("event", events, count),
+    ):
+        plain = measured = float("inf")
+        for _ in range(repeat):
+            plain = min(plain, function(operations, None))
+            measured = min(measured, function(operations, metrics))
+        print(
+            f"{name:<8} {plain / operations * 1e6:7.2f} us  with metrics "
+            f"{measured / operations * 1e6:7.2f} us  ({measured / plain - 1:+.1%})"
+        )
+
+    start = time.perf_counter()
+    snapshot = metrics.snapshot()
+    print(f"snapshot   {(time.perf_counter() - start) * 1e6:7.1f} us")
+    start = time.perf_counter()
+    text = metrics.prometheus()
+    print(
+        f"prometheus {(time.perf_counter() - start) * 1e6:7.1f} us, "
+        f"{len(text)} bytes, p50 of threads "
+        f"{snapshot['latency']['threads']['p50'] * 1e6:.1f} us"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=10_000)
+    parser.add_argument("--events", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    main(args.requests, args.events, args.repeat)
@@ -0,0 +1,325 @@
+"""Microbenchmarks of encoding, framing and validating messages, with a JSON report.
+
+Measures, without any adapter or network:
+
+- encode: `RequestBuffer` encodes per second, for every command in `Requests`, and
+  `encode_request` encodes from templates for the commands in `TEMPLATED_REQUESTS`.
+- frame: `ReceiveBuffer` frames per second, for a stream of output events received in
+  chunks of different sizes.
+- handle: messages per second through `Handler.handle`, framing, parsing and
+  validating the same stream.
+- validate: `model_validate` calls per second, for every body model in `events.py`
+  and `responses.py`, with a sample that sets every field.
+
+All cases take turns to run for `--min-time` seconds, `--repeat` times, and the best
+run of each counts. Results are written as JSON with `--output`, and compared with a
+previous run given as `--baseline`: the script fails if a case got slower by more
+than `--threshold`. A plain Python loop is timed along, and the rates are compared
+relative to it, so a machine that is slower as a whole does not show as regressions.
+
+    python benchmarks/bench_micro.py --output baseline.json
+    python benchmarks/bench_micro.py --baseline baseline.json --output results.json
+"""
+
+import argparse
+import inspect
+import json
+import platform
+import sys
+import time
+import timeit
+from typing import Any, Callable
+
+import pydantic
+
+import dap.events
+import dap.responses
+from dap.base import EventBody, Requests, ResponseBody
+from dap.buffer import (
+    TEMPLATED_REQUESTS,
+    ReceiveBuffer,
+    RequestBuffer,
+    encode_request,
+)
+from dap.client import Client
+from dap.fake import FakeAdapter
+
+CHUNK_SIZES = (64, 512, 4096, 65536)
+
+# arguments in the size range of real requests
+ARGUMENTS = {
+    Requests.INITIALIZE: {
+        "clientID": "bench",
+        "adapterID": "debugpy",
+        "linesStartAt1": True,
+        "columnsStartAt1": True,
+        "supportsVariableType": True,
+        "supportsVariablePaging": True,
+        "supportsRunInTerminalRequest": True,
+    },
+    Requests.LAUNCH: {"program": "/src/main.py", "args": ["--verbose"], "cwd": "/src"},
+    Requests.SETBREAKPOINTS: {
+        "source": {"name": "main.py", "path": "/src/main.py"},
+        "breakpoints": [{"line": line} for line in range(10, 100, 10)],
+    },
+    Requests.STACKTRACE: {"threadId": 1, "startFrame": 0, "levels": 20},
+    Requests.SCOPES: {"frameId": 1},
+    Requests.VARIABLES: {"variablesReference": 1, "start": 0, "count": 100},
+    Requests.EVALUATE: {"expression": "len(items)", "frameId": 1, "context": "hover"},
+    Requests.NEXT: {"threadId": 1, "singleThread": None, "granularity": "line"},
+}
+
+
+Case = tuple[str, Callable[[], Any], int]
+"""The name of a case, a function timing it, and the number of operations per call."""
+
+
+def calibrate(function: Callable[[], Any], min_time: float) -> int:
+    """The number of calls of `function` that take about `min_time` seconds."""
+
+    number = 1
+    while (elapsed := timeit.timeit(function, number=number)) < min_time / 10:
+        number *= 10
+    return max(1, int(number * min_time / elapsed))
+
+
+def measure(cases: list[Case], repeat: int, min_time: float) -> dict[str, float]:
+    """The best number of operations per second of every case.
+
+    The cases take turns for every repetition, so that a slow phase of the machine
+    does not only hit the cases that happen to run during it."""
+
+    numbers = [calibrate(function, min_time) for _, function, _ in cases]
+    best = [float("inf")] * len(cases)
+    for _ in range(repeat):
+        for i, (_, function, _) in enumerate(cases):
+            best[i] = min(best[i], timeit.timeit(function, number=numbers[i]))
+
+    return {
+        name: operations * number / elapsed
+        for (name, _, operations), number, elapsed in zip(cases, numbers, best)
+    }
+
+
+def sample(schema: dict[str, Any], defs: dict[str, Any], depth: int = 0) -> Any:
+    """A value for a JSON schema, with every property set up to a nesting depth."""
+
+    if "$ref" in schema:
+        return sample(defs[schema["$ref"].rsplit("/", 1)[1]], defs, depth)
+    if "anyOf" in schema:
+        options = [s for s in schema["anyOf"] if s.get("type") != "null"]
+        return sample(options[0], defs, depth) if options else None
+    if "const" in schema:
+        return schema["const"]
+    if "enum" in schema:
+        return schema["enum"][0]
+
+    match schema.get("type"):
+        case "object":
+            required = set(schema.get("required", ()))
+            return {
+                name: sample(property, defs, depth + 1)
+                for name, property in schema.get("properties", {}).items()
+                if name in required or depth < 3
+            }
+        case "array":
+            items = schema.get("items", {})
+            return [sample(items, defs, depth + 1)] if depth < 3 else []
+        case "string":
+            return "sample"
+        case "integer":
+            return 1
+        case "number":
+            return 1.5
+        case "boolean":
+            return True
+        case _:
+            return None
+
+
+def body_models() -> list[type[pydantic.BaseModel]]:
+    models = []
+    for module in (dap.events, dap.responses):
+        for _, model in inspect.getmembers(module, inspect.isclass):
+            if (
+                issubclass(model, (EventBody, ResponseBody))
+                and model.__module__ == module.__name__
+            ):
+                models.append(model)
+    return models
+
+
+def output_stream(count: int) -> bytes:
+    adapter = FakeAdapter()
+    adapter.output_flood(count, "Lorem ipsum dolor sit amet, consectetur adipiscing\n")
+    return adapter.send(1 << 30)
+
+
+def reference() -> list[Case]:
+    # plain bytecode and allocations, to tell a slower machine apart from slower code
+    return [("reference/loop", lambda: [{"id": i} for i in range(100)], 1)]
+
+
+def bench_encode() -> list[Case]:
+    cases = []
+    for command in Requests:
+        if command in (Requests.RUNINTERMINAL, Requests.STARTDEBUGGING):
+            # reverse requests, only sent by adapters
+            continue
+        arguments = ARGUMENTS.get(command, {"threadId": 1})
+        cases.append(
+            (
+                f"encode/{command}",
+                lambda command=command, arguments=arguments: RequestBuffer(
+                    1, command, arguments
+                ),
+                1,
+            )
+        )
+        if command in TEMPLATED_REQUESTS:
+            cases.append(
+                (
+                    f"template/{command}",
+                    lambda command=command, arguments=arguments: encode_request(
+                        1, command, arguments
+                    ),
+                    1,
+                )
+            )
+    return cases
+
+
+def bench_frame() -> list[Case]:
+    count = 1000
+    stream = output_stream(count)
+
+    cases = []
+    for chunk_size in CHUNK_SIZES:
+        chunks = [stream[i : i + chunk_size] for i in range(0, len(stream), chunk_size)]
+
+        def frame(chunks=chunks):
+            buffer = ReceiveBuffer()
+            for chunk in chunks:
+                buffer.extend(chunk)
+                while (content := buffer.pop_frame()) is not None:
+                    content.release()
+
+        def handle(chunks=chunks):
+            client = Client("bench")
+            for chunk in chunks:
+                with client.get_buffer(len(chunk)) as buf:
+                    buf[: len(chunk)] = chunk
+                for _ in client.buffer_updated(len(chunk)):
+                    pass
+
+        cases.append((f"frame/{chunk_size}", frame, count))
+        cases.append((f"handle/{chunk_size}", handle, count))
+    return cases
+
+
+def bench_validate() -> list[Case]:
+    cases = []
+    for model in body_models():
+        schema = model.model_json_schema()
+        data = sample(schema, schema.get("$defs", {}))
+        try:
+            model.model_validate(data)
+        except pydantic.ValidationError as e:
+            print(f"skipping {model.__name__}: {e}", file=sys.stderr)
+            continue
+
+        cases.append(
+            (
+                f"validate/{model.__name__}",
+                lambda model=model, data=data: model.model_validate(data),
+                1,
+            )
+        )
+    return cases
+
+
+SUITES = {"encode": bench_encode, "frame": bench_frame, "validate": bench_validate}
+
+
+def compare(
+    results: dict[str, float], baseline: dict[str, float], threshold: float
+) -> list[str]:
+    """Print how every case changed against the baseline and return the regressions.
+
+    Rates are compared relative to the reference loop of their run, if both have one."""
+
+    scale = 1.0
+    if "reference/loop" in results and "reference/loop" in baseline:
+        scale = results["reference/loop"] / baseline["reference/loop"]
+        print(f"machine speed {scale - 1:+.1%} against the baseline")
+
+    regressions = []
+    for name, rate in results.items():
+        if name not in baseline or name.startswith("reference/"):
+            continue
+        change = rate / (baseline[name] * scale) - 1
+        flag = ""
+        if change < -threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(
+            f"{name:<45} {baseline[name]:>12,.0f} -> {rate:>12,.0f}/s "
+            f"{change:+7.1%}{flag}"
+        )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--suite", choices=SUITES, nargs="+", default=list(SUITES), help="suites to run"
+    )
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument(
+        "--min-time",
+        type=float,
+        default=0.02,
+        help="the time in seconds each case is run for per repetition",
+    )
+    parser.add_argument("--output", help="the JSON file to write the results to")
+    parser.add_argument("--baseline", help="a JSON file of a previous run")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.15,
+        help="the slowdown against the baseline reported as a regression",
+    )
+    args = parser.parse_args()
+
+    cases = reference()
+    for suite in args.suite:
+        cases += SUITES[suite]()
+
+    start = time.perf_counter()
+    results = measure(cases, args.repeat, args.min_time)
+    print(f"{len(cases)} cases in {time.perf_counter() - start:.1f} s", file=sys.stderr)
+
+    report = {
+        "python": platform.python_version(),
+        "pydantic": pydantic.VERSION,
+        "machine": platform.machine(),
+        "unit": "operations per second",
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        if regressions := compare(results, baseline, args.threshold):
+            print(f"{len(regressions)} regressions", file=sys.stderr)
+            sys.exit(1)
+    else:
+        for name, rate in results.items():
+            print(f"{name:<45} {rate:>14,.0f}/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Parsing throughput of `SessionPool` worker processes versus one `SessionManager`.
+
+Every session pipelines `--requests` `stackTrace` requests, 20 frames each, to a local
+stand-in adapter running in its own process; the rate at which parsed responses reach
+the handler in the parent is reported. The pool forwards either the decoded messages or,
+with `process`, only the frame names.
+
+    python benchmarks/bench_pool.py --sessions 32 --requests 500 --workers 1 2 4
+"""
+
+import argparse
+import asyncio
+import threading
+import time
+
+from _adapter import serve_in_process
+
+from dap import SessionManager, SessionPool
+from dap.responses import StackTraceResponse
+
+
+def frame_names(session_id, message):
+    if isinstance(message, StackTraceResponse):
+        return [frame.name for frame in message.stackFrames]
+
+
+class BenchManager(SessionManager):
+    def __init__(self, expected):
+        super().__init__()
+        self.remaining = expected
+        self.done = asyncio.Event()
+
+    def handle_message(self, session, message):
+        self.remaining -= 1
+        if not self.remaining:
+            self.done.set()
+
+
+class BenchPool(SessionPool):
+    def __init__(self, workers, process, expected):
+        super().__init__(workers, process)
+        self.remaining = expected
+        self.done = threading.Event()
+
+    def handle_message(self, session_id, message):
+        self.remaining -= 1
+        if not self.remaining:
+            self.done.set()
+
+    def session_closed(self, session_id, error):
+        pass
+
+
+async def measure_manager(port: int, sessions: int, requests: int) -> float:
+    manager = BenchManager(sessions * (requests + 1))
+    await manager.start()
+    opened = [await manager.add("bench", "127.0.0.1", port) for _ in range(sessions)]
+
+    start = time.perf_counter()
+    for session in opened:
+        for _ in range(requests):
+            session.client.send_request("stackTrace", {"threadId": 1})
+    await manager.done.wait()
+    elapsed = time.perf_counter() - start
+
+    await manager.stop()
+    return sessions * requests / elapsed
+
+
+def measure_pool(
+    port: int, workers: int, process, sessions: int, requests: int
+) -> float:
+    # without `process` the initialize responses are forwarded too
+    pool = BenchPool(workers, process, sessions * (requests + (process is None)))
+    pool.start()
+    opened = [pool.add("bench", "127.0.0.1", port) for _ in range(sessions)]
+
+    start = time.perf_counter()
+    for session_id in opened:
+        for _ in range(requests):
+            pool.send_request(session_id, "stackTrace", {"threadId": 1})
+    pool.done.wait()
+    elapsed = time.perf_counter() - start
+
+    pool.stop()
+    return sessions * requests / elapsed
+
+
+def main(sessions: int, requests: int, workers: list[int]) -> None:
+    port = serve_in_process()
+
+    throughput = asyncio.run(measure_manager(port, sessions, requests))
+    print(f"{'manager':<16} {throughput:10.1f} responses/s")
+    for process in (None, frame_names):
+        for count in workers:
+            throughput = measure_pool(port, count, process, sessions, requests)
+            name = f"pool x{count}{' process' if process else ''}"
+            print(f"{name:<16} {throughput:10.1f} responses/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    main(args.sessions, args.requests, args.workers)
@@ -0,0 +1,84 @@
+"""Which stages and models the handler spends its time on, with `HandlerProfiler`.
+
+A session with the fake adapter is fed through a client without any I/O: `--stops`
+stops, each with a stack trace, the scopes and variables of the top frame, an
+evaluation and a burst of output events. A session log recorded with a `Recorder`
+can be profiled instead with `--log`. The top rows of the profile are printed, and
+the session is fed again without the profiler to measure its overhead.
+
+    python benchmarks/bench_profile.py --stops 200 --top 15
+    python benchmarks/bench_profile.py --log session.daplog
+"""
+
+import argparse
+import time
+from typing import Optional
+
+from dap import Client, FakeAdapter, HandlerProfiler, TraceReader
+
+
+def session(stops: int, profiler: Optional[HandlerProfiler]) -> float:
+    client = Client("bench", profiler=profiler)
+    adapter = FakeAdapter(stack_depth=200, variable_count=100)
+    elapsed = 0.0
+
+    def exchange():
+        nonlocal elapsed
+        adapter.feed(client.send())
+        data = adapter.send(1 << 30)
+        start = time.perf_counter()
+        for _ in client.receive(data):
+            pass
+        elapsed += time.perf_counter() - start
+
+    exchange()
+    for _ in range(stops):
+        adapter.stop()
+        adapter.output_flood(20, "Lorem ipsum dolor sit amet, consectetur adipiscing\n")
+        client.threads()
+        client.stack_trace(1, levels=20)
+        client.scopes(1)
+        client.variables(1, count=100)
+        client.evaluate("len(items)", frame_id=1, context="hover")
+        exchange()
+        client.continue_(1)
+        exchange()
+    return elapsed
+
+
+def replay(log: str, profiler: Optional[HandlerProfiler]) -> float:
+    with TraceReader(log) as trace:
+        start = time.perf_counter()
+        trace.feed(Client("bench", profiler=profiler))
+        return time.perf_counter() - start
+
+
+def main(stops: int, log: Optional[str], top: int, repeat: int) -> None:
+    if log is None:
+        run = lambda profiler: session(stops, profiler)
+    else:
+        run = lambda profiler: replay(log, profiler)
+
+    profiler = HandlerProfiler()
+    run(profiler)
+    print(profiler.report(top))
+
+    plain = profiled = float("inf")
+    for _ in range(repeat):
+        plain = min(plain, run(None))
+        profiled = min(profiled, run(HandlerProfiler()))
+    print(
+        f"\nhandling {plain * 1e3:.1f} ms  profiled {profiled * 1e3:.1f} ms "
+        f"({profiled / plain - 1:+.1%})"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stops", type=int, default=200)
+    parser.add_argument("--log", help="a recorded session log to profile instead")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    main(args.stops, args.log, args.top, args.repeat)
@@ -0,0 +1,98 @@
+"""Frontends sharing a fake adapter through a `Proxy`, with and without its cache.
+
+`--frontends` clients connect to a proxy of an adapter served on a local socket. At
+each of `--stops` stops, every frontend reads the threads, the stack trace, and the
+scopes and variables of the top frame, like an IDE, a dashboard and a recorder
+following the same session would. The time until all frontends have all results,
+and the number of requests that reached the adapter, are reported for each stop.
+
+    python benchmarks/bench_proxy.py --frontends 4 --stops 100
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from dap import AsyncConnection, Client, Proxy
+from dap.events import InitializedEvent, StoppedEvent
+from dap.fake import FakeAdapter, serve
+from dap.responses import Continued, VariablesResponse
+
+
+class Frontend:
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.client = Client("bench")
+        self.reader = reader
+        self.writer = writer
+
+    async def until(self, kind: type) -> None:
+        while True:
+            self.writer.write(self.client.send())
+            data = await self.reader.read(1 << 20)
+            if any(isinstance(message, kind) for message in self.client.receive(data)):
+                return
+
+    async def read(self) -> None:
+        self.client.threads()
+        self.client.stack_trace(1, levels=20)
+        self.client.scopes(1)
+        self.client.variables(2, count=100)
+        await self.until(VariablesResponse)
+
+
+async def session(frontends: int, stops: int, cache: bool) -> tuple[list[float], int]:
+    adapter_server = await serve(
+        adapter_factory=lambda: FakeAdapter(stack_depth=200, variable_count=100)
+    )
+    port = adapter_server.sockets[0].getsockname()[1]
+    proxy = Proxy("bench", connection=AsyncConnection("127.0.0.1", port))
+    proxy.cache = cache
+    server = await proxy.listen()
+    task = asyncio.create_task(proxy.start())
+
+    clients = []
+    for _ in range(frontends):
+        streams = await asyncio.open_connection(*server.sockets[0].getsockname())
+        clients.append(Frontend(*streams))
+        await clients[-1].until(InitializedEvent)
+
+    ide = clients[0]
+    times = []
+    forwarded = proxy.stats.forwarded
+    for _ in range(stops):
+        ide.client.pause(1)
+        await asyncio.gather(*(client.until(StoppedEvent) for client in clients))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client.read() for client in clients))
+        times.append(time.perf_counter() - start)
+
+        ide.client.continue_(1)
+        await ide.until(Continued)
+    forwarded = proxy.stats.forwarded - forwarded
+
+    await proxy.stop()
+    task.cancel()
+    adapter_server.close()
+    return times, forwarded
+
+
+def main(frontends: int, stops: int) -> None:
+    for cache in (False, True):
+        times, forwarded = asyncio.run(session(frontends, stops, cache))
+        print(
+            f"cache {'on ' if cache else 'off'}  "
+            f"median {statistics.median(times) * 1e3:6.2f} ms  "
+            f"p90 {statistics.quantiles(times, n=10)[-1] * 1e3:6.2f} ms  "
+            f"adapter requests {forwarded / stops:5.1f} per stop"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frontends", type=int, default=4)
+    parser.add_argument("--stops", type=int, default=100)
+    args = parser.parse_args()
+
+    main(args.frontends, args.stops)
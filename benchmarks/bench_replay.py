@@ -0,0 +1,79 @@
+"""Overhead of recording a session, and the speed of replaying it.
+
+Without `--log`, a session with the fake adapter is recorded first: a flood of output
+events and stack traces, received through the in-memory loopback transport with and
+without a `Recorder`. The log, given or recorded, is then replayed as fast as
+possible.
+
+    python benchmarks/bench_replay.py --flood 100000
+    python benchmarks/bench_replay.py --log session.daplog
+"""
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+from typing import Optional
+
+from dap import FakeAdapter, LoopbackConnection, Recorder, Replayer, ThreadedServer
+from dap.responses import StackTraceResponse
+
+
+class BenchServer(ThreadedServer):
+    def __init__(self, *args, **kwargs):
+        self.done = threading.Event()
+        super().__init__(*args, **kwargs)
+
+    def handle_message(self, message):
+        if isinstance(message, StackTraceResponse):
+            self.done.set()
+
+
+def record(flood: int, recorder: Optional[Recorder]) -> float:
+    adapter = FakeAdapter(stack_depth=200)
+    adapter.on("configurationDone", lambda arguments: adapter.output_flood(flood))
+    server = BenchServer("bench", connection=LoopbackConnection(adapter))
+    server.client.recorder = recorder
+    server.start()
+
+    start = time.perf_counter()
+    server.client.configuration_done()
+    for _ in range(100):
+        server.client.stack_trace(1)
+    server.client.stack_trace(1)
+    server.done.wait()
+    elapsed = time.perf_counter() - start
+
+    server.stop()
+    return elapsed
+
+
+def main(flood: int, log: Optional[str]) -> None:
+    if log is None:
+        log = os.path.join(tempfile.mkdtemp(), "session.daplog")
+        plain = record(flood, None)
+        with Recorder(log) as recorder:
+            recorded = record(flood, recorder)
+        print(
+            f"live         {plain:7.3f} s   recording {recorded:7.3f} s  "
+            f"({recorded / plain - 1:+.1%})"
+        )
+
+    size = os.path.getsize(log)
+    start = time.perf_counter()
+    messages = Replayer(log).replay()
+    elapsed = time.perf_counter() - start
+    print(
+        f"replay       {elapsed:7.3f} s   {messages / elapsed:9.0f} messages/s  "
+        f"{size / elapsed / 1e6:6.1f} MB/s  log {size / 1e6:.1f} MB"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--flood", type=int, default=100_000)
+    parser.add_argument("--log", help="a recorded log to replay instead")
+    args = parser.parse_args()
+
+    main(args.flood, args.log)
@@ -0,0 +1,96 @@
+"""Many concurrent sessions on one `SessionManager` versus one `ThreadedServer` each.
+
+Every session sends `--requests` requests one after the other to a local stand-in
+adapter running on its own thread.
+
+    python benchmarks/bench_sessions.py --sessions 300 --requests 50
+"""
+
+import argparse
+import asyncio
+import threading
+import time
+
+from _adapter import serve_in_thread
+
+from dap import SessionManager, ThreadedServer
+
+
+class BenchManager(SessionManager):
+    def handle_message(self, session, message):
+        pass
+
+
+class BenchServer(ThreadedServer):
+    def handle_message(self, message):
+        pass
+
+
+async def measure_manager(port: int, sessions: int, requests: int) -> tuple:
+    manager = BenchManager()
+    await manager.start()
+    opened = [await manager.add("bench", "127.0.0.1", port) for _ in range(sessions)]
+    threads = threading.active_count()
+
+    async def run(session):
+        for _ in range(requests):
+            done = asyncio.get_running_loop().create_future()
+            session.client.send_request("threads", callback=done.set_result)
+            await done
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run(session) for session in opened))
+    elapsed = time.perf_counter() - start
+
+    max_wait = manager.totals().max_wait
+    await manager.stop()
+    return elapsed, threads, max_wait
+
+
+def measure_threaded(port: int, sessions: int, requests: int) -> tuple:
+    servers = [BenchServer("bench", "127.0.0.1", port) for _ in range(sessions)]
+    for server in servers:
+        server.start()
+    threads = threading.active_count()
+
+    def run(server):
+        for _ in range(requests):
+            done = threading.Event()
+            server.client.send_request("threads", callback=lambda _: done.set())
+            done.wait()
+
+    start = time.perf_counter()
+    workers = [threading.Thread(target=run, args=(server,)) for server in servers]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+
+    for server in servers:
+        server.stop()
+    return elapsed, threads, None
+
+
+def main(sessions: int, requests: int) -> None:
+    port = serve_in_thread()
+    total = sessions * requests
+
+    for name, (elapsed, threads, max_wait) in (
+        ("manager", asyncio.run(measure_manager(port, sessions, requests))),
+        ("threaded", measure_threaded(port, sessions, requests)),
+    ):
+        wait = f"  max turn wait {max_wait * 1e3:6.2f} ms" if max_wait else ""
+        print(
+            f"{name:<10} {total / elapsed:10.1f} responses/s  "
+            f"{threads:4d} threads{wait}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=300)
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+
+    main(args.sessions, args.requests)
@@ -0,0 +1,122 @@
+"""Throughput and idle CPU of `ThreadedServer` against a local stand-in adapter.
+
+Compares the selector-driven connection with the previous one, which received in
+1 KiB chunks on a helper thread and was polled through a `queue.Queue`.
+
+    python benchmarks/bench_threaded_throughput.py --requests 20000
+"""
+
+import argparse
+import queue
+import socket
+import threading
+import time
+
+from _adapter import serve_in_thread
+
+from dap import ThreadedServer
+from dap.client import Client
+
+
+class BenchServer(ThreadedServer):
+    def handle_message(self, message):
+        pass
+
+
+class QueueConnection:
+    """The connection `ThreadedServer` used before the selector-driven one."""
+
+    def __init__(self, host, port):
+        self.alive = True
+        self.host = host
+        self.port = port
+        self.out_queue = queue.Queue()
+
+    def write(self, buf):
+        self.sock.sendall(buf)
+
+    def read(self):
+        buf = bytearray()
+        while True:
+            try:
+                buf += self.out_queue.get(block=False)
+            except queue.Empty:
+                break
+        return bytes(buf)
+
+    def start(self):
+        self.sock = socket.create_connection((self.host, self.port))
+        threading.Thread(target=self._process_output, daemon=True).start()
+
+    def stop(self):
+        self.alive = False
+        self.sock.close()
+
+    def _process_output(self):
+        while self.alive:
+            try:
+                data = self.sock.recv(1024)
+            except OSError:
+                break
+            if not data:
+                break
+            self.out_queue.put(data)
+
+
+class QueueServer(BenchServer):
+    def __init__(self, adapter_id, host, port):
+        self.connection = QueueConnection(host, port)
+        self.connection.start()
+        self.client = Client(adapter_id)
+        self.running = False
+
+    def _run_loop(self):
+        # the old loop stopped as soon as no data was queued, keep polling instead
+        while self.running and self.connection.alive:
+            if s := self.client.send():
+                self.connection.write(s)
+            for result in self.client.receive(self.connection.read()):
+                self.handle_message(result)
+
+
+def measure(server_cls: type, port: int, requests: int) -> tuple[float, float]:
+    server = server_cls("bench", host="127.0.0.1", port=port)
+    done = threading.Event()
+    remaining = [requests]
+
+    def on_response(_):
+        remaining[0] -= 1
+        if not remaining[0]:
+            done.set()
+
+    server.start()
+    start = time.perf_counter()
+    for _ in range(requests):
+        server.client.send_request("threads", callback=on_response)
+    done.wait()
+    elapsed = time.perf_counter() - start
+
+    cpu = time.process_time()
+    time.sleep(1)
+    idle_cpu = time.process_time() - cpu
+
+    server.stop()
+    return requests / elapsed, idle_cpu
+
+
+def main(requests: int) -> None:
+    port = serve_in_thread()
+    for name, server_cls in (("selector", BenchServer), ("queue", QueueServer)):
+        throughput, idle_cpu = measure(server_cls, port, requests)
+        print(
+            f"{name:<10} {throughput:10.1f} responses/s  "
+            f"idle CPU {idle_cpu * 100:5.1f}% of a core"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    main(args.requests)
@@ -0,0 +1,115 @@
+"""Random access to a large session log with `TraceReader`, and feeding it to a client.
+
+Without `--log`, a log of output events of about `--size` megabytes is written first.
+Measures indexing the whole log, random access by index and by time, iterating every
+record, and feeding a slice of it through a client, straight to its handler and through
+its receive buffer. With `--memory`, every step is repeated to trace the peak of memory
+allocated by Python during it.
+
+    python benchmarks/bench_trace.py --size 1024
+    python benchmarks/bench_trace.py --log session.daplog --memory
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Optional
+
+from dap import Client, FakeAdapter, Recorder, TraceReader
+from dap.buffer import ReceiveBuffer
+
+
+def write_log(path: str, size: int) -> None:
+    adapter = FakeAdapter()
+    adapter.output_flood(10_000, "Lorem ipsum dolor sit amet, consectetur adipiscing\n")
+    buffer = ReceiveBuffer()
+    buffer.extend(adapter.send(1 << 30))
+    frames = []
+    while (frame := buffer.pop_frame()) is not None:
+        with frame:
+            frames.append(bytes(frame))
+
+    with Recorder(path, buffer_size=1 << 20) as recorder:
+        while recorder.file.tell() < size:
+            for frame in frames:
+                recorder.received(memoryview(frame))
+
+
+def step(
+    name: str, function: Callable[[], object], operations: int = 1, memory=False
+) -> object:
+    start = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - start
+    line = f"{name:<16} {elapsed:8.3f} s  {elapsed / operations * 1e6:9.2f} us/op"
+
+    if memory:
+        tracemalloc.start()
+        function()
+        line += f"  peak {tracemalloc.get_traced_memory()[1] / 1e6:7.2f} MB"
+        tracemalloc.stop()
+
+    print(line)
+    return result
+
+
+def receive(trace: TraceReader, start: int, stop: int) -> int:
+    # the received data copied through the receive buffer, like a replay
+    client = Client("bench")
+    client.send()
+    messages = 0
+    for record in trace.records(start, stop):
+        for _ in client.receive(record.data):
+            messages += 1
+    return messages
+
+
+def main(size: int, log: Optional[str], lookups: int, count: int, memory: bool) -> None:
+    if log is None:
+        log = os.path.join(tempfile.mkdtemp(), "session.daplog")
+        start = time.perf_counter()
+        write_log(log, size << 20)
+        print(f"written in {time.perf_counter() - start:.1f} s")
+    print(f"log {os.path.getsize(log) / 1e6:.1f} MB")
+
+    with TraceReader(log) as trace:
+        # indexing is only ever done once
+        records = step("index", lambda: len(trace), memory=False)
+        print(f"{records} records")
+
+        indices = [random.randrange(records) for _ in range(lookups)]
+        lookup = lambda: [trace[i].timestamp for i in indices]
+        step("trace[i]", lookup, lookups, memory)
+
+        first, last = trace[0].timestamp, trace[-1].timestamp
+        times = [random.randint(first, last) for _ in range(lookups)]
+        step("find(time)", lambda: [trace.find(t) for t in times], lookups, memory)
+
+        iterate = lambda: sum(len(record.data) for record in trace)
+        step("iterate", iterate, records, memory)
+
+        start = random.randrange(max(1, records - count))
+        feed = lambda: trace.feed(Client("bench"), start, start + count)
+        step("feed", feed, count, memory)
+        step("receive", lambda: receive(trace, start, start + count), count, memory)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--size", type=int, default=1024, help="the size of the log in megabytes"
+    )
+    parser.add_argument("--log", help="an existing log to read instead")
+    parser.add_argument("--lookups", type=int, default=1000)
+    parser.add_argument(
+        "--count", type=int, default=10_000, help="the number of records fed"
+    )
+    parser.add_argument(
+        "--memory", action="store_true", help="trace the memory allocated"
+    )
+    args = parser.parse_args()
+
+    main(args.size, args.log, args.lookups, args.count, args.memory)
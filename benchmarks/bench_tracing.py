@@ -0,0 +1,130 @@
+"""Where the time of requests goes, from the spans of a `Tracer`, and its overhead.
+
+A `ThreadedServer` on the in-memory loopback transport runs `--stops` stops of the
+fake adapter: a stopped event, then the stack trace, scopes and variables of the
+top frame, each sent as the previous response is delivered. The mean time of every
+phase is printed per command, and the trace written to `--output` to be opened in
+Perfetto. The overhead of tracing is measured on round trips without any I/O.
+
+    python benchmarks/bench_tracing.py --stops 200 --output session.trace.json
+"""
+
+import argparse
+import statistics
+import threading
+import time
+from typing import Optional
+
+from dap import Client, FakeAdapter, LoopbackConnection, ThreadedServer, Tracer
+from dap.base import DAPMessage
+from dap.events import StoppedEvent
+from dap.responses import ScopesResponse, StackTraceResponse, VariablesResponse
+
+
+class StopServer(ThreadedServer):
+    def __init__(self, *args, **kwargs):
+        self.done = threading.Event()
+        super().__init__(*args, **kwargs)
+
+    def handle_message(self, message):
+        if isinstance(message, StoppedEvent):
+            self.client.stack_trace(1, levels=20)
+        elif isinstance(message, StackTraceResponse):
+            self.client.scopes(message.stackFrames[0].id)
+        elif isinstance(message, ScopesResponse):
+            self.client.variables(message.scopes[0].variablesReference)
+        elif isinstance(message, VariablesResponse):
+            self.done.set()
+
+
+def stops(count: int, tracer: Tracer) -> None:
+    adapter = FakeAdapter(stack_depth=200, variable_count=100)
+    server = StopServer("bench", connection=LoopbackConnection(adapter))
+    server.client.tracer = tracer
+    server.start()
+
+    for _ in range(count):
+        server.done.clear()
+        adapter.stop()
+        # wake up the loopback transport for the queued event
+        server.client.threads()
+        server.done.wait()
+    server.stop()
+
+
+def report(tracer: Tracer) -> None:
+    phases: dict[str, dict[str, list[int]]] = {}
+    for span in tracer.spans:
+        if span.kind != DAPMessage.RESPONSE or span.queued is None:
+            continue
+        times = phases.setdefault(span.name, {})
+        for name, begin, end in (
+            ("queued", span.queued, span.written),
+            ("adapter", span.written, span.framed),
+            ("decode", span.framed, span.decoded),
+            ("validate", span.decoded, span.validated),
+            ("deliver", span.validated, span.delivered),
+        ):
+            if begin is not None and end is not None:
+                times.setdefault(name, []).append(end - begin)
+
+    print(
+        f"{'mean us':<12}"
+        + "".join(f"{name:>10}" for name in ("queued", "adapter", "decode"))
+        + "".join(f"{name:>10}" for name in ("validate", "deliver"))
+    )
+    for command, times in sorted(phases.items()):
+        print(
+            f"{command:<12}"
+            + "".join(
+                f"{statistics.mean(times[name]) / 1e3:10.1f}" if name in times else ""
+                for name in ("queued", "adapter", "decode", "validate", "deliver")
+            )
+        )
+
+
+def round_trips(count: int, tracer: Optional[Tracer]) -> float:
+    client = Client("bench", tracer=tracer)
+    adapter = FakeAdapter()
+    start = time.perf_counter()
+    for _ in range(count):
+        client.threads()
+        adapter.feed(client.send())
+        for _ in client.receive(adapter.send()):
+            pass
+    return time.perf_counter() - start
+
+
+def main(count: int, output: Optional[str], requests: int, repeat: int) -> None:
+    tracer = Tracer(max_spans=count * 10)
+    stops(count, tracer)
+    report(tracer)
+    if output:
+        tracer.write(output)
+
+    plain = traced = float("inf")
+    for _ in range(repeat):
+        plain = min(plain, round_trips(requests, None))
+        traced = min(traced, round_trips(requests, Tracer()))
+    print(
+        f"round trip {plain / requests * 1e6:7.2f} us  traced "
+        f"{traced / requests * 1e6:7.2f} us  ({traced / plain - 1:+.1%})"
+    )
+
+    start = time.perf_counter()
+    events = tracer.chrome_trace()["traceEvents"]
+    elapsed = time.perf_counter() - start
+    print(
+        f"export     {elapsed / len(tracer.spans) * 1e6:7.2f} us/span, {len(events)} events"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stops", type=int, default=200)
+    parser.add_argument("--output", help="the Chrome trace JSON file to write")
+    parser.add_argument("--requests", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    main(args.stops, args.output, args.requests, args.repeat)
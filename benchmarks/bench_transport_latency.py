@@ -0,0 +1,136 @@
+"""Round-trip latency of the TCP, Unix domain socket and inherited socket transports.
+
+Every transport talks to the same local fake adapter, running on its own thread,
+through both `ThreadedServer` and `AsyncServer`. The in-memory loopback transports,
+with the adapter answering on the client's own thread, show the cost of the client
+alone.
+
+    python benchmarks/bench_transport_latency.py --iterations 5000
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import tempfile
+import threading
+import time
+
+from _adapter import run_in_thread, serve, serve_socket, serve_unix
+
+from dap import (
+    AsyncConnection,
+    AsyncFdConnection,
+    AsyncLoopbackConnection,
+    AsyncServer,
+    AsyncUnixConnection,
+    Connection,
+    FdConnection,
+    LoopbackConnection,
+    ThreadedServer,
+    UnixConnection,
+)
+
+
+class BenchThreadedServer(ThreadedServer):
+    def handle_message(self, message):
+        pass
+
+
+class BenchAsyncServer(AsyncServer):
+    def handle_message(self, message):
+        pass
+
+
+def threaded_samples(connection: Connection, iterations: int) -> list[float]:
+    server = BenchThreadedServer("bench", connection=connection)
+    server.start()
+
+    samples = []
+    for _ in range(iterations + 1):
+        done = threading.Event()
+        start = time.perf_counter()
+        server.client.send_request("threads", callback=lambda _: done.set())
+        done.wait()
+        samples.append(time.perf_counter() - start)
+
+    server.stop()
+    return samples[1:]
+
+
+async def async_samples(connection: AsyncConnection, iterations: int) -> list[float]:
+    server = BenchAsyncServer("bench", connection=connection)
+    task = asyncio.create_task(server.start())
+
+    samples = []
+    for _ in range(iterations + 1):
+        done = asyncio.get_running_loop().create_future()
+        start = time.perf_counter()
+        server.client.send_request("threads", callback=done.set_result)
+        await done
+        samples.append(time.perf_counter() - start)
+
+    await server.stop()
+    task.cancel()
+    return samples[1:]
+
+
+def report(name: str, samples: list[float]) -> None:
+    samples = sorted(samples)
+    p50 = samples[len(samples) // 2]
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    print(
+        f"{name:<22} p50={p50 * 1e6:8.1f} us  p99={p99 * 1e6:8.1f} us  "
+        f"mean={statistics.fmean(samples) * 1e6:8.1f} us"
+    )
+
+
+def socketpair_end() -> socket.socket:
+    ours, theirs = socket.socketpair()
+    run_in_thread(serve_socket, theirs)
+    return ours
+
+
+def main(iterations: int) -> None:
+    port = run_in_thread(serve, "127.0.0.1", 0).sockets[0].getsockname()[1]
+    path = os.path.join(tempfile.mkdtemp(), "adapter.sock")
+    run_in_thread(serve_unix, path)
+
+    report(
+        "threaded tcp",
+        threaded_samples(Connection("127.0.0.1", port), iterations),
+    )
+    report("threaded unix", threaded_samples(UnixConnection(path), iterations))
+    report(
+        "threaded socketpair",
+        threaded_samples(FdConnection(socketpair_end().detach()), iterations),
+    )
+    report("threaded loopback", threaded_samples(LoopbackConnection(), iterations))
+
+    report(
+        "async tcp",
+        asyncio.run(async_samples(AsyncConnection("127.0.0.1", port), iterations)),
+    )
+    report(
+        "async unix",
+        asyncio.run(async_samples(AsyncUnixConnection(path), iterations)),
+    )
+    report(
+        "async socketpair",
+        asyncio.run(
+            async_samples(AsyncFdConnection(socketpair_end().detach()), iterations)
+        ),
+    )
+    report(
+        "async loopback",
+        asyncio.run(async_samples(AsyncLoopbackConnection(), iterations)),
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+
+    main(args.iterations)
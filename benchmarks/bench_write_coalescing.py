@@ -0,0 +1,81 @@
+"""Writes per request and burst latency of `ThreadedServer` for bursts of requests.
+
+Bursts of `--burst` requests are queued from the calling thread, which releases the
+GIL between requests like a caller doing I/O would. They are queued either one by
+one, with Nagle's algorithm enabled again, or between `cork` and `flush`; each burst is
+timed until its last response arrives from a local stand-in adapter.
+
+    python benchmarks/bench_write_coalescing.py --bursts 200 --burst 20
+"""
+
+import argparse
+import socket
+import statistics
+import threading
+import time
+
+from _adapter import serve_in_process
+
+from dap import Connection, ThreadedServer
+
+
+class BenchServer(ThreadedServer):
+    def handle_message(self, message):
+        pass
+
+
+class NagleConnection(Connection):
+    def start(self, *args):
+        super().start(*args)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 0)
+
+
+def measure(connection: Connection, bursts: int, burst: int, cork: bool) -> tuple:
+    server = BenchServer("bench", connection=connection)
+    server.start()
+    client = server.client
+
+    samples = []
+    writes, frames = connection.writes, client.frames_sent
+    for _ in range(bursts):
+        done = threading.Event()
+        start = time.perf_counter()
+        if cork:
+            client.cork()
+        for _ in range(burst - 1):
+            client.send_request("threads")
+            time.sleep(0)
+        client.send_request("threads", callback=lambda _: done.set())
+        if cork:
+            client.flush()
+        done.wait()
+        samples.append(time.perf_counter() - start)
+
+    writes_per_request = (connection.writes - writes) / (client.frames_sent - frames)
+    server.stop()
+    return statistics.median(samples), writes_per_request
+
+
+def main(bursts: int, burst: int) -> None:
+    port = serve_in_process()
+    for name, connection_cls, cork in (
+        ("nodelay", Connection, False),
+        ("nagle", NagleConnection, False),
+        ("nodelay+cork", Connection, True),
+    ):
+        latency, writes = measure(
+            connection_cls("127.0.0.1", port), bursts, burst, cork
+        )
+        print(
+            f"{name:<14} burst p50 {latency * 1e3:7.3f} ms  "
+            f"{writes:5.2f} writes/request"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bursts", type=int, default=200)
+    parser.add_argument("--burst", type=int, default=20)
+    args = parser.parse_args()
+
+    main(args.bursts, args.burst)
@@ -25,7 +25,74 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
 
-from .asyncserver import AsyncServer
-from .client import Client
-from .connection import AsyncConnection, Connection
-from .server import ThreadedServer
+import importlib
+import typing
+
+# the public names and the modules they are imported from on first access, so that
+# `import dap` does not load the client and its models up front
+_EXPORTS = {
+    "AsyncServer": "asyncserver",
+    "Client": "client",
+    "AsyncConnection": "connection",
+    "AsyncFdConnection": "connection",
+    "AsyncUnixConnection": "connection",
+    "CloneUnsupported": "connection",
+    "Connection": "connection",
+    "FdConnection": "connection",
+    "UnixConnection": "connection",
+    "AsyncLoopbackConnection": "fake",
+    "FakeAdapter": "fake",
+    "LoopbackConnection": "fake",
+    "ClientMetrics": "metrics",
+    "SessionPool": "pool",
+    "HandlerProfiler": "profiling",
+    "Proxy": "proxy",
+    "Recorder": "recorder",
+    "Replayer": "recorder",
+    "TraceReader": "recorder",
+    "ThreadedServer": "server",
+    "SessionManager": "sessions",
+    "AsyncStdioConnection": "stdio",
+    "StdioConnection": "stdio",
+    "TerminalExecutor": "terminal",
+    "Tracer": "tracing",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str) -> typing.Any:
+    if (module := _EXPORTS.get(name)) is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
+
+
+if typing.TYPE_CHECKING:
+    from .asyncserver import AsyncServer
+    from .client import Client
+    from .connection import (
+        AsyncConnection,
+        AsyncFdConnection,
+        AsyncUnixConnection,
+        CloneUnsupported,
+        Connection,
+        FdConnection,
+        UnixConnection,
+    )
+    from .fake import AsyncLoopbackConnection, FakeAdapter, LoopbackConnection
+    from .metrics import ClientMetrics
+    from .pool import SessionPool
+    from .profiling import HandlerProfiler
+    from .proxy import Proxy
+    from .recorder import Recorder, Replayer, TraceReader
+    from .server import ThreadedServer
+    from .sessions import SessionManager
+    from .stdio import AsyncStdioConnection, StdioConnection
+    from .terminal import TerminalExecutor
+    from .tracing import Tracer
@@ -1,4 +1,5 @@
 import asyncio
+import threading
 from typing import Optional
 
 from .client import Client
@@ -23,42 +24,122 @@ class AsyncServer:
     """
 
     def __init__(
-        self, adapter_id: str, host: str = "localhost", port: int = 6789
+        self,
+        adapter_id: str,
+        host: str = "localhost",
+        port: int = 6789,
+        connection: Optional[AsyncConnection] = None,
     ) -> None:
-        self.connection = AsyncConnection(host, port)
+        """Initializes the server.
+
+        Args:
+            adapter_id: The adapter id.
+            host: The host to connect to.
+            port: The port to connect to.
+            connection: The transport to use instead of a TCP connection to host and port, \
+                e.g. an `AsyncStdioConnection`.
+        """
+
+        self.connection = connection or AsyncConnection(host, port)
         self.client = Client(adapter_id)
         self.running = False
         self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._send_ready: Optional[asyncio.Event] = None
+        self._delivered: Optional[asyncio.Event] = None
 
     async def start(self):
         """Start the server."""
 
-        await self.connection.start()
+        await self._connect()
+        self.client.on_send = self._wake_writer
+        await self._run_loop()
+
+    async def _connect(self):
+        if self.connection.transport is None:
+            await self.connection.start()
         self.running = True
         self.loop = asyncio.get_running_loop()
-        await self._run_loop()
+        self._loop_thread = threading.get_ident()
+        self._send_ready = asyncio.Event()
+        self._delivered = asyncio.Event()
+        self.connection.bind(self.client, self._deliver)
+
+    def _deliver(self, message):
+        self._delivered.set()
+        self.handle_message(message)
 
     async def stop(self):
         """Stop the server."""
 
         self.running = False
+        self.client.on_send = None
+        self.client.flush()
         self.client.terminate()
+        if s := self.client.send():
+            await self.connection.write(s)
         await self.connection.stop()
 
+    def _wake_writer(self):
+        if self._loop_thread == threading.get_ident():
+            self._send_ready.set()
+        else:
+            # requests may be queued from other threads than the loop's
+            self.loop.call_soon_threadsafe(self._send_ready.set)
+
     async def _run_loop(self):
+        writer = asyncio.create_task(self._write_loop())
+        try:
+            await self._read_loop()
+        finally:
+            writer.cancel()
+
+    async def _read_loop(self):
+        # the bound connection feeds the client and calls handle_message itself
+        await self.connection.wait_closed()
+
+    async def _write_loop(self):
+        # data queued before the loop started, e.g. the initialize request
+        self._send_ready.set()
+
         while self.running and self.connection.alive:
-            await self.run_single()
-            await asyncio.sleep(0.1)
+            await self._send_ready.wait()
+            self._send_ready.clear()
+
+            if s := self.client.send():
+                await self.connection.write(s)
 
     async def run_single(self):
-        s = self.client.send()
-        if s:
-            await self.connection.write(s)
+        """Flush queued requests, then wait until messages from the adapter were handled.
 
-        r = await self.connection.read()
-        for event in self.client.receive(r):
-            self.handle_message(event)
+        For driving the server step by step instead of with `start`. The connection is
+        started and bound to the client on the first call, and from then on messages are
+        passed to `handle_message` as soon as they are received.
 
+        Returns:
+            False once the connection is closed.
+        """
+
+        if self._delivered is None:
+            await self._connect()
+        self._delivered.clear()
+
+        if s := self.client.send():
+            await self.connection.write(s)
+        if not self.connection.alive:
+            return False
+
+        received = asyncio.ensure_future(self._delivered.wait())
+        closed = asyncio.ensure_future(self.connection.wait_closed())
+        done, _ = await asyncio.wait(
+            (received, closed), return_when=asyncio.FIRST_COMPLETED
+        )
+        received.cancel()
+        closed.cancel()
+        if closed in done:
+            # raises the exception that broke the connection, if any
+            closed.result()
+            return False
         return True
 
     def handle_message(self, message):
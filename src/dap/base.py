@@ -3,12 +3,13 @@ from __future__ import annotations
 from enum import StrEnum
 from typing import Any, Literal, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import Field
 
+from .model import DAPModel
 from .types import Message
 
 
-class ProtocolMessage(BaseModel):
+class ProtocolMessage(DAPModel):
     """Base class of requests, responses, and events"""
 
     seq: int = Field(..., description="Sequence number (message ID) of the message.")
@@ -17,7 +18,7 @@ class ProtocolMessage(BaseModel):
     )
 
 
-class RequestArguments(BaseModel):
+class RequestArguments(DAPModel):
     """Base class of request arguments"""
 
 
@@ -35,7 +36,7 @@ class Request(ProtocolMessage):
         ...
 
 
-class EventBody(BaseModel):
+class EventBody(DAPModel):
     """Base class of event bodies"""
 
     ...
@@ -49,7 +50,7 @@ class Event(ProtocolMessage):
     )
 
 
-class ResponseBody(BaseModel):
+class ResponseBody(DAPModel):
     """Base class of response bodies"""
 
     ...
@@ -72,7 +73,7 @@ class Response(ProtocolMessage):
     )
 
 
-class ErrorBody(BaseModel):
+class ErrorBody(DAPModel):
     error: Optional[Message] = Field(
         None,
         description="Error details.",
@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import time
+import typing
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+from .base import ErrorResponse, Requests
+
+if typing.TYPE_CHECKING:
+    from .client import Client
+
+
+@dataclass
+class SourceLoadResult:
+    """Outcome of a single request sent by the `BreakpointLoader`."""
+
+    command: str
+    source: Optional[Any] = None
+    requested: int = 0
+    verified: int = 0
+    error: Optional[str] = None
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class _PendingLoad:
+    command: str
+    arguments: dict[str, Any]
+    result: SourceLoadResult
+    sent_at: float = field(default=0.0)
+
+
+class BreakpointLoader:
+    """Restores large breakpoint sets with bounded in-flight concurrency.
+
+    Every source becomes one `setBreakpoints` request and function/data breakpoints
+    become one request each. At most `max_in_flight` of them are left unanswered at
+    any time, the next one is queued as soon as a response arrives.
+
+    The loader does no I/O itself, it only queues requests on the client. The responses
+    still have to be fed to `Client.receive` by whatever drives the connection.
+
+    Example:
+
+    ```python
+    loader = client.load_breakpoints(
+        [({"path": "main.py"}, [{"line": 10}, {"line": 20}])],
+        on_complete=lambda loader: client.configuration_done(),
+    )
+    ```
+    """
+
+    def __init__(
+        self,
+        client: Client,
+        max_in_flight: int = 64,
+        on_progress: Optional[Callable[[SourceLoadResult, int, int], None]] = None,
+        on_complete: Optional[Callable[[BreakpointLoader], None]] = None,
+    ) -> None:
+        """Initializes the loader.
+
+        Args:
+            client: The client to queue the requests on.
+            max_in_flight: The maximum number of unanswered requests at any time.
+            on_progress: Called with the result, the number of finished and total requests \
+                each time a request completes.
+            on_complete: Called with the loader once every request has completed.
+        """
+
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+
+        self.client = client
+        self.max_in_flight = max_in_flight
+        self.on_progress = on_progress
+        self.on_complete = on_complete
+
+        self.results: list[SourceLoadResult] = []
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+        self._queue: deque[_PendingLoad] = deque()
+        self._in_flight = 0
+        self._finished = 0
+
+    def add_source(self, source: Any, breakpoints: list[Any]) -> None:
+        """Add the breakpoints of a single source.
+
+        Args:
+            source: The source location of the breakpoints.
+            breakpoints: The code locations of the breakpoints.
+        """
+
+        self._add(
+            Requests.SETBREAKPOINTS,
+            {"source": source, "breakpoints": breakpoints},
+            source,
+            len(breakpoints),
+        )
+
+    def add_function_breakpoints(self, breakpoints: list[Any]) -> None:
+        """Add the function breakpoints, replacing all existing ones when loaded."""
+
+        self._add(
+            Requests.SETFUNCTIONBREAKPOINTS,
+            {"breakpoints": breakpoints},
+            None,
+            len(breakpoints),
+        )
+
+    def add_data_breakpoints(self, breakpoints: list[Any]) -> None:
+        """Add the data breakpoints, replacing all existing ones when loaded."""
+
+        self._add(
+            Requests.SETDATABREAKPOINTS,
+            {"breakpoints": breakpoints},
+            None,
+            len(breakpoints),
+        )
+
+    def _add(
+        self, command: str, arguments: dict[str, Any], source: Any, requested: int
+    ) -> None:
+        result = SourceLoadResult(command=command, source=source, requested=requested)
+        self.results.append(result)
+        self._queue.append(_PendingLoad(command, arguments, result))
+
+    def start(self) -> None:
+        """Queue the first batch of requests on the client."""
+
+        self.started_at = time.perf_counter()
+        self._fill()
+        if self.done:
+            self._complete()
+
+    @property
+    def total(self) -> int:
+        return len(self.results)
+
+    @property
+    def finished(self) -> int:
+        return self._finished
+
+    @property
+    def done(self) -> bool:
+        return self.started_at is not None and self._finished == len(self.results)
+
+    @property
+    def elapsed(self) -> Optional[float]:
+        """Time in seconds the whole restore took, `None` while still loading."""
+
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+    @property
+    def failures(self) -> list[SourceLoadResult]:
+        return [result for result in self.results if not result.ok]
+
+    def _fill(self) -> None:
+        while self._queue and self._in_flight < self.max_in_flight:
+            pending = self._queue.popleft()
+            pending.sent_at = time.perf_counter()
+            self._in_flight += 1
+            self.client.send_request(
+                pending.command,
+                pending.arguments,
+                lambda response, pending=pending: self._on_response(pending, response),
+            )
+
+    def _on_response(self, pending: _PendingLoad, response: Any) -> None:
+        result = pending.result
+        result.elapsed = time.perf_counter() - pending.sent_at
+
+        if isinstance(response, ErrorResponse):
+            result.error = response.message or "request failed"
+            if response.body.error is not None:
+                result.error = response.body.error.format
+        else:
+            result.verified = sum(
+                1
+                for breakpoint in response.breakpoints
+                if getattr(breakpoint, "verified", True)
+            )
+
+        self._in_flight -= 1
+        self._finished += 1
+        if self.on_progress is not None:
+            self.on_progress(result, self._finished, len(self.results))
+
+        self._fill()
+        if self.done:
+            self._complete()
+
+    def _complete(self) -> None:
+        self.finished_at = time.perf_counter()
+        if self.on_complete is not None:
+            self.on_complete(self)
+
+    def __repr__(self) -> str:
+        return (
+            f"<BreakpointLoader finished={self._finished}/{len(self.results)} "
+            f"failures={len(self.failures)} elapsed={self.elapsed!r}>"
+        )
@@ -1,10 +1,30 @@
 import json
-from typing import Optional
+from typing import Any, Optional
+
+from pydantic import BaseModel
 
 CONTENT_ENCODING = "utf-8"
 
 
-class Buffer(bytearray): ...
+def _encode_model(obj: Any) -> Any:
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(exclude_none=True)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class Buffer(bytearray):
+    """An encoded message, headers included, ready to be sent."""
+
+    def _encode(self, content: dict[str, Any]) -> None:
+        self.content = content
+        self.encoded = json.dumps(content, default=_encode_model).encode(
+            CONTENT_ENCODING
+        )
+        self.headers = f"Content-Length: {len(self.encoded)}\r\n\r\n".encode(
+            CONTENT_ENCODING
+        )
+
+        super().extend(self.headers + self.encoded)
 
 
 class RequestBuffer(Buffer):
@@ -19,25 +39,282 @@ class RequestBuffer(Buffer):
         self.command = command
         self.arguments = arguments
 
-        self.content = {
+        content = {
             "seq": self.seq,
             "type": "request",
             "command": self.command,
         }
 
         if self.arguments:
-            self.content["arguments"] = {
+            content["arguments"] = {
                 i: self.arguments[i]
                 for i in self.arguments
                 if self.arguments[i] is not None
             }
 
-        self.encoded = json.dumps(self.content).encode(CONTENT_ENCODING)
-        self.headers = f"Content-Length: {len(self.encoded)}\r\n\r\n".encode(
-            CONTENT_ENCODING
-        )
-
-        super().extend(self.headers + self.encoded)
+        self._encode(content)
 
     def __repr__(self) -> str:
         return f"<RequestBuffer method={self.command!r} params={self.arguments!r}>"
+
+
+# requests sent over and over while stepping and inspecting, encoded from templates
+TEMPLATED_REQUESTS = frozenset(
+    {
+        "continue",
+        "next",
+        "stepIn",
+        "stepOut",
+        "pause",
+        "threads",
+        "stackTrace",
+        "scopes",
+        "variables",
+        "evaluate",
+    }
+)
+
+
+class RequestTemplate:
+    """The encoding of a request prepared once, for a command and the arguments set.
+
+    The constant parts of the message are encoded when the template is created, only
+    the sequence number and the values of the arguments are encoded and spliced in for
+    every request. The result is the same as that of `RequestBuffer`.
+    """
+
+    def __init__(self, command: str, keys: Optional[tuple[str, ...]]) -> None:
+        """Initializes the template.
+
+        Args:
+            command: The command of the request.
+            keys: The names of the arguments that are set, in order, or `None` to \
+                send the request without arguments.
+        """
+
+        self.command = command
+        self.keys = keys
+
+        head = f', "type": "request", "command": {json.dumps(command)}'
+        if keys is None:
+            self._parts = [head + "}"]
+            return
+
+        head += ', "arguments": {'
+        if not keys:
+            self._parts = [head + "}}"]
+            return
+
+        separators = [head] + [", "] * (len(keys) - 1)
+        self._parts = [
+            f"{separator}{json.dumps(key)}: "
+            for separator, key in zip(separators, keys)
+        ]
+        self._parts.append("}}")
+
+    def encode(self, seq: int, values: list[Any]) -> bytes:
+        """The message for a request, headers included.
+
+        Args:
+            seq: The sequence number of the request.
+            values: The values of the arguments, in the order of the keys.
+        """
+
+        pieces = ['{"seq": ', str(seq)]
+        for part, value in zip(self._parts, values):
+            pieces.append(part)
+            kind = type(value)
+            if kind is int:
+                pieces.append(str(value))
+            elif kind is bool:
+                pieces.append("true" if value else "false")
+            else:
+                pieces.append(json.dumps(value, default=_encode_model))
+        pieces.append(self._parts[-1])
+
+        encoded = "".join(pieces).encode(CONTENT_ENCODING)
+        return b"Content-Length: %d\r\n\r\n%b" % (len(encoded), encoded)
+
+    def __repr__(self) -> str:
+        return f"<RequestTemplate method={self.command!r} keys={self.keys!r}>"
+
+
+_templates: dict[tuple[str, Optional[tuple[str, ...]]], RequestTemplate] = {}
+
+
+def encode_request(
+    seq: int, command: str, arguments: Optional[dict[str, Any]] = None
+) -> bytes:
+    """Encode a request like `RequestBuffer`, from a template for templated commands.
+
+    Args:
+        seq: The sequence number of the request.
+        command: The command of the request.
+        arguments: The arguments of the request, those that are `None` are left out.
+    """
+
+    if command not in TEMPLATED_REQUESTS:
+        return RequestBuffer(seq, command, arguments)
+
+    if arguments:
+        keys = tuple(key for key, value in arguments.items() if value is not None)
+        values = [arguments[key] for key in keys]
+    else:
+        keys = None
+        values = []
+
+    if (template := _templates.get((command, keys))) is None:
+        template = _templates[command, keys] = RequestTemplate(command, keys)
+    return template.encode(seq, values)
+
+
+class ResponseBuffer(Buffer):
+    """A response to a reverse request of the debug adapter."""
+
+    def __init__(
+        self,
+        seq: int,
+        request_seq: int,
+        command: str,
+        success: bool,
+        body: Optional[Any] = None,
+        message: Optional[str] = None,
+    ) -> None:
+        super().__init__()
+        self.seq = seq
+        self.request_seq = request_seq
+        self.command = command
+        self.success = success
+
+        content = {
+            "seq": seq,
+            "type": "response",
+            "request_seq": request_seq,
+            "success": success,
+            "command": command,
+        }
+        if message is not None:
+            content["message"] = message
+        if body is not None:
+            content["body"] = body
+
+        self._encode(content)
+
+    def __repr__(self) -> str:
+        return (
+            f"<ResponseBuffer method={self.command!r} request_seq={self.request_seq} "
+            f"success={self.success}>"
+        )
+
+
+HEADER_DELIMITER = b"\r\n\r\n"
+
+
+class ReceiveBuffer:
+    """Reusable buffer for incoming data that frames messages in place.
+
+    Data is either copied in with `extend`, or read straight into the free space handed
+    out by `get_buffer` and then committed with `commit`, like `asyncio.BufferedProtocol`
+    does. Complete messages are taken out with `pop_frame` as memoryviews of the buffer,
+    so no intermediate bytes objects are created per chunk.
+
+    The space is only compacted or grown when more room is requested, so a view returned
+    by `pop_frame` stays valid until the next call to `get_buffer` or `extend`.
+    """
+
+    def __init__(self, size: int = 65536, read_size: int = 65536) -> None:
+        """Initializes the buffer.
+
+        Args:
+            size: The initial capacity in bytes.
+            read_size: The minimum free space handed out by `get_buffer`.
+        """
+
+        self._data = bytearray(size)
+        self._start = 0
+        self._end = 0
+        self.read_size = read_size
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    def __bytes__(self) -> bytes:
+        return bytes(self._data[self._start : self._end])
+
+    @property
+    def capacity(self) -> int:
+        return len(self._data)
+
+    def get_buffer(self, sizehint: int = -1) -> memoryview:
+        """Get a writable view of the free space at the end of the buffer.
+
+        Args:
+            sizehint: The minimum size of the view, non-positive values mean no preference.
+        """
+
+        self._reserve(max(sizehint, self.read_size))
+        return memoryview(self._data)[self._end :]
+
+    def commit(self, nbytes: int) -> None:
+        """Mark `nbytes` written into the last view from `get_buffer` as received."""
+
+        self._end += nbytes
+
+    def extend(self, data: bytes | bytearray | memoryview) -> None:
+        """Copy received data into the buffer."""
+
+        size = len(data)
+        self._reserve(size)
+        self._data[self._end : self._end + size] = data
+        self._end += size
+
+    def clear(self) -> None:
+        self._start = self._end = 0
+
+    def pop_frame(self) -> Optional[memoryview]:
+        """Take the content of the next complete message out of the buffer.
+
+        Returns:
+            A view of the message content, or `None` if no complete message is buffered.
+        """
+
+        data = self._data
+        header_end = data.find(HEADER_DELIMITER, self._start, self._end)
+        if header_end < 0:
+            return None
+
+        content_start = header_end + len(HEADER_DELIMITER)
+        content_end = content_start + self._content_length(header_end)
+        if content_end > self._end:
+            # more data is needed to complete the message
+            return None
+
+        self._start = content_end
+        return memoryview(data)[content_start:content_end]
+
+    def _content_length(self, header_end: int) -> int:
+        for line in self._data[self._start : header_end].split(b"\r\n"):
+            name, _, value = line.partition(b":")
+            if name.strip().lower() == b"content-length":
+                return int(value)
+
+        raise ValueError("Message without Content-Length header")
+
+    def _reserve(self, size: int) -> None:
+        if len(self._data) - self._end >= size:
+            return
+
+        pending = self._end - self._start
+        if len(self._data) - pending >= size and pending <= self._start:
+            # enough room once the pending data is moved to the front
+            self._data[:pending] = memoryview(self._data)[self._start : self._end]
+        else:
+            capacity = len(self._data)
+            while capacity - pending < size:
+                capacity *= 2
+
+            data = bytearray(capacity)
+            data[:pending] = memoryview(self._data)[self._start : self._end]
+            self._data = data
+
+        self._start, self._end = 0, pending
@@ -1,9 +1,25 @@
-from typing import Generator, Optional
-
-from .base import EventBody, Request, ResponseBody
-from .buffer import RequestBuffer
-from .handler import Handler
+import threading
+from typing import Callable, Generator, Iterable, Optional
+
+from .base import (
+    ErrorBody,
+    ErrorResponse,
+    EventBody,
+    Request,
+    Requests,
+    Response,
+    ResponseBody,
+)
+from .breakpoints import BreakpointLoader, SourceLoadResult
+from .buffer import ReceiveBuffer, ResponseBuffer, encode_request
+from .handler import SUPERSEDABLE_REQUESTS, Handler
+from .metrics import ClientMetrics
+from .profiling import HandlerProfiler
+from .recorder import SENT, Recorder
 from .requests import AttachRequestArguments, LaunchRequestArguments
+from .stacktrace import StackFetcher
+from .terminal import TerminalExecutor
+from .tracing import Tracer
 from .types import *
 
 
@@ -25,6 +41,12 @@ class Client:
         lines_start_at1: Optional[bool] = None,
         columns_start_at1: Optional[bool] = None,
         path_format: Optional[Literal["path", "uri"] | str] = None,
+        cancel_superseded: bool = True,
+        terminal: Optional[TerminalExecutor] = None,
+        recorder: Optional[Recorder] = None,
+        metrics: Optional[ClientMetrics] = None,
+        tracer: Optional[Tracer] = None,
+        profiler: Optional[HandlerProfiler] = None,
     ) -> None:
         """Initializes the debug adapter client.
 
@@ -36,12 +58,63 @@ class Client:
             lines_start_at1: Whether the lines start at 1.
             columns_start_at1: Whether the columns start at 1.
             path_format: The format of the paths.
+            cancel_superseded: Whether `stackTrace`, `scopes`, `variables` and `evaluate` \
+                requests still pending when the debuggee resumes are cancelled and their \
+                responses dropped. Their callbacks are called with a `cancelled` error \
+                right away. When a single thread resumes, only the requests known to \
+                read from that thread are.
+            terminal: Answers `runInTerminal` requests of the debug adapter, they are \
+                still yielded from `receive` but must not be replied to again.
+            recorder: Logs the data sent and the messages received, e.g. to replay \
+                the session later. Can also be set as `recorder` afterwards.
+            metrics: Counts the requests, responses, events and bytes, and times \
+                the requests. Can also be set as `metrics` afterwards.
+            tracer: Traces the lifecycle of the requests and the handling of the \
+                messages, e.g. to open it as a timeline. Can also be set as `tracer` \
+                afterwards.
+            profiler: Times decoding, classifying and validating the received \
+                messages. Can also be set, or unset, as `profiler` at any time.
         """
 
         self._seq: int = 1
         self._send_buf = bytearray()
-        self._receive_buf = bytearray()
+        self._send_lock = threading.Lock()
+        self._receive_buf = ReceiveBuffer()
         self._pending_requests: dict[int, Request] = {}
+        self._response_callbacks: dict[
+            int, Callable[[ResponseBody | ErrorResponse], None]
+        ] = {}
+        self.capabilities: Optional[Capabilities] = None
+
+        # called whenever new data is queued, so that I/O loops can flush it right away
+        self.on_send: Optional[Callable[[], None]] = None
+        self._corked = False
+        self._queued_frames = 0
+
+        # the number of messages returned by `send` so far, and of `send` calls they
+        # were returned by, e.g. to compare with the writes of the transport
+        self.frames_sent = 0
+        self.sends = 0
+
+        self.cancel_superseded = cancel_superseded
+        self.terminal = terminal
+        self.recorder = recorder
+        self.metrics = metrics
+        self.tracer = tracer
+        self.profiler = profiler
+        self._stop_epoch: int = 0
+        self._resumed = False
+        self._request_epochs: dict[int, int] = {}
+        # the threads that pending supersedable requests read from, if known, and the
+        # threads the frames and variable references seen in the current stops belong to
+        self._request_threads: dict[int, int] = {}
+        self._frame_threads: dict[int, int] = {}
+        self._reference_threads: dict[int, int] = {}
+        # threads resumed on their own since all threads last resumed
+        self._running_threads: set[int] = set()
+        # superseded requests whose responses are still due, with the epoch they were
+        # superseded in
+        self._dropped_requests: dict[int, int] = {}
 
         self.handler = Handler(self)
 
@@ -65,7 +138,10 @@ class Client:
         )
 
     def send_request(
-        self, command: str, arguments: Optional[dict[str, Any]] = None
+        self,
+        command: str,
+        arguments: Optional[dict[str, Any]] = None,
+        callback: Optional[Callable[[ResponseBody | ErrorResponse], None]] = None,
     ) -> int:
         """Send a request to the debug adapter.
 
@@ -75,20 +151,248 @@ class Client:
         Args:
             command: The command to send.
             arguments: The arguments to send.
+            callback: Called with the response, see `on_response`.
 
         Returns:
             The sequence number of the request.
         """
 
-        seq = self._seq
-        self._seq += 1
+        with self._send_lock:
+            seq = self._seq
+            self._seq += 1
+
+            # register before queueing, the response may arrive on another thread
+            self._pending_requests[seq] = Request(
+                seq=seq, command=command, arguments=arguments
+            )
+            if command in SUPERSEDABLE_REQUESTS:
+                self._request_epochs[seq] = self._stop_epoch
+                thread_id = self._thread_of(command, arguments)
+                if thread_id is not None:
+                    self._request_threads[seq] = thread_id
+            if callback is not None:
+                self._response_callbacks[seq] = callback
+            if self.metrics is not None:
+                # started before the request can be sent and answered
+                self.metrics.request_sent(seq, command)
+            if self.tracer is not None:
+                self.tracer.queued(seq, command, self._stop_epoch)
+            self._send_buf += encode_request(seq, command, arguments)
+            self._queued_frames += 1
+
+        self._notify()
+        return seq
+
+    def respond(self, response: Response) -> int:
+        """Send the response to a reverse request of the debug adapter.
 
-        self._send_buf += RequestBuffer(seq, command, arguments)
-        self._pending_requests[seq] = Request(
-            seq=seq, command=command, arguments=arguments
-        )
+        E.g. the result of `StartDebuggingRequest.reply`. The sequence number of the
+        response is assigned by the client, the body is encoded like request arguments.
+        Safe to call from any thread.
+
+        Args:
+            response: The response to send.
+
+        Returns:
+            The sequence number of the response.
+        """
+
+        with self._send_lock:
+            seq = self._seq
+            self._seq += 1
+            self._send_buf += ResponseBuffer(
+                seq,
+                response.request_seq,
+                response.command,
+                response.success,
+                response.body,
+                response.message,
+            )
+            self._queued_frames += 1
+
+        self._notify()
         return seq
 
+    def on_response(
+        self, seq: int, callback: Callable[[ResponseBody | ErrorResponse], None]
+    ) -> None:
+        """Register a callback for the response to a request.
+
+        The callback is called with the validated response body (or the `ErrorResponse`)
+        once the response is received, before it is yielded from `receive`. If the request
+        is superseded when the debuggee resumes, it is called with an `ErrorResponse` whose
+        message is `cancelled` instead, and the response is dropped when it arrives.
+
+        Args:
+            seq: The sequence number of the request.
+            callback: The function to call with the response.
+        """
+
+        self._response_callbacks[seq] = callback
+
+    @property
+    def stop_epoch(self) -> int:
+        """The number of times the debuggee was resumed so far.
+
+        Requests sent while the debuggee is stopped belong to the current epoch."""
+
+        return self._stop_epoch
+
+    def _thread_of(
+        self, command: str, arguments: Optional[dict[str, Any]]
+    ) -> Optional[int]:
+        arguments = arguments or {}
+        if command == Requests.STACKTRACE:
+            return arguments.get("threadId")
+        if command == Requests.VARIABLES:
+            return self._reference_threads.get(arguments.get("variablesReference"))
+        return self._frame_threads.get(arguments.get("frameId"))
+
+    def _track_threads(self, request: Request, result: ResponseBody) -> None:
+        """Remember which thread the frames and variable references of a result are of.
+
+        Only results of requests whose thread is known are tracked, e.g. the scopes of a
+        frame from a `stackTrace` response."""
+
+        thread_id = self._thread_of(request.command, request.arguments)
+        if thread_id is None:
+            return
+
+        match request.command:
+            case Requests.STACKTRACE:
+                for frame in result.stackFrames:
+                    self._frame_threads[frame.id] = thread_id
+            case Requests.SCOPES:
+                for scope in result.scopes:
+                    self._reference_threads[scope.variablesReference] = thread_id
+            case Requests.VARIABLES:
+                for variable in result.variables:
+                    if variable.variablesReference:
+                        self._reference_threads[variable.variablesReference] = thread_id
+            case Requests.EVALUATE:
+                if result.variablesReference:
+                    self._reference_threads[result.variablesReference] = thread_id
+
+    def _supersede(self, thread_id: Optional[int] = None) -> None:
+        """The debuggee resumed, so results of the previous stop are obsolete.
+
+        Called for every sign of a resume, e.g. both the `continue` response and the
+        `continued` event, so requests sent in between, while the debuggee was already
+        running, are superseded too. Only the first one starts a new epoch.
+
+        Args:
+            thread_id: The thread that resumed on its own, `None` if all threads did. \
+                Only the requests known to read from that thread are superseded then.
+        """
+
+        if thread_id is None:
+            resumed = not self._resumed
+            self._resumed = True
+            self._running_threads.clear()
+            self._frame_threads.clear()
+            self._reference_threads.clear()
+        else:
+            resumed = not self._resumed and thread_id not in self._running_threads
+            self._running_threads.add(thread_id)
+            for threads in (self._frame_threads, self._reference_threads):
+                for key in [key for key, id in threads.items() if id == thread_id]:
+                    del threads[key]
+        if resumed:
+            self._stop_epoch += 1
+        if not self.cancel_superseded or not self._request_epochs:
+            return
+
+        if thread_id is None:
+            obsolete = list(self._request_epochs)
+            self._request_epochs.clear()
+            self._request_threads.clear()
+        else:
+            obsolete = [
+                seq for seq, id in self._request_threads.items() if id == thread_id
+            ]
+            for seq in obsolete:
+                del self._request_epochs[seq], self._request_threads[seq]
+        for seq in obsolete:
+            self._dropped_requests[seq] = self._stop_epoch
+
+        if self.capabilities and self.capabilities.supportsCancelRequest:
+            for seq in obsolete:
+                self.cancel(request_id=seq)
+
+        # the responses will never be delivered, so whoever waits for them must know now
+        for seq in obsolete:
+            callback = self._response_callbacks.pop(seq, None)
+            request = self._pending_requests.get(seq)
+            if callback is not None and request is not None:
+                callback(
+                    ErrorResponse(
+                        seq=0,
+                        request_seq=seq,
+                        success=False,
+                        command=request.command,
+                        message="cancelled",
+                        body=ErrorBody(),
+                    )
+                )
+
+    def _drop_response(self, request_seq: int) -> bool:
+        """Forget a request whose response is no longer wanted.
+
+        Returns:
+            Whether the response should be dropped.
+        """
+
+        if request_seq in self._dropped_requests:
+            del self._dropped_requests[request_seq]
+            self._forget(request_seq)
+            return True
+
+        # superseded long ago and forgotten at a later stop
+        return request_seq not in self._pending_requests
+
+    def _stopped(self, thread_id: Optional[int], all_threads: bool) -> None:
+        """The debuggee stopped, so the next resume starts a new epoch.
+
+        Requests superseded before the last resume are forgotten, whether or not their
+        responses arrived, e.g. if the adapter never answered the cancelled ones.
+
+        Args:
+            thread_id: The thread that stopped.
+            all_threads: Whether all threads stopped.
+        """
+
+        self._resumed = False
+        if all_threads:
+            self._running_threads.clear()
+        else:
+            self._running_threads.discard(thread_id)
+        stale = [
+            seq
+            for seq, epoch in list(self._dropped_requests.items())
+            if epoch < self._stop_epoch
+        ]
+        for seq in stale:
+            del self._dropped_requests[seq]
+            self._forget(seq)
+
+    def _forget(self, seq: int) -> None:
+        self._pending_requests.pop(seq, None)
+        self._response_callbacks.pop(seq, None)
+        if self.metrics is not None:
+            self.metrics.request_superseded(seq)
+        if self.tracer is not None:
+            self.tracer.dropped(seq)
+
+    def _update_capabilities(self, capabilities: Capabilities) -> None:
+        if self.capabilities is None:
+            self.capabilities = Capabilities.model_validate(
+                capabilities.model_dump(exclude_unset=True)
+            )
+        else:
+            self.capabilities = self.capabilities.model_copy(
+                update=capabilities.model_dump(exclude_unset=True)
+            )
+
     def receive(self, data: bytes) -> Generator[ResponseBody | EventBody, None, None]:
         """Feed data from the debug adapter to the client.
 
@@ -99,9 +403,52 @@ class Client:
             The response or event body.
         """
 
-        self._receive_buf += data
+        self._receive_buf.extend(data)
         yield from self.handler.handle()
 
+    def get_buffer(self, sizehint: int = -1) -> memoryview:
+        """Get a writable view of the receive buffer to read data from the debug adapter into.
+
+        Together with `buffer_updated` this allows reading directly into the client
+        without copying, e.g. from an `asyncio.BufferedProtocol` or `socket.recv_into`.
+        The view must not be used after `buffer_updated` is called.
+
+        Args:
+            sizehint: The minimum size of the view, non-positive values mean no preference.
+        """
+
+        return self._receive_buf.get_buffer(sizehint)
+
+    def buffer_updated(
+        self, nbytes: int
+    ) -> Generator[ResponseBody | EventBody, None, None]:
+        """Feed data written into the view from `get_buffer` to the client.
+
+        The data is committed right away, the messages are parsed as the returned
+        generator is consumed.
+
+        Args:
+            nbytes: The number of bytes written into the view.
+
+        Returns:
+            A generator of the response or event bodies.
+        """
+
+        self._receive_buf.commit(nbytes)
+        return self.handler.handle()
+
+    def messages(self) -> Generator[ResponseBody | EventBody, None, None]:
+        """Parse the messages already received but not yet handled.
+
+        Messages are parsed lazily as the generator is consumed, so a caller can handle
+        a limited number at a time and come back for the rest later.
+
+        Returns:
+            A generator of the response or event bodies.
+        """
+
+        return self.handler.handle()
+
     def send(self) -> bytes:
         """Get the data to send to the debug adapter.
 
@@ -109,10 +456,123 @@ class Client:
             The data to send.
         """
 
-        send_buf = self._send_buf
-        self._send_buf = bytearray()
+        with self._send_lock:
+            if self._corked or not self._send_buf:
+                return b""
+
+            send_buf = self._send_buf
+            self._send_buf = bytearray()
+            self.frames_sent += self._queued_frames
+            self.sends += 1
+            self._queued_frames = 0
+            if self.tracer is not None:
+                self.tracer.written()
+
+        if self.recorder is not None:
+            self.recorder.record(SENT, send_buf)
+        if self.metrics is not None:
+            self.metrics.bytes_sent += len(send_buf)
         return send_buf
 
+    def cork(self) -> None:
+        """Hold back queued messages until `flush` is called.
+
+        Use around bursts of requests, so they are sent in a single write instead of
+        as many as the I/O loop manages to wake up for in between.
+        """
+
+        self._corked = True
+
+    def flush(self) -> None:
+        """Release the messages held back since `cork`, waking up the I/O loop."""
+
+        self._corked = False
+        self._notify()
+
+    def _notify(self) -> None:
+        if self.on_send is not None and not self._corked and self._send_buf:
+            self.on_send()
+
+    def load_breakpoints(
+        self,
+        source_breakpoints: Iterable[tuple[Source, List[SourceBreakpoint]]] = (),
+        function_breakpoints: Optional[List[FunctionBreakpoint]] = None,
+        data_breakpoints: Optional[List[DataBreakpoint]] = None,
+        max_in_flight: int = 64,
+        on_progress: Optional[Callable[[SourceLoadResult, int, int], None]] = None,
+        on_complete: Optional[Callable[[BreakpointLoader], None]] = None,
+    ) -> BreakpointLoader:
+        """Restore a whole breakpoint set with bounded in-flight concurrency.
+
+        Instead of waiting for each `setBreakpoints` round trip, up to `max_in_flight`
+        requests are kept queued and the rest are sent as responses arrive.
+
+        Args:
+            source_breakpoints: Pairs of source and the breakpoints to set in that source.
+            function_breakpoints: The function breakpoints to set, if any.
+            data_breakpoints: The data breakpoints to set, if any.
+            max_in_flight: The maximum number of unanswered requests at any time.
+            on_progress: Called with the result, the number of finished and total requests \
+                each time a request completes.
+            on_complete: Called with the loader once every request has completed.
+
+        Returns:
+            The loader, which holds the per-source results and timing of the restore.
+        """
+
+        loader = BreakpointLoader(
+            self,
+            max_in_flight=max_in_flight,
+            on_progress=on_progress,
+            on_complete=on_complete,
+        )
+        for source, breakpoints in source_breakpoints:
+            loader.add_source(source, breakpoints)
+        if function_breakpoints is not None:
+            loader.add_function_breakpoints(function_breakpoints)
+        if data_breakpoints is not None:
+            loader.add_data_breakpoints(data_breakpoints)
+
+        loader.start()
+        return loader
+
+    def fetch_stack_trace(
+        self,
+        thread_id: int,
+        initial_levels: int = 20,
+        format: Optional[StackFrameFormat] = None,
+        on_frames: Optional[Callable[[List[StackFrame], int], None]] = None,
+        on_complete: Optional[Callable[[StackFetcher], None]] = None,
+    ) -> StackFetcher:
+        """Load the stack of a thread incrementally, top frames first.
+
+        If the debug adapter supports delayed stack trace loading, only the top
+        `initial_levels` frames are requested first and the rest of the stack is paged
+        in afterwards, with page sizes adapted to the measured adapter latency.
+        Otherwise the whole stack is requested at once.
+
+        Args:
+            thread_id: Retrieve the stacktrace for this thread.
+            initial_levels: The number of frames to request first.
+            format: Specifies details on how to format the stack frames.
+            on_frames: Called with each loaded slice of frames and the index of its first frame.
+            on_complete: Called with the fetcher once the whole stack is loaded.
+
+        Returns:
+            The fetcher, which collects the loaded frames.
+        """
+
+        fetcher = StackFetcher(
+            self,
+            thread_id,
+            initial_levels=initial_levels,
+            format=format,
+            on_frames=on_frames,
+            on_complete=on_complete,
+        )
+        fetcher.start()
+        return fetcher
+
     # Requests
     def cancel(
         self, request_id: Optional[int] = None, progress_id: Optional[str] = None
@@ -1,38 +1,178 @@
 from __future__ import annotations
 
 import asyncio
-import queue
+import selectors
 import socket
-from threading import Thread
-from typing import Optional
+import threading
+import time
+import typing
+from typing import Any, Callable, Iterator, Optional
 
+from .buffer import ReceiveBuffer
 
-class AsyncConnection:
+if typing.TYPE_CHECKING:
+    from .client import Client
+
+
+def _set_nodelay(sock: socket.socket) -> None:
+    # requests are coalesced by the client already, Nagle would only delay them
+    if sock.family in (socket.AF_INET, socket.AF_INET6):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+
+def _retry_delays() -> Iterator[float]:
+    """Delays between connection attempts: tight at first, then doubling up to 10 ms.
+
+    A refused connection to a local port costs only microseconds, so even an adapter
+    that takes seconds to start listening is polled often enough to be connected to
+    within a few milliseconds, without spinning."""
+
+    yield from (0.001,) * 5
+    delay = 0.002
+    while True:
+        yield delay
+        delay = min(delay * 2, 0.01)
+
+
+class CloneUnsupported(OSError):
+    """Raised by `clone` for transports that cannot connect to their adapter again."""
+
+
+class AsyncConnection(asyncio.BufferedProtocol):
     """Asyncio-based connection to a debug adapter server.
 
     This class is used to connect to a debug adapter server using asyncio.
-    It provides methods to start, stop, read and write to the server."""
-
-    def __init__(self, host: str, port: int) -> None:
+    It provides methods to start, stop, read and write to the server.
+
+    The connection is the `asyncio.BufferedProtocol` of its own transport. Once bound to
+    a client with `bind`, received data is read straight into the client's receive buffer
+    and messages are framed and dispatched as soon as it arrives, without intermediate
+    bytes objects. Unbound connections buffer the data for `read` instead.
+
+    asyncio enables TCP_NODELAY on TCP transports itself. `writes` and `bytes_sent`
+    count what was written, `Client.frames_sent` the messages it contained.
+
+    An adapter spawned right before connecting may not listen yet. With a
+    `connect_timeout`, refused connections are retried, first every millisecond, then
+    backing off exponentially, until the deadline passes. `connect_time` and
+    `connect_attempts` tell how long that took. If the host resolves to several
+    addresses, like `localhost` to IPv6 and IPv4, `happy_eyeballs_delay` races them
+    instead of trying one after the other."""
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        connect_timeout: float = 0.0,
+        happy_eyeballs_delay: Optional[float] = None,
+    ) -> None:
         self.host = host
         self.port = port
-        self.reader: Optional[asyncio.StreamReader] = None
-        self.writer: Optional[asyncio.StreamWriter] = None
+        self.connect_timeout = connect_timeout
+        self.happy_eyeballs_delay = happy_eyeballs_delay
+        self.connect_time = 0.0
+        self.connect_attempts = 0
+        self.transport: Optional[asyncio.Transport] = None
         self.alive = False
 
+        self.client: Optional[Client] = None
+        self.on_message: Optional[Callable[[Any], None]] = None
+        self.on_ready: Optional[Callable[[], None]] = None
+        self.bytes_received = 0
+        self.bytes_sent = 0
+        self.writes = 0
+
+        self._buffer = ReceiveBuffer()
+        self._data_ready: Optional[asyncio.Event] = None
+        self._closed: Optional[asyncio.Future] = None
+        self._drain_waiter: Optional[asyncio.Future] = None
+        self._write_paused = False
+        self._error: Optional[BaseException] = None
+
+    def bind(
+        self,
+        client: Client,
+        on_message: Callable[[Any], None],
+        on_ready: Optional[Callable[[], None]] = None,
+    ) -> None:
+        """Feed received data directly to a client.
+
+        Args:
+            client: The client to read the data into.
+            on_message: Called with every message the client yields.
+            on_ready: If given, received data is only read into the client and this \
+                is called instead of handling the messages right away. It is also \
+                called when writing resumes and when the connection is lost. The \
+                caller then handles the messages with `client.messages()`.
+        """
+
+        self.client = client
+        self.on_message = on_message
+        self.on_ready = on_ready
+
+        if len(self._buffer):
+            client._receive_buf.extend(bytes(self._buffer))
+            self._buffer.clear()
+            self._received()
+
     async def start(self):
         """Start the connection to the server."""
 
-        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
-        self.alive = True
+        loop = asyncio.get_running_loop()
+        self._data_ready = asyncio.Event()
+        self._closed = loop.create_future()
+
+        start = time.perf_counter()
+        deadline = start + self.connect_timeout
+        for delay in _retry_delays():
+            self.connect_attempts += 1
+            try:
+                await self._open(loop)
+                break
+            except OSError:
+                if time.perf_counter() + delay > deadline:
+                    raise
+            await asyncio.sleep(delay)
+        self.connect_time = time.perf_counter() - start
+
+    async def _open(self, loop: asyncio.AbstractEventLoop) -> None:
+        await loop.create_connection(
+            lambda: self,
+            self.host,
+            self.port,
+            happy_eyeballs_delay=self.happy_eyeballs_delay,
+        )
+
+    def clone(self) -> AsyncConnection:
+        """A new connection to the same adapter, not started yet.
+
+        Used to connect child sessions, e.g. for `startDebugging` requests.
+
+        Raises:
+            CloneUnsupported: The transport cannot connect to the adapter again.
+        """
+
+        return AsyncConnection(
+            self.host, self.port, self.connect_timeout, self.happy_eyeballs_delay
+        )
 
     async def stop(self):
         """Stop the connection to the server."""
 
-        self.writer.close()
-        await self.writer.wait_closed()
+        self.transport.close()
+        await asyncio.shield(self._closed)
         self.alive = False
 
+    async def wait_closed(self):
+        """Wait until the connection is closed.
+
+        Raises the exception that broke the connection, if any, e.g. one raised by
+        the `on_message` callback."""
+
+        await asyncio.shield(self._closed)
+        if self._error is not None:
+            raise self._error
+
     async def write(self, data: bytes):
         """Write data to the server
 
@@ -40,31 +180,179 @@ class AsyncConnection:
             data (bytes): The data to write to the server.
         """
 
-        self.writer.write(data)
-        await self.writer.drain()
+        self.write_nowait(data)
+        if self._write_paused:
+            self._drain_waiter = asyncio.get_running_loop().create_future()
+            await self._drain_waiter
+
+    def write_nowait(self, data: bytes) -> None:
+        """Write data to the server without waiting for the transport to drain.
+
+        Check `writable` first to respect flow control.
+
+        Args:
+            data (bytes): The data to write to the server.
+        """
+
+        self.transport.write(data)
+        self.writes += 1
+        self.bytes_sent += len(data)
+
+    @property
+    def writable(self) -> bool:
+        """Whether the transport accepts more data without exceeding its buffer limit."""
+
+        return self.alive and not self._write_paused
+
+    def pause_reading(self) -> None:
+        """Stop receiving data until `resume_reading` is called."""
+
+        self.transport.pause_reading()
+
+    def resume_reading(self) -> None:
+        self.transport.resume_reading()
 
     async def read(self) -> bytes:
         """Read data from the server
 
+        Only for connections not bound to a client.
+
         Returns:
             bytes: The data read from the server.
         """
 
-        return await self.reader.read(1024)
+        while not len(self._buffer) and self.alive:
+            self._data_ready.clear()
+            await self._data_ready.wait()
+
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+    # asyncio protocol callbacks
+
+    def connection_made(self, transport: asyncio.Transport) -> None:
+        self.transport = transport
+        self.alive = True
+
+    def get_buffer(self, sizehint: int) -> memoryview:
+        if self.client is not None:
+            return self.client.get_buffer(sizehint)
+        return self._buffer.get_buffer(sizehint)
+
+    def buffer_updated(self, nbytes: int) -> None:
+        self.bytes_received += nbytes
+        if self.client is None:
+            self._buffer.commit(nbytes)
+            self._data_ready.set()
+        else:
+            self.client._receive_buf.commit(nbytes)
+            self._received()
+
+    def data_received(self, data: bytes) -> None:
+        # used by transports without buffered protocol support, like pipes
+        self.bytes_received += len(data)
+        if self.client is None:
+            self._buffer.extend(data)
+            self._data_ready.set()
+        else:
+            self.client._receive_buf.extend(data)
+            self._received()
+
+    def _received(self) -> None:
+        if self.on_ready is not None:
+            self.on_ready()
+            return
+
+        try:
+            for message in self.client.messages():
+                self.on_message(message)
+        except Exception as e:
+            self.fail(e)
+
+    def fail(self, error: BaseException) -> None:
+        """Close the connection because of an error, raised again by `wait_closed`."""
+
+        if self._error is None:
+            self._error = error
+        self.transport.close()
+
+    def eof_received(self) -> bool:
+        return False
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        self.alive = False
+        if exc is not None and self._error is None:
+            self._error = exc
+
+        self._data_ready.set()
+        if not self._closed.done():
+            self._closed.set_result(None)
+        self.resume_writing()
+
+    def pause_writing(self) -> None:
+        self._write_paused = True
+
+    def resume_writing(self) -> None:
+        self._write_paused = False
+        if self._drain_waiter is not None and not self._drain_waiter.done():
+            self._drain_waiter.set_result(None)
+        if self.on_ready is not None:
+            self.on_ready()
 
 
 class Connection:
     """Connection to a debug adapter server.
 
     This class is used to connect to a debug adapter server using threads.
-    It provides methods to start, stop, read and write to the server."""
-
-    def __init__(self, host="localhost", port=6789):
+    It provides methods to start, stop, read and write to the server.
+
+    Reading blocks on a selector until the server sends data or `wakeup` is called,
+    e.g. because new requests were queued, so an idle connection uses no CPU. Data is
+    received with `recv_into` into a reusable buffer, or directly into a client's
+    receive buffer, `read_size` bytes at a time.
+
+    TCP sockets have TCP_NODELAY set: the client already coalesces queued messages, so
+    Nagle's algorithm would only delay them. `writes` and `bytes_sent` count what was
+    written, `Client.frames_sent` the messages it contained.
+
+    With a `connect_timeout`, refused connections are retried until the deadline passes,
+    first every millisecond, then backing off exponentially, so a freshly spawned
+    adapter is connected to as soon as it listens. `connect_time` and `connect_attempts`
+    tell how long that took. All addresses the host resolves to are tried in turn, e.g.
+    IPv6 and IPv4 for `localhost`."""
+
+    def __init__(
+        self,
+        host="localhost",
+        port=6789,
+        read_size: int = 65536,
+        connect_timeout: float = 0.0,
+    ):
         self.alive = True
         self.host = host
         self.port = port
-
-        self.out_queue = queue.Queue()
+        self.read_size = read_size
+        self.connect_timeout = connect_timeout
+        self.connect_time = 0.0
+        self.connect_attempts = 0
+        self.sock: Optional[socket.socket] = None
+        self.writes = 0
+        self.bytes_sent = 0
+
+        self._buffer = bytearray(read_size)
+        self._write_lock = threading.Lock()
+        self._selector = selectors.DefaultSelector()
+        self._wakeup_r, self._wakeup_w = socket.socketpair()
+        self._wakeup_r.setblocking(False)
+        self._wakeup_w.setblocking(False)
+        self._wakeup_pending = False
+        # whether a thread is blocked in the selector, then it closes it once stopped
+        self._select_lock = threading.Lock()
+        self._selecting = False
+        self._stopped = False
+        # bounds every connection attempt while retrying, `None` without a timeout
+        self._deadline: Optional[float] = None
 
     def write(self, buf: bytes) -> None:
         """Write data to the server
@@ -73,51 +361,276 @@ class Connection:
             buf (bytes): The data to write to the server.
         """
 
-        self.sock.sendall(buf)
+        with self._write_lock:
+            self._sendall(buf)
+            self.writes += 1
+            self.bytes_sent += len(buf)
 
-    def read(self) -> None:
+    def read(self) -> Optional[bytes]:
         """Read data from the server
 
+        Blocks until data is available or `wakeup` is called.
+
         Returns:
-            bytes: The data read from the server.
+            bytes: The data read from the server, empty if woken up without data, \
+                `None` once the connection is closed.
         """
 
-        buf = bytearray()
-        while True:
-            try:
-                buf += self.out_queue.get(block=False)
-            except queue.Empty:
-                break
+        if not self.wait_readable():
+            return None if not self.alive else b""
+
+        with memoryview(self._buffer) as view:
+            nbytes = self.recv_into(view)
+            return bytes(view[:nbytes]) if nbytes else None
+
+    def wait_readable(self, timeout: Optional[float] = None) -> bool:
+        """Block until data can be read from the server.
+
+        Args:
+            timeout: The maximum time to wait in seconds, `None` waits indefinitely.
 
-        if self.t_out.is_alive() and not buf:
-            return None
-        return bytes(buf)
+        Returns:
+            Whether data can be read, `False` if woken up or timed out without data.
+        """
+
+        with self._select_lock:
+            if self._stopped:
+                return False
+            self._selecting = True
+        try:
+            events = self._selector.select(timeout)
+        finally:
+            with self._select_lock:
+                self._selecting = False
+                stopped = self._stopped
+        if stopped:
+            # stopped while blocked, closing earlier could have lost the wakeup
+            self._close_selector()
+            return False
+
+        readable = False
+        for key, _ in events:
+            if key.fileobj is self._wakeup_r:
+                self._drain_wakeup()
+            elif key.data is not None:
+                key.data()
+            else:
+                readable = True
+
+        return readable and self.alive
+
+    def recv_into(self, buf: memoryview) -> int:
+        """Receive up to `read_size` bytes from the server into a buffer.
+
+        Args:
+            buf: The buffer to receive into.
+
+        Returns:
+            The number of bytes received, 0 once the connection is closed.
+        """
+
+        try:
+            nbytes = self._recv_into(buf, min(len(buf), self.read_size))
+        except OSError:
+            nbytes = 0
+
+        if not nbytes:
+            self.alive = False
+        return nbytes
+
+    def wakeup(self) -> None:
+        """Wake up a thread blocked in `read` or `wait_readable`.
+
+        Safe to call from any thread."""
+
+        if self._wakeup_pending:
+            return
+
+        self._wakeup_pending = True
+        try:
+            self._wakeup_w.send(b"\0")
+        except (BlockingIOError, OSError):
+            pass
+
+    def _drain_wakeup(self) -> None:
+        try:
+            while self._wakeup_r.recv(4096):
+                ...
+        except (BlockingIOError, OSError):
+            pass
+        # only now, a wakeup in between must not be drained along with the flag cleared
+        self._wakeup_pending = False
 
     def start(self, *_) -> None:
         """Start the connection to the server."""
 
-        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.sock.connect((self.host, self.port))
-
-        self.t_out = Thread(target=self._process_output, daemon=True)
-        self.t_out.start()
+        start = time.perf_counter()
+        deadline = start + self.connect_timeout
+        if self.connect_timeout:
+            self._deadline = deadline
+        for delay in _retry_delays():
+            self.connect_attempts += 1
+            try:
+                self._open()
+                break
+            except OSError:
+                if time.perf_counter() + delay > deadline:
+                    self._close_selector()
+                    raise
+            time.sleep(delay)
+        self.connect_time = time.perf_counter() - start
+
+        if self.sock is not None:
+            _set_nodelay(self.sock)
+        self._selector.register(self._fileobj(), selectors.EVENT_READ)
+        self._selector.register(self._wakeup_r, selectors.EVENT_READ)
 
     def stop(self, *_) -> None:
-        """Stop the connection to the server."""
+        """Stop the connection to the server, does nothing if already stopped."""
 
+        with self._select_lock:
+            if self._stopped:
+                return
         self.alive = False
+        self._selector.unregister(self._fileobj())
+        self._close()
+        with self._select_lock:
+            self._stopped = True
+            selecting = self._selecting
+        if selecting:
+            # the blocked thread closes the selector once woken up
+            self.wakeup()
+        else:
+            self._close_selector()
+
+    def _close_selector(self) -> None:
+        self._selector.close()
+        self._wakeup_r.close()
+        self._wakeup_w.close()
+
+    # transport specific parts, overridden by other kinds of connections
+
+    def _open(self) -> None:
+        if self._deadline is None:
+            self.sock = socket.create_connection((self.host, self.port))
+            return
+
+        # an unreachable host must not block past the deadline
+        timeout = max(0.001, self._deadline - time.perf_counter())
+        self.sock = socket.create_connection((self.host, self.port), timeout=timeout)
+        self.sock.settimeout(None)
+
+    def _fileobj(self) -> Any:
+        return self.sock
+
+    def _recv_into(self, buf: memoryview, nbytes: int) -> int:
+        return self.sock.recv_into(buf, nbytes)
+
+    def _sendall(self, buf: bytes) -> None:
+        self.sock.sendall(buf)
+
+    def _close(self) -> None:
         self.sock.close()
 
-    def _process_output(self) -> None:
-        while self.alive:
-            try:
-                data = self.sock.recv(1024)
-            except ConnectionAbortedError:
-                break
-            except ConnectionResetError:
-                break
 
-            if not data:
-                break
+class UnixConnection(Connection):
+    """Connection to a debug adapter server listening on a Unix domain socket.
+
+    Avoids the TCP loopback stack and port management for adapters on the same host."""
+
+    def __init__(
+        self, path: str, read_size: int = 65536, connect_timeout: float = 0.0
+    ) -> None:
+        """Initializes the connection.
+
+        Args:
+            path: The path of the socket the adapter listens on.
+            read_size: The maximum number of bytes read at once.
+            connect_timeout: How long to retry while the socket does not exist yet or \
+                refuses connections.
+        """
+
+        super().__init__(
+            host=None, port=None, read_size=read_size, connect_timeout=connect_timeout
+        )
+        self.path = path
+
+    def _open(self) -> None:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.path)
+        except OSError:
+            sock.close()
+            raise
+        self.sock = sock
+
+
+class FdConnection(Connection):
+    """Connection to a debug adapter over an already connected socket.
+
+    The socket can be given as an object or as an inherited file descriptor, e.g. one
+    end of a `socket.socketpair()` or a socket passed in by a service manager."""
+
+    def __init__(self, sock: socket.socket | int, read_size: int = 65536) -> None:
+        """Initializes the connection.
+
+        Args:
+            sock: The connected socket or its file descriptor.
+            read_size: The maximum number of bytes read at once.
+        """
+
+        super().__init__(host=None, port=None, read_size=read_size)
+        self.fd = sock
+
+    def _open(self) -> None:
+        if isinstance(self.fd, socket.socket):
+            self.sock = self.fd
+        else:
+            self.sock = socket.socket(fileno=self.fd)
+
+
+class AsyncUnixConnection(AsyncConnection):
+    """Asyncio-based connection to a debug adapter server listening on a Unix domain socket."""
+
+    def __init__(self, path: str, connect_timeout: float = 0.0) -> None:
+        """Initializes the connection.
+
+        Args:
+            path: The path of the socket the adapter listens on.
+            connect_timeout: How long to retry while the socket does not exist yet or \
+                refuses connections.
+        """
+
+        super().__init__(host=None, port=None, connect_timeout=connect_timeout)
+        self.path = path
+
+    async def _open(self, loop: asyncio.AbstractEventLoop) -> None:
+        await loop.create_unix_connection(lambda: self, self.path)
+
+    def clone(self) -> AsyncUnixConnection:
+        return AsyncUnixConnection(self.path, self.connect_timeout)
+
+
+class AsyncFdConnection(AsyncConnection):
+    """Asyncio-based connection to a debug adapter over an already connected socket.
+
+    The socket can be given as an object or as an inherited file descriptor."""
+
+    def __init__(self, sock: socket.socket | int) -> None:
+        """Initializes the connection.
+
+        Args:
+            sock: The connected socket or its file descriptor.
+        """
+
+        super().__init__(host=None, port=None)
+        self.fd = sock
+
+    async def _open(self, loop: asyncio.AbstractEventLoop) -> None:
+        sock = self.fd
+        if not isinstance(sock, socket.socket):
+            sock = socket.socket(fileno=sock)
+        await loop.create_connection(lambda: self, sock=sock)
 
-            self.out_queue.put(data)
+    def clone(self) -> AsyncConnection:
+        raise CloneUnsupported("An inherited socket cannot be connected again")
@@ -0,0 +1,590 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+import itertools
+import json
+import socket
+import threading
+from collections import Counter, deque
+from typing import Any, Callable, Iterator, Optional
+
+from .base import Requests
+from .buffer import ReceiveBuffer
+from .connection import AsyncConnection, CloneUnsupported, Connection
+
+CONTENT_ENCODING = "utf-8"
+
+# the capabilities reported in the `initialize` response
+DEFAULT_CAPABILITIES = {
+    "supportsConfigurationDoneRequest": True,
+    "supportsDelayedStackTraceLoading": True,
+    "supportsEvaluateForHovers": True,
+    "supportsSetVariable": True,
+    "supportsTerminateRequest": True,
+    "supportsCancelRequest": True,
+}
+
+_FRAME = (
+    '{"id":%d,"name":"frame%d","line":%d,"column":1,'
+    '"source":{"name":"main.py","path":"/src/main.py"}}'
+)
+_VARIABLE = '{"name":"var%d","value":"%d","type":"int","variablesReference":0}'
+
+_COMMANDS = frozenset(Requests)
+
+Reply = dict[str, Any] | Callable[[dict[str, Any]], Optional[dict[str, Any]]]
+
+
+class FakeAdapterError(Exception):
+    """Raised by a reply scripted with `FakeAdapter.on` to answer with an error."""
+
+
+def _members(content: dict[str, Any]) -> bytes:
+    # the encoded object without its braces
+    return json.dumps(content, separators=(",", ":")).encode(CONTENT_ENCODING)[1:-1]
+
+
+def _dumps(content: dict[str, Any]) -> bytes:
+    # a message without its opening brace, the seq is put in front once it is sent
+    return _members(content) + b"}"
+
+
+class FakeAdapter:
+    """Scriptable in-process debug adapter, the load generator of tests and benchmarks.
+
+    Every request in `Requests` is answered with a successful response whose body passes
+    the client's validation. The debuggee it pretends to debug has `thread_count`
+    threads, each stopped `stack_depth` frames deep, with one scope of `variable_count`
+    variables per frame. `stackTrace` and `variables` requests are paged by their
+    `startFrame`/`levels` and `start`/`count` arguments, and large bodies are rendered
+    from pre-encoded templates, so stacks of 10k frames or scopes of a million variables
+    are cheap to produce.
+
+    Replies can be replaced per command with `on`, and events queued at any time with
+    `event`, `output_flood` and `stop`. Events queued while a request is answered are
+    sent after its response.
+
+    The adapter is sans-IO: `feed` it the data the client sent, and `send` the data it
+    queued. Queued messages are only encoded while they are sent, so a flood of
+    hundreds of thousands of events never has to fit in memory at once.
+    `LoopbackConnection` and `AsyncLoopbackConnection` connect a client to an adapter
+    in memory, `serve` exposes adapters on a local socket.
+
+    Example:
+
+    ```python
+    adapter = FakeAdapter(stack_depth=10_000)
+    adapter.on("configurationDone", lambda arguments: adapter.output_flood(100_000))
+    server = ThreadedServer("fake", connection=LoopbackConnection(adapter))
+    ```
+    """
+
+    def __init__(
+        self,
+        thread_count: int = 1,
+        stack_depth: int = 20,
+        variable_count: int = 10,
+        capabilities: Optional[dict[str, Any]] = None,
+    ) -> None:
+        """Initializes the adapter.
+
+        Args:
+            thread_count: The number of threads of the debuggee.
+            stack_depth: The number of frames on the stack of every thread.
+            variable_count: The number of variables in every scope.
+            capabilities: The capabilities reported, `DEFAULT_CAPABILITIES` if not given.
+        """
+
+        self.thread_count = thread_count
+        self.stack_depth = stack_depth
+        self.variable_count = variable_count
+        self.capabilities = (
+            DEFAULT_CAPABILITIES if capabilities is None else capabilities
+        )
+
+        self.received: Counter[str] = Counter()
+        """The number of requests received, by command."""
+
+        self.closed = False
+        """Whether the adapter disconnected, after its remaining output is sent."""
+
+        self._seq = 1
+        self._receive_buf = ReceiveBuffer()
+        self._output: deque[bytes | Iterator[bytes]] = deque()
+        self._deferred: Optional[list[bytes | Iterator[bytes]]] = None
+        self._replies: dict[str, Reply] = {}
+        self._breakpoint_ids = itertools.count(1)
+        self._lock = threading.RLock()
+
+    @property
+    def pending(self) -> bool:
+        """Whether messages are queued, a flood may turn out to be exhausted though."""
+
+        return bool(self._output)
+
+    def on(self, command: str, reply: Reply) -> None:
+        """Script the reply to a command.
+
+        Args:
+            command: The command to reply to.
+            reply: The body of the response, or a function called with the arguments \
+                of the request that returns it. The function can queue events, and \
+                raise `FakeAdapterError` to answer with an error response.
+        """
+
+        self._replies[command] = reply
+
+    def event(self, event: str, body: Optional[dict[str, Any]] = None) -> None:
+        """Queue an event."""
+
+        # the client validates the body of every event, even of those without fields
+        self._queue(_dumps({"type": "event", "event": event, "body": body or {}}))
+
+    def output_flood(
+        self, count: int, output: str = "output line\n", category: str = "stdout"
+    ) -> None:
+        """Queue `count` output events, encoded only as they are sent."""
+
+        rest = _dumps(
+            {
+                "type": "event",
+                "event": "output",
+                "body": {"category": category, "output": output},
+            }
+        )
+        self._queue(itertools.repeat(rest, count))
+
+    def stop(self, reason: str = "breakpoint", thread_id: int = 1) -> None:
+        """Queue a stopped event for all threads."""
+
+        self.event(
+            "stopped",
+            {"reason": reason, "threadId": thread_id, "allThreadsStopped": True},
+        )
+
+    def feed(self, data: bytes) -> None:
+        """Handle the requests in data sent by the client."""
+
+        with self._lock:
+            self._receive_buf.extend(data)
+            while (frame := self._receive_buf.pop_frame()) is not None:
+                with frame:
+                    request = json.loads(str(frame, CONTENT_ENCODING))
+                self._handle(request)
+
+    def send(self, max_bytes: int = 65536) -> bytes:
+        """Take the queued messages out, encoded and framed.
+
+        Args:
+            max_bytes: Stop adding messages once this many bytes are taken, at least \
+                one message is taken though.
+        """
+
+        data = bytearray()
+        with self._lock:
+            output = self._output
+            while output and len(data) < max_bytes:
+                item = output[0]
+                if isinstance(item, bytes):
+                    output.popleft()
+                    rest = item
+                elif (rest := next(item, None)) is None:
+                    output.popleft()
+                    continue
+
+                content = b'{"seq":%d,%s' % (self._seq, rest)
+                self._seq += 1
+                data += b"Content-Length: %d\r\n\r\n" % len(content)
+                data += content
+
+        return bytes(data)
+
+    def _queue(self, item: bytes | Iterator[bytes]) -> None:
+        with self._lock:
+            if self._deferred is not None:
+                self._deferred.append(item)
+            else:
+                self._output.append(item)
+
+    def _handle(self, request: dict[str, Any]) -> None:
+        command = request["command"]
+        arguments = request.get("arguments") or {}
+        self.received[command] += 1
+
+        # events queued while replying follow the response
+        self._deferred = []
+        try:
+            if command in self._replies:
+                reply = self._replies[command]
+                body = _members((reply(arguments) if callable(reply) else reply) or {})
+            elif command in _COMMANDS:
+                body = self._default_reply(command, arguments)
+            else:
+                raise FakeAdapterError(f"Unsupported command {command!r}")
+
+            rest = b'"type":"response","request_seq":%d,"success":true,' % (
+                request["seq"]
+            ) + b'"command":%s,"body":{%s}}' % (json.dumps(command).encode(), body)
+        except FakeAdapterError as e:
+            rest = _dumps(
+                {
+                    "type": "response",
+                    "request_seq": request["seq"],
+                    "success": False,
+                    "command": command,
+                    "message": str(e),
+                    "body": {"error": {"id": 1, "format": str(e)}},
+                }
+            )
+        finally:
+            deferred, self._deferred = self._deferred, None
+
+        self._output.append(rest)
+        self._output.extend(deferred)
+        if command == Requests.DISCONNECT:
+            self.closed = True
+
+    def _default_reply(self, command: str, arguments: dict[str, Any]) -> bytes:
+        # the content of the body object, without its braces
+        match command:
+            case Requests.INITIALIZE:
+                self.event("initialized")
+                return _members(self.capabilities)
+            case Requests.THREADS:
+                threads = [
+                    {"id": i, "name": f"Thread-{i}"}
+                    for i in range(1, self.thread_count + 1)
+                ]
+                return b'"threads":' + json.dumps(threads).encode()
+            case Requests.STACKTRACE:
+                start = arguments.get("startFrame") or 0
+                levels = arguments.get("levels") or self.stack_depth
+                frames = ",".join(
+                    _FRAME % (i, i, i + 1)
+                    for i in range(start, min(start + levels, self.stack_depth))
+                )
+                return b'"stackFrames":[%s],"totalFrames":%d' % (
+                    frames.encode(),
+                    self.stack_depth,
+                )
+            case Requests.SCOPES:
+                scope = {
+                    "name": "Locals",
+                    "presentationHint": "locals",
+                    "variablesReference": arguments["frameId"] + 1,
+                    "namedVariables": self.variable_count,
+                    "expensive": False,
+                }
+                return b'"scopes":[%s]' % json.dumps(scope).encode()
+            case Requests.VARIABLES:
+                start = arguments.get("start") or 0
+                count = arguments.get("count") or self.variable_count
+                variables = ",".join(
+                    _VARIABLE % (i, i)
+                    for i in range(start, min(start + count, self.variable_count))
+                )
+                return b'"variables":[%s]' % variables.encode()
+            case Requests.PAUSE:
+                self.stop("pause", arguments.get("threadId", 1))
+                body = {}
+            case Requests.TERMINATE:
+                self.event("terminated")
+                body = {}
+            case Requests.CONTINUE:
+                body = {"allThreadsContinued": True}
+            case Requests.EVALUATE:
+                body = {"result": "0", "type": "int", "variablesReference": 0}
+            case Requests.SETVARIABLE | Requests.SETEXPRESSION:
+                body = {"value": arguments.get("value", "0")}
+            case Requests.SETBREAKPOINTS:
+                body = {
+                    "breakpoints": [
+                        {
+                            "id": next(self._breakpoint_ids),
+                            "verified": True,
+                            "line": breakpoint["line"],
+                        }
+                        for breakpoint in arguments.get("breakpoints", [])
+                    ]
+                }
+            case (
+                Requests.SETFUNCTIONBREAKPOINTS
+                | Requests.SETDATABREAKPOINTS
+                | Requests.SETINSTRUCTIONBREAKPOINTS
+            ):
+                body = {
+                    "breakpoints": [
+                        {"id": next(self._breakpoint_ids), "verified": True}
+                        for _ in arguments.get("breakpoints", [])
+                    ]
+                }
+            case Requests.BREAKPOINTLOCATIONS:
+                body = {"breakpoints": [{"line": arguments.get("line", 1)}]}
+            case Requests.DATABREAKPOINTINFO:
+                body = {"dataId": None, "description": "Data breakpoints unsupported"}
+            case Requests.DISASSEMBLE:
+                count = arguments.get("instructionCount", 0)
+                body = {
+                    "instructions": [
+                        {"address": hex(i), "instruction": "nop"} for i in range(count)
+                    ]
+                }
+            case Requests.EXCEPTIONINFO:
+                body = {"exceptionID": "Exception", "breakMode": "unhandled"}
+            case Requests.READMEMORY:
+                data = bytes(arguments.get("count", 0))
+                body = {
+                    "address": arguments.get("memoryReference", "0x0"),
+                    "data": base64.b64encode(data).decode("ascii"),
+                }
+            case Requests.WRITEMEMORY:
+                data = base64.b64decode(arguments.get("data", ""))
+                body = {"bytesWritten": len(data)}
+            case Requests.SOURCE:
+                body = {"content": ""}
+            case Requests.MODULES:
+                body = {"modules": [], "totalModules": 0}
+            case Requests.LOADEDSOURCES:
+                body = {"sources": []}
+            case Requests.COMPLETIONS | Requests.GOTOTARGETS | Requests.STEPINTARGETS:
+                body = {"targets": []}
+            case _:
+                body = {}
+
+        return _members(body)
+
+
+class LoopbackConnection(Connection):
+    """In-memory connection to a `FakeAdapter`, for tests and benchmarks.
+
+    Requests are handled by the adapter right away on the writing thread, and its
+    output is copied straight into the reader's buffer. A socket pair only signals the
+    reading thread's selector that output is ready, no data goes through the kernel.
+    """
+
+    def __init__(
+        self, adapter: Optional[FakeAdapter] = None, read_size: int = 65536
+    ) -> None:
+        """Initializes the connection.
+
+        Args:
+            adapter: The adapter to connect to, a new one if not given.
+            read_size: The maximum number of bytes read at once.
+        """
+
+        super().__init__(host=None, port=None, read_size=read_size)
+        self.adapter = adapter or FakeAdapter()
+        self._pending = memoryview(b"")
+        self._ready = False
+        self._ready_lock = threading.Lock()
+
+    def _open(self) -> None:
+        self._ready_r, self._ready_w = socket.socketpair()
+        self._ready_r.setblocking(False)
+        self._update()
+
+    def _update(self) -> None:
+        # readable while output is taken out of the adapter, or it disconnected
+        with self._ready_lock:
+            if not self._pending and self.adapter.pending:
+                self._pending = memoryview(self.adapter.send(self.read_size))
+
+            ready = bool(self._pending) or self.adapter.closed
+            if ready and not self._ready:
+                self._ready_w.send(b"\0")
+            elif self._ready and not ready:
+                self._ready_r.recv(1)
+            self._ready = ready
+
+    def _fileobj(self) -> Any:
+        return self._ready_r
+
+    def _recv_into(self, buf: memoryview, nbytes: int) -> int:
+        with self._ready_lock:
+            nbytes = min(nbytes, len(self._pending))
+            buf[:nbytes] = self._pending[:nbytes]
+            self._pending = self._pending[nbytes:]
+        self._update()
+        return nbytes
+
+    def _sendall(self, buf: bytes) -> None:
+        self.adapter.feed(buf)
+        self._update()
+
+    def _close(self) -> None:
+        self._ready_r.close()
+        self._ready_w.close()
+
+
+class _LoopbackTransport(asyncio.Transport):
+    """Delivers the output of a `FakeAdapter` to its protocol on the event loop."""
+
+    def __init__(
+        self,
+        protocol: asyncio.BufferedProtocol,
+        adapter: FakeAdapter,
+        loop: asyncio.AbstractEventLoop,
+        read_size: int,
+    ) -> None:
+        super().__init__()
+        self.protocol = protocol
+        self.adapter = adapter
+        self.loop = loop
+        self.read_size = read_size
+        self._reading = True
+        self._closing = False
+        self._scheduled = False
+
+    def write(self, data: bytes) -> None:
+        if self._closing:
+            return
+        self.adapter.feed(data)
+        self._schedule()
+
+    def _schedule(self) -> None:
+        if self._reading and not self._scheduled and not self._closing:
+            self._scheduled = True
+            self.loop.call_soon(self._deliver)
+
+    def _deliver(self) -> None:
+        self._scheduled = False
+        if not self._reading or self._closing:
+            return
+
+        data = self.adapter.send(self.read_size)
+        with memoryview(data) as view:
+            while view and not self._closing:
+                with self.protocol.get_buffer(len(view)) as buf:
+                    nbytes = min(len(buf), len(view))
+                    buf[:nbytes] = view[:nbytes]
+                self.protocol.buffer_updated(nbytes)
+                view = view[nbytes:]
+
+        # one chunk per loop iteration, so a flood does not block the loop
+        if self.adapter.pending:
+            self._schedule()
+        elif self.adapter.closed:
+            self.close()
+
+    def pause_reading(self) -> None:
+        self._reading = False
+
+    def resume_reading(self) -> None:
+        self._reading = True
+        self._schedule()
+
+    def is_reading(self) -> bool:
+        return self._reading
+
+    def get_write_buffer_size(self) -> int:
+        return 0
+
+    def is_closing(self) -> bool:
+        return self._closing
+
+    def close(self) -> None:
+        if self._closing:
+            return
+        self._closing = True
+        self.loop.call_soon(self.protocol.connection_lost, None)
+
+    def abort(self) -> None:
+        self.close()
+
+
+class AsyncLoopbackConnection(AsyncConnection):
+    """Asyncio-based in-memory connection to a `FakeAdapter`.
+
+    Requests are handled by the adapter as soon as they are written, and its output is
+    read into the client's buffer in chunks of `read_size` bytes, one per iteration of
+    the event loop like a socket transport does.
+    """
+
+    def __init__(
+        self, adapter: Optional[FakeAdapter] = None, read_size: int = 65536
+    ) -> None:
+        """Initializes the connection.
+
+        Args:
+            adapter: The adapter to connect to, a new one if not given.
+            read_size: The maximum number of bytes read at once.
+        """
+
+        super().__init__(host=None, port=None)
+        self.adapter = adapter or FakeAdapter()
+        self.read_size = read_size
+
+    async def _open(self, loop: asyncio.AbstractEventLoop) -> None:
+        self.connection_made(
+            _LoopbackTransport(self, self.adapter, loop, self.read_size)
+        )
+
+    def clone(self) -> AsyncConnection:
+        raise CloneUnsupported("A fake adapter cannot start child sessions")
+
+
+async def serve(
+    host: str = "127.0.0.1",
+    port: int = 0,
+    path: Optional[str] = None,
+    adapter_factory: Callable[[], FakeAdapter] = FakeAdapter,
+) -> asyncio.Server:
+    """Serve a new fake adapter to every connection on a local socket.
+
+    The server runs on the running loop. Requests are read while the output of earlier
+    ones, like a flood, is still being written.
+
+    Args:
+        host: The host to listen on.
+        port: The port to listen on, a free one if 0.
+        path: The path of a Unix domain socket to listen on instead of host and port.
+        adapter_factory: Creates the adapter of each connection.
+
+    Returns:
+        The started server.
+    """
+
+    async def serve_connection(
+        reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        adapter = adapter_factory()
+        ready = asyncio.Event()
+
+        def flush() -> None:
+            # write right away what fits the transport's buffer, the write loop waits
+            # for it to drain to write the rest, like the end of a flood
+            while writer.transport.get_write_buffer_size() < 65536 and (
+                data := adapter.send()
+            ):
+                writer.write(data)
+            if adapter.pending or adapter.closed:
+                ready.set()
+
+        async def write_loop() -> None:
+            try:
+                while not adapter.closed:
+                    await ready.wait()
+                    ready.clear()
+                    while data := adapter.send():
+                        writer.write(data)
+                        await writer.drain()
+            except ConnectionError:
+                return
+            # the client then reads the end of the stream
+            writer.close()
+
+        writing = asyncio.create_task(write_loop())
+        try:
+            while data := await reader.read(65536):
+                adapter.feed(data)
+                flush()
+        except ConnectionError:
+            pass
+        finally:
+            writing.cancel()
+            writer.close()
+
+    if path is not None:
+        return await asyncio.start_unix_server(serve_connection, path)
+    return await asyncio.start_server(serve_connection, host, port)
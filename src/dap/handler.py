@@ -1,7 +1,10 @@
 from __future__ import annotations
 
 import json
+import re
+import time
 import typing
+from typing import Any, Optional
 
 from .base import DAPMessage, ErrorResponse, Event, Events, Request, Requests, Response
 from .events import *
@@ -10,69 +13,155 @@ from .responses import *
 
 if typing.TYPE_CHECKING:
     from .client import Client
+    from .profiling import HandlerProfiler
 
 
-HEADER_ENCODING = "ascii"
 CONTENT_ENCODING = "utf-8"
 
+# requests whose results only make sense for the stop they were sent in
+SUPERSEDABLE_REQUESTS = frozenset(
+    {Requests.STACKTRACE, Requests.SCOPES, Requests.VARIABLES, Requests.EVALUATE}
+)
+
+# the fields of a response that are looked up before it is decoded, the first match
+# is trusted as the message itself is usually written before its body
+_REQUEST_SEQ = re.compile(rb'"request_seq"\s*:\s*(\d+)')
+_RESPONSE_TYPE = re.compile(rb'"type"\s*:\s*"response"')
+
+# requests that resume the debuggee when they succeed
+EXECUTION_REQUESTS = frozenset(
+    {
+        Requests.CONTINUE,
+        Requests.NEXT,
+        Requests.STEPIN,
+        Requests.STEPOUT,
+        Requests.STEPBACK,
+        Requests.REVERSECONTINUE,
+        Requests.GOTO,
+        Requests.RESTARTFRAME,
+    }
+)
+
 
 class Handler:
     """Handler for DAP events, responses and reverse requests."""
 
     def __init__(self, client: Client) -> None:
         self.client = client
+        # the JSON of the message handled last, e.g. to pass it on without its models
+        self.last_decoded: Optional[dict[str, Any]] = None
 
-    def _parse_message(self, data: dict[str, any]) -> Response | Event:
-        try:
-            return Response.model_validate(data)
-        except ValueError:
-            return Event.model_validate(data)
+    def _parse_message(self, data: dict[str, any]) -> Response | Event | Request:
+        match data.get("type"):
+            case DAPMessage.RESPONSE:
+                return Response.model_validate(data)
+            case DAPMessage.EVENT:
+                return Event.model_validate(data)
+            case DAPMessage.REQUEST:
+                return Request.model_validate(data)
+            case message_type:
+                raise ValueError(f"Unsupported message: {message_type}")
 
     def handle(self) -> typing.Generator[EventBody | ResponseBody, None, None]:
         """Handle incoming messages from the client."""
 
-        while b"\r\n\r\n" in self.client._receive_buf:
-            headers, rest = self.client._receive_buf.split(b"\r\n\r\n", 1)
+        receive_buf = self.client._receive_buf
+        while (frame := receive_buf.pop_frame()) is not None:
+            if (message := self.handle_frame(frame)) is not None:
+                yield message
+                if self.client.tracer is not None:
+                    self.client.tracer.delivered()
 
-            # temporary setup, will break if multiple headers are added
-            content_length = int(
-                headers.decode(encoding=HEADER_ENCODING).split(":")[1].strip()
-            )
+    def handle_frame(self, frame: memoryview) -> Optional[EventBody | ResponseBody]:
+        """Handle the content of a single message, without its headers.
+
+        The frame is released afterwards. Returns `None` for a superseded response,
+        which is dropped without being validated.
+        """
+
+        tracer = self.client.tracer
+        if tracer is not None:
+            framed = time.perf_counter_ns()
+        profiler = self.client.profiler
+        if profiler is not None:
+            start = time.perf_counter_ns()
+        with frame:
+            if self.client.recorder is not None:
+                self.client.recorder.received(frame)
+            if self.client.metrics is not None:
+                self.client.metrics.message_received(len(frame))
+            if self.client._dropped_requests and self._superseded(frame):
+                return None
+            data = json.loads(str(frame, CONTENT_ENCODING))
+        if tracer is not None:
+            decoded = time.perf_counter_ns()
+        if profiler is not None:
+            now = time.perf_counter_ns()
+            kind = data.get("type")
+            name = data.get("event") or data.get("command")
+            profiler.add("decode", kind, name, now - start)
+            start = now
+
+        request_seq = data.get("request_seq")
+        if request_seq is not None and self.client._drop_response(request_seq):
+            # forgotten at a later stop, skip validating the stale result
+            return None
+
+        self.last_decoded = data
+        content = self._parse_message(data)
+        if profiler is not None:
+            now = time.perf_counter_ns()
+            profiler.add("classify", kind, name, now - start)
+            start = now
 
-            if len(rest) >= content_length:
-                self.client._receive_buf = rest[content_length:]
-                content = json.loads(
-                    rest[:content_length].decode(encoding=CONTENT_ENCODING)
-                )
-                content = self._parse_message(content)
-                message_type = content.type
-                if message_type == DAPMessage.EVENT:
-                    yield self.handle_event(content)
-                elif message_type == DAPMessage.RESPONSE:
-                    yield self.handle_response(content)
-                elif message_type == DAPMessage.REQUEST:
-                    yield self.handle_reverse_request(content)
-                else:
-                    raise ValueError(f"Unsupported message: {message_type}")
-
-            else:
-                # more data is needed to complete the event
-                break
+        message_type = content.type
+        if message_type == DAPMessage.EVENT:
+            message = self.handle_event(content)
+        elif message_type == DAPMessage.RESPONSE:
+            # times its validation itself, without the callback
+            message = self.handle_response(content, profiler)
+        elif message_type == DAPMessage.REQUEST:
+            message = self.handle_reverse_request(content)
+        else:
+            raise ValueError(f"Unsupported message: {message_type}")
+        if profiler is not None and message_type != DAPMessage.RESPONSE:
+            profiler.add("validate", kind, name, time.perf_counter_ns() - start)
+
+        if tracer is not None:
+            tracer.handled(data, self.client._stop_epoch, framed, decoded)
+        return message
+
+    def _superseded(self, frame: memoryview) -> bool:
+        # drops a response superseded by a resume before decoding its body, which is
+        # what makes stale pages of variables or deep stacks expensive
+        if (match := _REQUEST_SEQ.search(frame)) is None:
+            return False
+        request_seq = int(match[1])
+        if request_seq not in self.client._dropped_requests:
+            return False
+        if _RESPONSE_TYPE.search(frame) is None:
+            return False
+        return self.client._drop_response(request_seq)
 
     def handle_reverse_request(self, request: Request) -> ResponseBody:
         assert request.command is not None
 
         match request.command:
             case Requests.RUNINTERMINAL:
-                return RunInTerminalRequest.model_validate(request)
+                request = RunInTerminalRequest.model_validate(request.model_dump())
+                if self.client.terminal is not None:
+                    self.client.terminal.submit(self.client, request)
+                return request
             case Requests.STARTDEBUGGING:
-                return StartDebuggingRequest.model_validate(request)
+                return StartDebuggingRequest.model_validate(request.model_dump())
             case _:
                 # print(f"⚠️ Unsupported reverse request: {request.command}")
                 return request
 
     def handle_event(self, event: Event) -> EventBody:
         assert event.event is not None
+        if self.client.metrics is not None:
+            self.client.metrics.events[event.event] += 1
 
         match event.event:
             case Events.INITIALIZED:
@@ -80,9 +169,15 @@ class Handler:
             case Events.BREAKPOINT:
                 return BreakpointEvent.model_validate(event.body)
             case Events.CAPABILITIES:
-                return CapabilitiesEvent.model_validate(event.body)
+                capabilities = CapabilitiesEvent.model_validate(event.body)
+                self.client._update_capabilities(capabilities.capabilities)
+                return capabilities
             case Events.CONTINUED:
-                return ContinuedEvent.model_validate(event.body)
+                continued = ContinuedEvent.model_validate(event.body)
+                # when only this thread resumed, the others keep their results
+                single = continued.allThreadsContinued is False
+                self.client._supersede(continued.threadId if single else None)
+                return continued
             case Events.EXITED:
                 return ExitedEvent.model_validate(event.body)
             case Events.INVALIDATED:
@@ -104,7 +199,9 @@ class Handler:
             case Events.PROGRESS_UPDATE:
                 return ProgressUpdateEvent.model_validate(event.body)
             case Events.STOPPED:
-                return StoppedEvent.model_validate(event.body)
+                stopped = StoppedEvent.model_validate(event.body)
+                self.client._stopped(stopped.threadId, bool(stopped.allThreadsStopped))
+                return stopped
             case Events.TERMINATED:
                 return TerminatedEvent.model_validate(event.body)
             case Events.THREAD:
@@ -114,103 +211,140 @@ class Handler:
                 # print(f"⚠️ Unsupported event: {event.event}")
                 return event
 
-    def handle_response(self, response: Response) -> ResponseBody:
+    def handle_response(
+        self, response: Response, profiler: Optional[HandlerProfiler] = None
+    ) -> ResponseBody:
         assert response.command is not None
         assert response.request_seq is not None
 
         request = self.client._pending_requests.pop(response.request_seq)
         assert request is not None
         assert request.command == response.command
+        self.client._request_epochs.pop(response.request_seq, None)
+        self.client._request_threads.pop(response.request_seq, None)
 
+        if profiler is not None:
+            start = time.perf_counter_ns()
+        result = self._validate_response(response)
+        if profiler is not None:
+            elapsed = time.perf_counter_ns() - start
+            profiler.add("validate", DAPMessage.RESPONSE, response.command, elapsed)
+        if self.client.metrics is not None:
+            self.client.metrics.response_received(
+                response.request_seq, response.success
+            )
+        if response.success:
+            if response.command in SUPERSEDABLE_REQUESTS:
+                self.client._track_threads(request, result)
+            elif response.command in EXECUTION_REQUESTS:
+                self.client._supersede(self._resumed_thread(request, result))
+        if callback := self.client._response_callbacks.pop(response.request_seq, None):
+            callback(result)
+        return result
+
+    def _resumed_thread(self, request: Request, result: ResponseBody) -> Optional[int]:
+        # the thread resumed on its own by an execution request, `None` if all were
+        arguments = request.arguments or {}
+        single = arguments.get("singleThread") or (
+            isinstance(result, Continued) and result.allThreadsContinued is False
+        )
+        return arguments.get("threadId") if single else None
+
+    def _validate_response(self, response: Response) -> ResponseBody:
         if not response.success:
             # print(f"⚠️ FAIL Request failed {request}: {response.message}")
             return ErrorResponse.model_validate(response.model_dump())
 
+        # responses without a result may omit the body
+        body = response.body if response.body is not None else {}
+
         match response.command:
             case Requests.INITIALIZE:
-                return Initialized.model_validate(response.body)
+                initialized = Initialized.model_validate(body)
+                self.client._update_capabilities(initialized)
+                return initialized
             case Requests.CANCEL:
-                return Cancelled.model_validate(response.body)
+                return Cancelled.model_validate(body)
             case Requests.ATTACH:
-                return Attached.model_validate(response.body)
+                return Attached.model_validate(body)
             case Requests.BREAKPOINTLOCATIONS:
-                return BreakpointLocationsResponse.model_validate(response.body)
+                return BreakpointLocationsResponse.model_validate(body)
             case Requests.COMPLETIONS:
-                return CompletionsResponse.model_validate(response.body)
+                return CompletionsResponse.model_validate(body)
             case Requests.CONFIGURATIONDONE:
-                return ConfigurationDone.model_validate(response.body)
+                return ConfigurationDone.model_validate(body)
             case Requests.CONTINUE:
-                return Continued.model_validate(response.body)
+                return Continued.model_validate(body)
             case Requests.DATABREAKPOINTINFO:
-                return DataBreakpointInfoResponse.model_validate(response.body)
+                return DataBreakpointInfoResponse.model_validate(body)
             case Requests.DISASSEMBLE:
-                return DisassembleResponse.model_validate(response.body)
+                return DisassembleResponse.model_validate(body)
             case Requests.DISCONNECT:
-                return Disconnected.model_validate(response.body)
+                return Disconnected.model_validate(body)
             case Requests.EVALUATE:
-                return EvaluateResponse.model_validate(response.body)
+                return EvaluateResponse.model_validate(body)
             case Requests.EXCEPTIONINFO:
-                return ExceptionInfoResponse.model_validate(response.body)
+                return ExceptionInfoResponse.model_validate(body)
             case Requests.GOTO:
-                return GotoDone.model_validate(response.body)
+                return GotoDone.model_validate(body)
             case Requests.GOTOTARGETS:
-                return GotoTargetsResponse.model_validate(response.body)
+                return GotoTargetsResponse.model_validate(body)
             case Requests.LAUNCH:
-                return LaunchDone.model_validate(response.body)
+                return LaunchDone.model_validate(body)
             case Requests.LOADEDSOURCES:
-                return LoadedSourcesResponse.model_validate(response.body)
+                return LoadedSourcesResponse.model_validate(body)
             case Requests.MODULES:
-                return ModulesResponse.model_validate(response.body)
+                return ModulesResponse.model_validate(body)
             case Requests.NEXT:
-                return NextResponse.model_validate(response.body)
+                return NextResponse.model_validate(body)
             case Requests.PAUSE:
-                return Paused.model_validate(response.body)
+                return Paused.model_validate(body)
             case Requests.READMEMORY:
-                return ReadMemoryResponse.model_validate(response.body)
+                return ReadMemoryResponse.model_validate(body)
             case Requests.RESTART:
-                return Restarted.model_validate(response.body)
+                return Restarted.model_validate(body)
             case Requests.RESTARTFRAME:
-                return RestartFrameDone.model_validate(response.body)
+                return RestartFrameDone.model_validate(body)
             case Requests.REVERSECONTINUE:
-                return ReverseContinueDone.model_validate(response.body)
+                return ReverseContinueDone.model_validate(body)
             case Requests.SCOPES:
-                return ScopesResponse.model_validate(response.body)
+                return ScopesResponse.model_validate(body)
             case Requests.SETBREAKPOINTS:
-                return SetBreakpointsResponse.model_validate(response.body)
+                return SetBreakpointsResponse.model_validate(body)
             case Requests.SETDATABREAKPOINTS:
-                return SetDataBreakpointsResponse.model_validate(response.body)
+                return SetDataBreakpointsResponse.model_validate(body)
             case Requests.SETEXCEPTIONBREAKPOINTS:
-                return SetExceptionBreakpointsResponse.model_validate(response.body)
+                return SetExceptionBreakpointsResponse.model_validate(body)
             case Requests.SETEXPRESSION:
-                return SetExpressionResponse.model_validate(response.body)
+                return SetExpressionResponse.model_validate(body)
             case Requests.SETFUNCTIONBREAKPOINTS:
-                return SetFunctionBreakpointsResponse.model_validate(response.body)
+                return SetFunctionBreakpointsResponse.model_validate(body)
             case Requests.SETINSTRUCTIONBREAKPOINTS:
-                return SetInstructionBreakpointsResponse.model_validate(response.body)
+                return SetInstructionBreakpointsResponse.model_validate(body)
             case Requests.SETVARIABLE:
-                return SetVariableResponse.model_validate(response.body)
+                return SetVariableResponse.model_validate(body)
             case Requests.SOURCE:
-                return SourceResponse.model_validate(response.body)
+                return SourceResponse.model_validate(body)
             case Requests.STACKTRACE:
-                return StackTraceResponse.model_validate(response.body)
+                return StackTraceResponse.model_validate(body)
             case Requests.STEPBACK:
-                return StepBackDone.model_validate(response.body)
+                return StepBackDone.model_validate(body)
             case Requests.STEPIN:
-                return StepInDone.model_validate(response.body)
+                return StepInDone.model_validate(body)
             case Requests.STEPINTARGETS:
-                return StepInTargetsResponse.model_validate(response.body)
+                return StepInTargetsResponse.model_validate(body)
             case Requests.STEPOUT:
-                return StepOutDone.model_validate(response.body)
+                return StepOutDone.model_validate(body)
             case Requests.TERMINATE:
-                return Terminated.model_validate(response.body)
+                return Terminated.model_validate(body)
             case Requests.TERMINATETHREADS:
-                return TerminateThreadsDone.model_validate(response.body)
+                return TerminateThreadsDone.model_validate(body)
             case Requests.THREADS:
-                return ThreadsResponse.model_validate(response.body)
+                return ThreadsResponse.model_validate(body)
             case Requests.VARIABLES:
-                return VariablesResponse.model_validate(response.body)
+                return VariablesResponse.model_validate(body)
             case Requests.WRITEMEMORY:
-                return WriteMemoryResponse.model_validate(response.body)
+                return WriteMemoryResponse.model_validate(body)
             case _:
                 # possibly some request specific to the debug adapter?
                 # print(f"⚠️ Unsupported request: {response.command}")
@@ -0,0 +1,314 @@
+from __future__ import annotations
+
+import bisect
+import os
+import threading
+import time
+import typing
+from collections import Counter
+from typing import Any, Iterable, Optional
+
+if typing.TYPE_CHECKING:
+    import http.server
+
+# request latencies in seconds, from a local adapter answering right away to a slow
+# evaluation in a remote one
+DEFAULT_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+# "Content-Length: " and the blank line after the header
+_HEADER_SIZE = 20
+
+
+def _escape(value: Any) -> str:
+    # label values of the Prometheus text format, which only escapes these three
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Histogram:
+    """Counts of observed values in buckets with fixed upper bounds."""
+
+    def __init__(self, bounds: Iterable[float] = DEFAULT_BUCKETS) -> None:
+        """Initializes the histogram.
+
+        Args:
+            bounds: The upper bounds of the buckets in ascending order, the last \
+                bucket counts everything larger.
+        """
+
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        """Count a value."""
+
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile, interpolating within its bucket like Prometheus does.
+
+        Args:
+            q: The quantile, between 0 and 1.
+
+        Returns:
+            The estimate, the largest bound if it falls in the last bucket, and 0.0 \
+                without values.
+        """
+
+        if not self.count:
+            return 0.0
+
+        rank = q * self.count
+        cumulative = 0
+        for i, count in enumerate(self.counts):
+            if cumulative + count >= rank and count:
+                if i == len(self.bounds):
+                    return self.bounds[-1]
+                lower = self.bounds[i - 1] if i else 0.0
+                upper = self.bounds[i]
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.bounds[-1]
+
+    def snapshot(self) -> dict[str, Any]:
+        """The count, sum and p50, p90 and p99 estimates of the values."""
+
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+        }
+
+
+class ClientMetrics:
+    """Opt-in instrumentation of a `Client`.
+
+    Pass it as the `metrics` of a client to count, per command, the requests sent,
+    the failed ones and the ones still in flight, with a histogram of the time from
+    `send_request` to the handling of their responses. The received events are
+    counted per type, and the bytes sent and received in total.
+
+    A client without metrics only pays for a `None` check per message. Read the
+    metrics with `snapshot`, or in the Prometheus text format with `prometheus`,
+    `write` for the textfile collector of the node exporter, or `serve` to be
+    scraped over HTTP.
+
+    Example:
+
+    ```python
+    metrics = ClientMetrics()
+    client = Client("debugpy", metrics=metrics)
+    ...
+    print(metrics.snapshot()["latency"]["stackTrace"]["p99"])
+    ```
+    """
+
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS) -> None:
+        """Initializes the metrics.
+
+        Args:
+            buckets: The upper bounds of the latency histogram buckets in seconds.
+        """
+
+        self.buckets = tuple(buckets)
+        self.started = time.monotonic()
+
+        self.requests: Counter[str] = Counter()
+        self.failures: Counter[str] = Counter()
+        self.superseded: Counter[str] = Counter()
+        self.events: Counter[str] = Counter()
+        self.latency: dict[str, Histogram] = {}
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+        # command and start time of the requests waiting for a response
+        self._in_flight: dict[int, tuple[str, float]] = {}
+
+    def request_sent(self, seq: int, command: str) -> None:
+        """Start timing a request, called by the client as it is queued."""
+
+        self.requests[command] += 1
+        self._in_flight[seq] = (command, time.perf_counter())
+
+    def response_received(self, seq: int, success: bool) -> None:
+        """Stop timing a request, called by the client as its response is handled."""
+
+        if (started := self._in_flight.pop(seq, None)) is None:
+            return
+        command, start = started
+        if (histogram := self.latency.get(command)) is None:
+            histogram = self.latency[command] = Histogram(self.buckets)
+        histogram.observe(time.perf_counter() - start)
+        if not success:
+            self.failures[command] += 1
+
+    def request_superseded(self, seq: int) -> None:
+        """Forget a request whose response is dropped without being handled."""
+
+        if (started := self._in_flight.pop(seq, None)) is not None:
+            self.superseded[started[0]] += 1
+
+    def message_received(self, length: int) -> None:
+        """Count a received message, given the length of its content."""
+
+        self.bytes_received += length + _HEADER_SIZE + len(str(length))
+
+    def in_flight(self) -> Counter[str]:
+        """The number of requests waiting for a response, per command."""
+
+        return Counter(command for command, _ in list(self._in_flight.values()))
+
+    def snapshot(self) -> dict[str, Any]:
+        """The current values as plain data, e.g. to log them as JSON.
+
+        Event rates are per second since the metrics were created.
+        """
+
+        uptime = time.monotonic() - self.started
+        return {
+            "uptime": uptime,
+            "requests": dict(self.requests),
+            "failures": dict(self.failures),
+            "superseded": dict(self.superseded),
+            "in_flight": dict(self.in_flight()),
+            "latency": {
+                command: histogram.snapshot()
+                for command, histogram in list(self.latency.items())
+            },
+            "events": dict(self.events),
+            "event_rates": {
+                event: count / uptime for event, count in list(self.events.items())
+            },
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+        }
+
+    def prometheus(self, prefix: str = "dap", labels: Optional[dict] = None) -> str:
+        """The current values in the Prometheus text exposition format.
+
+        Args:
+            prefix: The prefix of the metric names.
+            labels: Labels added to every sample, e.g. to tell sessions apart.
+        """
+
+        common = "".join(
+            f'{name}="{_escape(value)}",' for name, value in (labels or {}).items()
+        )
+        lines = []
+
+        def family(name: str, kind: str, help: str) -> str:
+            name = f"{prefix}_{name}"
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            return name
+
+        def samples(name: str, label: str, values: dict[str, float]) -> None:
+            for key, value in sorted(values.items()):
+                lines.append(f'{name}{{{common}{label}="{_escape(key)}"}} {value}')
+
+        name = family("requests_total", "counter", "Requests sent.")
+        samples(name, "command", self.requests)
+        name = family("request_failures_total", "counter", "Error responses.")
+        samples(name, "command", self.failures)
+        name = family(
+            "requests_superseded_total",
+            "counter",
+            "Responses dropped as the debuggee resumed.",
+        )
+        samples(name, "command", self.superseded)
+        name = family("requests_in_flight", "gauge", "Requests awaiting a response.")
+        samples(name, "command", self.in_flight())
+
+        name = family(
+            "request_duration_seconds", "histogram", "Time until a response is handled."
+        )
+        for command, histogram in sorted(list(self.latency.items())):
+            tags = f'{common}command="{_escape(command)}"'
+            cumulative = 0
+            for bound, count in zip(histogram.bounds, histogram.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{tags},le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{tags},le="+Inf"}} {histogram.count}')
+            lines.append(f"{name}_sum{{{tags}}} {histogram.sum}")
+            lines.append(f"{name}_count{{{tags}}} {histogram.count}")
+
+        name = family("events_total", "counter", "Events received.")
+        samples(name, "event", self.events)
+
+        braces = f"{{{common.rstrip(',')}}}" if common else ""
+        name = family("sent_bytes_total", "counter", "Bytes sent.")
+        lines.append(f"{name}{braces} {self.bytes_sent}")
+        name = family("received_bytes_total", "counter", "Bytes received.")
+        lines.append(f"{name}{braces} {self.bytes_received}")
+
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str, **kwargs: Any) -> None:
+        """Write the Prometheus text format to a file, replacing it atomically.
+
+        Args:
+            path: The file, e.g. `*.prom` in the directory of the textfile collector.
+            **kwargs: Passed to `prometheus`.
+        """
+
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "w") as f:
+            f.write(self.prometheus(**kwargs))
+        os.replace(temporary, path)
+
+    def serve(
+        self, host: str = "127.0.0.1", port: int = 0, **kwargs: Any
+    ) -> http.server.HTTPServer:
+        """Serve the Prometheus text format over HTTP from a daemon thread.
+
+        Args:
+            host: The host to listen on.
+            port: The port to listen on, any free one by default.
+            **kwargs: Passed to `prometheus`.
+
+        Returns:
+            The server, call `shutdown` on it to stop serving. The port is in \
+                `server.server_address`.
+        """
+
+        import http.server
+
+        metrics = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                body = metrics.prometheus(**kwargs).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+        server = http.server.ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
@@ -0,0 +1,12 @@
+from pydantic import BaseModel, ConfigDict
+
+
+class DAPModel(BaseModel):
+    """Base class of the models of the protocol.
+
+    Their validators and serializers are built the first time a model is used rather
+    than when it is defined, so importing the package does not build the schemas of
+    the hundreds of models a client may never receive.
+    """
+
+    model_config = ConfigDict(defer_build=True)
@@ -0,0 +1,442 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import multiprocessing
+import os
+import threading
+import traceback
+from multiprocessing.connection import wait
+from typing import Any, Callable, Hashable, Optional
+
+from .base import ErrorResponse
+from .connection import AsyncConnection
+from .sessions import Session, SessionManager
+
+
+class _WorkerManager(SessionManager):
+    """The sessions of one worker process, forwarding their messages to the pool."""
+
+    def __init__(
+        self,
+        pipe,
+        process: Optional[Callable[[Hashable, Any], Any]],
+        budget: int,
+        max_backlog: int,
+    ) -> None:
+        super().__init__(budget, max_backlog)
+        self.pipe = pipe
+        self.process = process
+        self._outbox: list[tuple] = []
+        self._adding: dict[Hashable, list[tuple]] = {}
+        # the last response forwarded by the callback of its request
+        self._answered: Any = None
+        self._tasks: set[asyncio.Task] = set()
+
+    def handle_message(self, session: Session, message: Any) -> None:
+        if message is self._answered:
+            # already forwarded with its token, right before it was yielded
+            self._answered = None
+            return
+        self._forward_message(session, None, message)
+
+    def _forward_message(
+        self, session: Session, token: Optional[int], message: Any
+    ) -> None:
+        if self.process is None:
+            message = self._decoded(session, message)
+        else:
+            message = self.process(session.id, message)
+            if message is None and token is None:
+                return
+        self._forward(("message", session.id, token, message))
+
+    def _decoded(self, session: Session, message: Any) -> dict[str, Any]:
+        # the message as it was decoded from JSON, a fraction of the cost of the model
+        # to pickle and unpickle
+        data = session.client.handler.last_decoded
+        if (
+            isinstance(message, ErrorResponse)
+            and data.get("request_seq") != message.request_seq
+        ):
+            # a superseded request, answered by the client itself
+            return message.model_dump(exclude_none=True)
+        return data
+
+    def configure_child(self, child: Session) -> None:
+        self._forward(("child", child.id, child.parent.id))
+        task = asyncio.create_task(self._watch(child))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _forward(self, item: tuple) -> None:
+        # everything forwarded in one loop iteration is sent as a single batch
+        if not self._outbox:
+            self.loop.call_soon(self._flush)
+        self._outbox.append(item)
+
+    def _flush(self) -> None:
+        outbox, self._outbox = self._outbox, []
+        if outbox:
+            self.pipe.send(outbox)
+
+    def on_command(self, command: str, session_id: Hashable, *args: Any) -> None:
+        if session_id in self._adding:
+            # still connecting, replayed once the session is added
+            self._adding[session_id].append((command, session_id, *args))
+        elif command == "add":
+            self._adding[session_id] = []
+            task = asyncio.create_task(self._add(session_id, *args))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        elif (session := self.sessions.get(session_id)) is None:
+            return
+        elif command == "request":
+            token, request, arguments = args
+            callback = None if token is None else self._tag(session, token)
+            session.client.send_request(request, arguments, callback)
+        elif command == "remove":
+            task = asyncio.create_task(self.remove(session))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    def _tag(self, session: Session, token: int) -> Callable[[Any], None]:
+        # forwards the response with the token of its request, also the `cancelled`
+        # error of a superseded request, which is never yielded by the client
+        def callback(response: Any) -> None:
+            self._answered = response
+            self._forward_message(session, token, response)
+
+        return callback
+
+    async def _add(
+        self,
+        session_id: Hashable,
+        adapter_id: str,
+        host: str,
+        port: int,
+        connection: Optional[AsyncConnection],
+    ) -> None:
+        try:
+            session = await self.add(adapter_id, host, port, connection, session_id)
+        except Exception as e:
+            del self._adding[session_id]
+            self._forward(("closed", session_id, repr(e)))
+            return
+
+        for command in self._adding.pop(session_id):
+            self.on_command(*command)
+        await self._watch(session)
+
+    async def _watch(self, session: Session) -> None:
+        # tells the pool once a session, or a child session, is closed
+        try:
+            await session.wait_closed()
+            error = None
+        except Exception as e:
+            error = repr(e)
+        self._forward(("closed", session.id, error))
+
+
+async def _serve(pipe, *args: Any) -> None:
+    manager = _WorkerManager(pipe, *args)
+    await manager.start()
+
+    loop = asyncio.get_running_loop()
+    stopped = loop.create_future()
+
+    def on_readable():
+        try:
+            while pipe.poll():
+                command = pipe.recv()
+                if command[0] == "stop":
+                    raise EOFError
+                manager.on_command(*command)
+        except EOFError:
+            loop.remove_reader(pipe.fileno())
+            if not stopped.done():
+                stopped.set_result(None)
+
+    loop.add_reader(pipe.fileno(), on_readable)
+    await stopped
+
+    await manager.stop()
+    await asyncio.gather(*manager._tasks, return_exceptions=True)
+    manager._flush()
+
+
+def _worker_main(pipe, *args: Any) -> None:
+    asyncio.run(_serve(pipe, *args))
+    pipe.close()
+
+
+class SessionPool:
+    """Abstract pool of debug adapter sessions sharded across worker processes.
+
+    Decoding and validating messages is CPU-bound, so a single `SessionManager` is
+    limited to one core. The pool starts `workers` processes, each running its own
+    `SessionManager`, and spreads the sessions over them, always picking the worker with
+    the fewest sessions. The workers parse the messages and forward them to the parent,
+    pickled in one batch per loop iteration.
+
+    Unpickling a model costs more than validating it again, so the parent would soon
+    become the bottleneck. The workers forward each message as the dict it was decoded
+    from instead, e.g. `{"type": "response", "command": "threads", "body": ...}`, which
+    is several times cheaper to unpickle. To forward even less, pass a `process`
+    function: it is called in the worker with the model of every message, and only its
+    result, e.g. a small tuple of the fields the application needs, is forwarded and
+    handled in the parent. Messages it returns `None` for are not forwarded, unless they
+    are responses with a callback.
+
+    Child sessions started for `startDebugging` requests run on the worker of their
+    parent. Their ids are tuples of the parent id and a counter, and `session_closed`
+    is called for them like for the others.
+
+    Requests are routed to the worker owning the session with `send_request`. Messages
+    are handled on a thread of the parent. Child classes should implement the following
+    methods:
+
+    - handle_message: Handle a message of one of the sessions.
+    - session_closed: Called once a session is closed.
+    - handle_error: Called with exceptions raised by the methods above or callbacks.
+
+    Example:
+
+    ```python
+    class MyPool(SessionPool):
+        def handle_message(self, session_id, message):
+            print(session_id, message.get("event") or message.get("command"))
+
+    pool = MyPool(workers=4)
+    pool.start()
+    session_id = pool.add("debugpy", port=5678)
+    pool.send_request(session_id, "threads", callback=print)
+    ```
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        process: Optional[Callable[[Hashable, Any], Any]] = None,
+        budget: int = 64,
+        max_backlog: int = 1 << 20,
+    ) -> None:
+        """Initializes the pool.
+
+        Args:
+            workers: The number of worker processes, the number of CPUs if not given.
+            process: Called in the workers with the session id and the model of every \
+                message, returns what to forward instead of the decoded message. It \
+                must be picklable, e.g. a module level function.
+            budget: The most messages handled per session in one turn of a worker.
+            max_backlog: The number of received but unhandled bytes of a session above \
+                which reading from it is paused.
+        """
+
+        self.workers = workers or os.cpu_count() or 1
+        self.process = process
+        self.budget = budget
+        self.max_backlog = max_backlog
+        self.running = False
+
+        self._pipes: list[Any] = []
+        self._processes: list[multiprocessing.Process] = []
+        self._send_locks: list[threading.Lock] = []
+        self._thread: Optional[threading.Thread] = None
+
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._tokens = itertools.count(1)
+        self._owners: dict[Hashable, int] = {}
+        self._load: list[int] = []
+        self._callbacks: dict[int, Callable[[Any], None]] = {}
+
+    @property
+    def sessions(self) -> list[Hashable]:
+        """The ids of the open sessions."""
+
+        with self._lock:
+            return list(self._owners)
+
+    def start(self) -> None:
+        """Start the worker processes."""
+
+        context = multiprocessing.get_context("spawn")
+        for _ in range(self.workers):
+            pipe, child_pipe = context.Pipe()
+            process = context.Process(
+                target=_worker_main,
+                args=(child_pipe, self.process, self.budget, self.max_backlog),
+                daemon=True,
+            )
+            process.start()
+            child_pipe.close()
+
+            self._pipes.append(pipe)
+            self._processes.append(process)
+            self._send_locks.append(threading.Lock())
+            self._load.append(0)
+
+        self.running = True
+        self._thread = threading.Thread(target=self._run_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Terminate all sessions and stop the worker processes."""
+
+        self.running = False
+        for worker in range(self.workers):
+            self._send(worker, ("stop",))
+        for process in self._processes:
+            process.join()
+        self._thread.join()
+        for pipe in self._pipes:
+            pipe.close()
+
+    def add(
+        self,
+        adapter_id: str,
+        host: str = "localhost",
+        port: int = 6789,
+        connection: Optional[AsyncConnection] = None,
+        session_id: Optional[Hashable] = None,
+    ) -> Hashable:
+        """Start a session with a debug adapter on the least loaded worker.
+
+        The session connects in the background, requests can be sent right away.
+
+        Args:
+            adapter_id: The adapter id.
+            host: The host to connect to.
+            port: The port to connect to.
+            connection: The transport to use instead of a TCP connection to host and \
+                port. It is sent to the worker, so it must not be started yet.
+            session_id: The id of the session, a counter if not given.
+
+        Returns:
+            The id of the session.
+        """
+
+        with self._lock:
+            if session_id is None:
+                session_id = next(self._ids)
+            worker = min(range(self.workers), key=self._load.__getitem__)
+            self._owners[session_id] = worker
+            self._load[worker] += 1
+
+        self._send(worker, ("add", session_id, adapter_id, host, port, connection))
+        return session_id
+
+    def remove(self, session_id: Hashable) -> None:
+        """Terminate a session, `session_closed` is called once it is closed.
+
+        Sessions already closed are ignored."""
+
+        with self._lock:
+            worker = self._owners.get(session_id)
+        if worker is not None:
+            self._send(worker, ("remove", session_id))
+
+    def send_request(
+        self,
+        session_id: Hashable,
+        command: str,
+        arguments: Optional[dict[str, Any]] = None,
+        callback: Optional[Callable[[Any], None]] = None,
+    ) -> None:
+        """Send a request to the debug adapter of a session.
+
+        Args:
+            session_id: The id of the session.
+            command: The command to send.
+            arguments: The arguments to send, they must be picklable.
+            callback: Called with the response, or what `process` returned for it, \
+                before it is handled by `handle_message`.
+
+        Requests to sessions already closed are ignored, their callbacks are not called.
+        """
+
+        token = None
+        with self._lock:
+            worker = self._owners.get(session_id)
+            if worker is None:
+                return
+            if callback is not None:
+                token = next(self._tokens)
+                self._callbacks[token] = callback
+
+        self._send(worker, ("request", session_id, token, command, arguments))
+
+    def handle_message(self, session_id: Hashable, message: Any) -> None:
+        """Handle a message of one of the sessions.
+
+        To be implemented by subclasses.
+        """
+
+        print(session_id, type(message), flush=True)
+
+    def session_closed(self, session_id: Hashable, error: Optional[str]) -> None:
+        """Called once a session is closed.
+
+        Args:
+            session_id: The id of the session.
+            error: The representation of the exception that broke the session, if any.
+        """
+
+    def handle_error(self, session_id: Hashable, error: Exception) -> None:
+        """Called with an exception raised while handling an item of a session.
+
+        The other items are still handled. Prints the traceback unless overridden.
+
+        Args:
+            session_id: The id of the session.
+            error: The exception raised by `handle_message`, `session_closed` or a \
+                callback.
+        """
+
+        traceback.print_exception(error)
+
+    def _send(self, worker: int, command: tuple) -> None:
+        with self._send_locks[worker]:
+            self._pipes[worker].send(command)
+
+    def _run_loop(self) -> None:
+        pipes = list(self._pipes)
+        while pipes:
+            for pipe in wait(pipes):
+                try:
+                    batch = pipe.recv()
+                except EOFError:
+                    pipes.remove(pipe)
+                    continue
+
+                worker = self._pipes.index(pipe)
+                for item in batch:
+                    try:
+                        self._dispatch(worker, *item)
+                    except Exception as e:
+                        # one broken item must not stop the messages of all sessions
+                        self.handle_error(item[1], e)
+
+    def _dispatch(
+        self, worker: int, kind: str, session_id: Hashable, *args: Any
+    ) -> None:
+        if kind == "child":
+            with self._lock:
+                self._owners[session_id] = worker
+                self._load[worker] += 1
+            return
+
+        if kind == "closed":
+            with self._lock:
+                worker = self._owners.pop(session_id)
+                self._load[worker] -= 1
+            self.session_closed(session_id, *args)
+            return
+
+        token, message = args
+        if token is not None:
+            with self._lock:
+                callback = self._callbacks.pop(token)
+            callback(message)
+        self.handle_message(session_id, message)
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+from typing import NamedTuple, Optional
+
+STAGES = ("decode", "classify", "validate")
+"""The stages of handling a message timed by a `HandlerProfiler`.
+
+- decode: parsing the JSON of the message.
+- classify: validating the envelope, as a `Response`, `Event` or `Request`.
+- validate: validating the body with the model of the command or event.
+"""
+
+
+class ProfileRow(NamedTuple):
+    """The aggregated time of a stage for one command or event."""
+
+    stage: str
+    kind: str
+    """The type of the messages, `response`, `event` or `request`."""
+
+    name: str
+    """The command or the event."""
+
+    count: int
+    total: int
+    """The total time in nanoseconds."""
+
+    max: int
+    """The longest time in nanoseconds."""
+
+    @property
+    def mean(self) -> float:
+        """The mean time in nanoseconds."""
+
+        return self.total / self.count
+
+
+class HandlerProfiler:
+    """Opt-in timing of the stages the handler of a `Client` takes for every message.
+
+    Pass it as the `profiler` of a client, or set it as `client.profiler` at any time,
+    also on a live client, and set it back to `None` to stop profiling. The JSON
+    decoding, the classification and the validation of the body are timed separately
+    and aggregated per stage and command or event, so the models that dominate can be
+    told apart. Response callbacks are not part of the validation.
+
+    Example:
+
+    ```python
+    client.profiler = HandlerProfiler()
+    ...
+    print(client.profiler.report(10))
+    client.profiler = None
+    ```
+    """
+
+    def __init__(self) -> None:
+        # count, total and longest time of every stage, kind and name
+        self.stats: dict[tuple[str, str, str], list[int]] = {}
+
+    def add(self, stage: str, kind: str, name: Optional[str], elapsed: int) -> None:
+        """Count the time a stage took for a message.
+
+        Args:
+            stage: One of `STAGES`.
+            kind: The type of the message.
+            name: The command or the event.
+            elapsed: The time in nanoseconds.
+        """
+
+        if (stat := self.stats.get((stage, kind, name))) is None:
+            self.stats[stage, kind, name] = [1, elapsed, elapsed]
+            return
+        stat[0] += 1
+        stat[1] += elapsed
+        if elapsed > stat[2]:
+            stat[2] = elapsed
+
+    def reset(self) -> None:
+        """Forget the times counted so far."""
+
+        self.stats = {}
+
+    def rows(self) -> list[ProfileRow]:
+        """The aggregated times, the longest total first."""
+
+        rows = [
+            ProfileRow(stage, kind, str(name), count, total, longest)
+            for (stage, kind, name), (count, total, longest) in list(self.stats.items())
+        ]
+        rows.sort(key=lambda row: row.total, reverse=True)
+        return rows
+
+    def totals(self) -> dict[str, int]:
+        """The total time of every stage in nanoseconds."""
+
+        totals = dict.fromkeys(STAGES, 0)
+        for (stage, _, _), (_, total, _) in list(self.stats.items()):
+            totals[stage] += total
+        return totals
+
+    def report(self, top: int = 20) -> str:
+        """A table of the stages and messages that took the longest in total.
+
+        Args:
+            top: The number of rows.
+        """
+
+        rows = self.rows()
+        overall = sum(row.total for row in rows) or 1
+        lines = [
+            "  ".join(
+                f"{stage} {total / overall:.1%}"
+                for stage, total in self.totals().items()
+            ),
+            f"{'stage':<9} {'message':<36} {'count':>8} {'total ms':>10} "
+            f"{'share':>6} {'mean us':>9} {'max us':>9}",
+        ]
+        for row in rows[:top]:
+            lines.append(
+                f"{row.stage:<9} {f'{row.kind} {row.name}':<36} {row.count:>8} "
+                f"{row.total / 1e6:>10.2f} {row.total / overall:>6.1%} "
+                f"{row.mean / 1e3:>9.2f} {row.max / 1e3:>9.2f}"
+            )
+        return "\n".join(lines)
@@ -0,0 +1,454 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from .asyncserver import AsyncServer
+from .base import Events, Requests, Response
+from .buffer import CONTENT_ENCODING, ReceiveBuffer
+from .client import Client
+from .connection import AsyncConnection
+from .handler import EXECUTION_REQUESTS, Handler
+
+# reads answered from the cache while their results are valid
+CACHED_REQUESTS = frozenset(
+    {
+        Requests.THREADS,
+        Requests.STACKTRACE,
+        Requests.SCOPES,
+        Requests.VARIABLES,
+        Requests.SOURCE,
+        Requests.LOADEDSOURCES,
+        Requests.MODULES,
+        Requests.EXCEPTIONINFO,
+    }
+)
+
+# requests starting the shared session, only those of the first frontend are sent
+SESSION_REQUESTS = frozenset(
+    {Requests.LAUNCH, Requests.ATTACH, Requests.CONFIGURATIONDONE}
+)
+
+# requests ending the session, only sent when no other frontend is attached
+DETACH_REQUESTS = frozenset({Requests.DISCONNECT, Requests.TERMINATE})
+
+# events after which cached results may be stale
+INVALIDATING_EVENTS = frozenset(
+    {
+        Events.STOPPED,
+        Events.CONTINUED,
+        Events.INVALIDATED,
+        Events.MEMORY,
+        Events.THREAD,
+        Events.MODULE,
+        Events.LOADED_SOURCE,
+    }
+)
+
+
+@dataclass
+class ProxyStats:
+    """Counters of a `Proxy`."""
+
+    forwarded: int = 0
+    """The number of requests of the frontends sent to the debug adapter."""
+
+    cache_hits: int = 0
+    """The number of reads answered from the cache."""
+
+    coalesced: int = 0
+    """The number of reads answered by an identical read already in flight."""
+
+    answered: int = 0
+    """The number of requests answered by the proxy itself, like a second `launch`."""
+
+    events: int = 0
+    """The number of events sent to frontends."""
+
+
+def _rest(message: dict[str, Any], *exclude: str) -> str:
+    # the JSON of a message after its opening brace, without the given keys, to be
+    # completed with the sequence numbers of each frontend
+    if exclude:
+        message = {key: value for key, value in message.items() if key not in exclude}
+    return json.dumps(message)[1:]
+
+
+class _Frontend(asyncio.Protocol):
+    """A connection of a frontend to the proxy, which acts as its debug adapter."""
+
+    def __init__(self, proxy: Proxy) -> None:
+        self.proxy = proxy
+        self.transport: Optional[asyncio.Transport] = None
+        self.seq = 1
+        self.ready = False
+        # upstream seqs of the requests in flight, by the seqs of the frontend
+        self.upstream: dict[int, int] = {}
+        self._buffer = ReceiveBuffer()
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self.transport = transport
+        self.proxy.frontends.append(self)
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        self.transport = None
+        self.proxy._detached(self)
+
+    def data_received(self, data: bytes) -> None:
+        self._buffer.extend(data)
+        while (frame := self._buffer.pop_frame()) is not None:
+            with frame:
+                message = json.loads(str(frame, CONTENT_ENCODING))
+            self.proxy._received(self, message)
+
+    def send(self, rest: str, request_seq: Optional[int] = None) -> int:
+        """Send a message given as `_rest`, returns the seq it was sent with."""
+
+        seq = self.seq
+        self.seq += 1
+        if self.transport is None:
+            return seq
+
+        if request_seq is None:
+            content = f'{{"seq": {seq}, {rest}'
+        else:
+            content = f'{{"seq": {seq}, "request_seq": {request_seq}, {rest}'
+        encoded = content.encode(CONTENT_ENCODING)
+        self.transport.write(b"Content-Length: %d\r\n\r\n%b" % (len(encoded), encoded))
+        return seq
+
+    def respond(
+        self,
+        request_seq: int,
+        command: str,
+        success: bool = True,
+        body: Optional[Any] = None,
+        message: Optional[str] = None,
+    ) -> None:
+        """Answer a request of the frontend from the proxy itself."""
+
+        response = {"type": "response", "success": success, "command": command}
+        if message is not None:
+            response["message"] = message
+        if body is not None:
+            response["body"] = body
+        self.send(_rest(response), request_seq)
+
+    def close(self) -> None:
+        if self.transport is not None:
+            self.transport.close()
+
+
+class _ProxyHandler(Handler):
+    """Forwards every message of the debug adapter to the proxy before handling it."""
+
+    def __init__(self, client: Client, proxy: Proxy) -> None:
+        super().__init__(client)
+        self.proxy = proxy
+
+    def _parse_message(self, data: dict[str, Any]) -> Any:
+        self.proxy._from_adapter(data)
+        return super()._parse_message(data)
+
+
+class Proxy(AsyncServer):
+    """Shares the session of one debug adapter between several frontends.
+
+    Frontends, like an IDE, a web dashboard and a recorder, connect to the proxy as
+    if it were the debug adapter. Their requests are sent to the adapter through the
+    proxy's `Client`, with the sequence numbers rewritten both ways, and the events
+    of the adapter are sent to all of them.
+
+    - `initialize` is answered with the capabilities the adapter gave the proxy, and
+      frontends joining later also get the `initialized` event and the last
+      `stopped` event, if the debuggee is still stopped.
+    - `launch`, `attach` and `configurationDone` are only sent for the first
+      frontend, `disconnect` and `terminate` only for the last initialized one
+      attached. The others are answered by the proxy.
+    - Identical reads, like the same `stackTrace` or `variables` request, are
+      answered from a shared cache until the debuggee resumes or another request
+      may have changed their results. Reads arriving while an identical one is in
+      flight wait for its response, unless a request in between may have changed
+      its result. Cancelling such a read only cancels it at the adapter once no
+      other frontend waits for it. Set `cache` to `False` to send all of them.
+    - Reverse requests of the adapter are sent to the first attached frontend.
+
+    Every message is still validated and passed to `handle_message`, so the proxy
+    can observe the session in process. The frontends should initialize with the
+    defaults of `Client`, e.g. lines and columns starting at 1.
+
+    Example:
+
+    ```python
+    proxy = Proxy("debugpy", port=5678)
+    await proxy.listen(port=4711)
+    await proxy.start()
+    ```
+    """
+
+    def __init__(
+        self,
+        adapter_id: str,
+        host: str = "localhost",
+        port: int = 6789,
+        connection: Optional[AsyncConnection] = None,
+    ) -> None:
+        """Initializes the proxy.
+
+        Args:
+            adapter_id: The adapter id.
+            host: The host of the debug adapter.
+            port: The port of the debug adapter.
+            connection: The transport to the debug adapter to use instead of a TCP \
+                connection to host and port.
+        """
+
+        super().__init__(adapter_id, host, port, connection)
+        # every response goes to a frontend, even once superseded
+        self.client.cancel_superseded = False
+        self.client.handler = _ProxyHandler(self.client, self)
+
+        # whether identical reads are answered from the cache, or all sent on
+        self.cache = True
+        self.frontends: list[_Frontend] = []
+        self.stats = ProxyStats()
+        self.server: Optional[asyncio.Server] = None
+
+        # the frontends and their seqs waiting for a response, by the upstream seq
+        self._waiting: dict[int, list[tuple[_Frontend, int]]] = {}
+        # results of reads by command and arguments, and the reads in flight
+        self._cache: dict[tuple[str, str], str] = {}
+        self._reads: dict[tuple[str, str], int] = {}
+        self._read_keys: dict[int, tuple[tuple[str, str], int]] = {}
+        self._generation = 0
+
+        self._initialize: Optional[str] = None
+        self._initializing: list[tuple[_Frontend, int]] = []
+        self._initialized: Optional[str] = None
+        self._stopped: Optional[str] = None
+        self._started: set[str] = set()
+        # reverse requests sent to frontends, by the frontend and its seq
+        self._reverse: dict[tuple[_Frontend, int], tuple[int, str]] = {}
+
+    async def listen(
+        self, host: str = "127.0.0.1", port: int = 0, path: Optional[str] = None
+    ) -> asyncio.Server:
+        """Accept frontends on the running loop.
+
+        Args:
+            host: The host to listen on.
+            port: The port to listen on, a free one if 0.
+            path: The path of a Unix domain socket to listen on instead.
+
+        Returns:
+            The started server.
+        """
+
+        loop = asyncio.get_running_loop()
+        if path is not None:
+            self.server = await loop.create_unix_server(lambda: _Frontend(self), path)
+        else:
+            self.server = await loop.create_server(lambda: _Frontend(self), host, port)
+        return self.server
+
+    async def stop(self):
+        """Close the frontends and stop the session."""
+
+        if self.server is not None:
+            self.server.close()
+        for frontend in list(self.frontends):
+            frontend.close()
+        await super().stop()
+
+    def handle_message(self, message):
+        """Handle a validated message of the debug adapter.
+
+        Can be implemented by subclasses, the frontends get the messages anyway.
+        """
+
+    def _invalidate(self) -> None:
+        # reads in flight may return stale results too, later ones are sent anew
+        self._cache.clear()
+        self._reads.clear()
+        self._generation += 1
+
+    def _received(self, frontend: _Frontend, message: dict[str, Any]) -> None:
+        seq = message.get("seq")
+        if message.get("type") == "response":
+            # answer to a reverse request
+            if (
+                request := self._reverse.pop(
+                    (frontend, message.get("request_seq")), None
+                )
+            ) is not None:
+                self._respond_upstream(*request, message)
+            return
+
+        command = message.get("command")
+        arguments = message.get("arguments")
+        if command == Requests.INITIALIZE:
+            if self._initialize is None:
+                self._initializing.append((frontend, seq))
+            else:
+                self._join(frontend, seq)
+            return
+
+        if command in SESSION_REQUESTS:
+            if command in self._started:
+                self.stats.answered += 1
+                frontend.respond(seq, command)
+                return
+            self._started.add(command)
+
+        if command in DETACH_REQUESTS and any(
+            other.ready and other is not frontend for other in self.frontends
+        ):
+            self.stats.answered += 1
+            frontend.respond(seq, command)
+            frontend.close()
+            return
+
+        if command == Requests.CANCEL and arguments and "requestId" in arguments:
+            request_id = arguments["requestId"]
+            if (upstream := frontend.upstream.get(request_id)) is None:
+                self.stats.answered += 1
+                frontend.respond(seq, command)
+                return
+            waiting = self._waiting[upstream]
+            if len(waiting) > 1:
+                # other frontends still wait for the coalesced read
+                waiting.remove((frontend, request_id))
+                del frontend.upstream[request_id]
+                self.stats.answered += 1
+                frontend.respond(
+                    request_id,
+                    self._read_keys[upstream][0][0],
+                    success=False,
+                    body={},
+                    message="cancelled",
+                )
+                frontend.respond(seq, command)
+                return
+            arguments = {**arguments, "requestId": upstream}
+
+        key = None
+        if self.cache and command in CACHED_REQUESTS:
+            key = (command, json.dumps(arguments, sort_keys=True))
+            if (rest := self._cache.get(key)) is not None:
+                self.stats.cache_hits += 1
+                frontend.send(rest, seq)
+                return
+            if (upstream := self._reads.get(key)) is not None:
+                self.stats.coalesced += 1
+                self._waiting[upstream].append((frontend, seq))
+                frontend.upstream[seq] = upstream
+                return
+        elif command != Requests.CANCEL:
+            # may change what the reads return, e.g. `setVariable` or `evaluate`
+            self._invalidate()
+
+        self.stats.forwarded += 1
+        upstream = self.client.send_request(command, arguments)
+        self._waiting[upstream] = [(frontend, seq)]
+        frontend.upstream[seq] = upstream
+        if key is not None:
+            self._reads[key] = upstream
+            self._read_keys[upstream] = (key, self._generation)
+
+    def _join(self, frontend: _Frontend, seq: int) -> None:
+        frontend.send(self._initialize, seq)
+        frontend.ready = True
+        if self._initialized is not None:
+            frontend.send(self._initialized)
+        if self._stopped is not None:
+            frontend.send(self._stopped)
+
+    def _from_adapter(self, message: dict[str, Any]) -> None:
+        kind = message.get("type")
+        if kind == "response":
+            self._response(message)
+        elif kind == "event":
+            event = message.get("event")
+            rest = _rest(message, "seq")
+            if event in INVALIDATING_EVENTS:
+                self._invalidate()
+            if event == Events.INITIALIZED:
+                self._initialized = rest
+            elif event == Events.STOPPED:
+                self._stopped = rest
+            elif event == Events.CONTINUED:
+                self._stopped = None
+
+            for frontend in self.frontends:
+                if frontend.ready:
+                    frontend.send(rest)
+                    self.stats.events += 1
+        elif kind == "request":
+            self._reverse_request(message)
+
+    def _response(self, message: dict[str, Any]) -> None:
+        request_seq = message.get("request_seq")
+        rest = _rest(message, "seq", "request_seq")
+        waiting = self._waiting.pop(request_seq, None)
+        if waiting is None:
+            if message.get("command") == Requests.INITIALIZE:
+                # of the proxy's own client
+                self._initialize = rest
+                for frontend, seq in self._initializing:
+                    self._join(frontend, seq)
+                self._initializing.clear()
+            return
+
+        success = message.get("success")
+        if success and message.get("command") in EXECUTION_REQUESTS:
+            self._stopped = None
+            self._invalidate()
+        if (read := self._read_keys.pop(request_seq, None)) is not None:
+            key, generation = read
+            if self._reads.get(key) == request_seq:
+                del self._reads[key]
+            if success and generation == self._generation:
+                self._cache[key] = rest
+
+        for frontend, seq in waiting:
+            frontend.upstream.pop(seq, None)
+            frontend.send(rest, seq)
+
+    def _reverse_request(self, message: dict[str, Any]) -> None:
+        for frontend in self.frontends:
+            if frontend.ready:
+                seq = frontend.send(_rest(message, "seq"))
+                self._reverse[frontend, seq] = (message["seq"], message["command"])
+                return
+        self._respond_upstream(
+            message["seq"],
+            message["command"],
+            {"success": False, "message": "No frontend attached"},
+        )
+
+    def _respond_upstream(
+        self, request_seq: int, command: str, message: dict[str, Any]
+    ) -> None:
+        self.client.respond(
+            Response(
+                seq=0,
+                request_seq=request_seq,
+                command=command,
+                success=message.get("success", False),
+                message=message.get("message"),
+                body=message.get("body"),
+            )
+        )
+
+    def _detached(self, frontend: _Frontend) -> None:
+        if frontend in self.frontends:
+            self.frontends.remove(frontend)
+        for key in [key for key in self._reverse if key[0] is frontend]:
+            request_seq, command = self._reverse.pop(key)
+            self._respond_upstream(
+                request_seq,
+                command,
+                {"success": False, "message": "Frontend detached"},
+            )
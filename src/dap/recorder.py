@@ -0,0 +1,451 @@
+from __future__ import annotations
+
+import bisect
+import json
+import mmap
+import struct
+import threading
+import time
+import typing
+from array import array
+from typing import Any, BinaryIO, Callable, Iterator, NamedTuple, Optional
+
+from .base import Request
+from .buffer import ReceiveBuffer
+from .handler import SUPERSEDABLE_REQUESTS
+
+if typing.TYPE_CHECKING:
+    from .client import Client
+
+
+MAGIC = b"DAPLOG1\n"
+
+RECEIVED = 0
+SENT = 1
+
+# direction, wall clock time in nanoseconds, length of the data
+_HEADER = struct.Struct("<BQI")
+
+# records per entry of the offset index of a `TraceReader`
+_INDEX_STRIDE = 64
+
+
+class Record(NamedTuple):
+    """Data that went over the wire, as logged by a `Recorder`."""
+
+    direction: int
+    """`RECEIVED` for data from the debug adapter, `SENT` for data to it."""
+
+    timestamp: int
+    """The wall clock time in nanoseconds."""
+
+    data: bytes
+    """The messages, headers included."""
+
+
+class Recorder:
+    """Opt-in log of the raw messages a client sends and receives.
+
+    Pass it as the `recorder` of a `Client`. Every chunk of data the client sends and
+    every message it receives is appended to a compact binary log, with a timestamp
+    and the direction, so a slow session can be reproduced later with a `Replayer`,
+    or kept as a regression and profiling corpus.
+
+    A record is a 13 bytes header followed by the data as it went over the wire. The
+    log is buffered, call `close` or use the recorder as a context manager to flush it.
+
+    Example:
+
+    ```python
+    with Recorder("session.daplog") as recorder:
+        client = Client("debugpy", recorder=recorder)
+        ...
+    ```
+    """
+
+    def __init__(self, file: str | BinaryIO, buffer_size: int = 1 << 16) -> None:
+        """Initializes the recorder.
+
+        Args:
+            file: The path of the log, appended to if it exists, or a binary file \
+                open for writing.
+            buffer_size: The number of bytes buffered before they are written.
+        """
+
+        if isinstance(file, str):
+            file = open(file, "ab", buffering=buffer_size)
+        self.file = file
+        self.records = 0
+        self._lock = threading.Lock()
+
+        if self.file.tell() == 0:
+            self.file.write(MAGIC)
+
+    def record(self, direction: int, data: bytes | memoryview) -> None:
+        """Append data that was sent or received.
+
+        Safe to call from any thread.
+        """
+
+        header = _HEADER.pack(direction, time.time_ns(), len(data))
+        with self._lock:
+            if self.file.closed:
+                return
+            self.file.write(header)
+            self.file.write(data)
+            self.records += 1
+
+    def received(self, content: memoryview) -> None:
+        """Append a received message, given its content without headers."""
+
+        headers = b"Content-Length: %d\r\n\r\n" % len(content)
+        header = _HEADER.pack(RECEIVED, time.time_ns(), len(headers) + len(content))
+        with self._lock:
+            if self.file.closed:
+                return
+            self.file.write(header + headers)
+            self.file.write(content)
+            self.records += 1
+
+    def close(self) -> None:
+        """Flush and close the log, data sent or received afterwards is not logged."""
+
+        with self._lock:
+            self.file.close()
+
+    def __enter__(self) -> Recorder:
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+
+class Replayer:
+    """Feeds a log written by a `Recorder` back through a client.
+
+    The received messages are parsed, validated and handled by the client like in the
+    recorded session. The requests the recorded client sent are registered with the
+    replaying client as pending, so their responses are matched like the originals,
+    but nothing is sent anywhere.
+
+    By default the log is replayed as fast as possible, e.g. to profile the client. With
+    `pacing`, the records are fed at the times they were recorded, divided by `speed`.
+
+    Example:
+
+    ```python
+    replayer = Replayer("session.daplog")
+    replayer.replay(on_message=print, pacing=True)
+    ```
+    """
+
+    def __init__(self, path: str) -> None:
+        """Initializes the replayer.
+
+        Args:
+            path: The path of the log.
+        """
+
+        self.path = path
+
+    def __iter__(self) -> Iterator[Record]:
+        """The records of the log in order."""
+
+        with open(self.path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"Not a session log: {self.path}")
+
+            while header := f.read(_HEADER.size):
+                if len(header) < _HEADER.size:
+                    # cut off while recording
+                    break
+                direction, timestamp, length = _HEADER.unpack(header)
+                data = f.read(length)
+                if len(data) < length:
+                    break
+                yield Record(direction, timestamp, data)
+
+    def replay(
+        self,
+        client: Optional[Client] = None,
+        on_message: Optional[Callable[[Any], None]] = None,
+        pacing: bool = False,
+        speed: float = 1.0,
+    ) -> int:
+        """Feed the log through a client.
+
+        Args:
+            client: The client to feed, a new one if not given. It should not have \
+                sent requests of its own yet.
+            on_message: Called with every message the client yields.
+            pacing: Whether to wait between the records as long as in the recorded \
+                session, instead of replaying as fast as possible.
+            speed: How many times faster than recorded to replay, with `pacing`.
+
+        Returns:
+            The number of messages the client yielded.
+        """
+
+        if client is None:
+            from .client import Client
+
+            client = Client("replay")
+        # the initialize request of a new client is part of the log again
+        client.send()
+
+        messages = 0
+        start = time.perf_counter()
+        first: Optional[int] = None
+        for direction, timestamp, data in self:
+            if pacing:
+                if first is None:
+                    first = timestamp
+                delay = (timestamp - first) / 1e9 / speed
+                if (wait := delay - (time.perf_counter() - start)) > 0:
+                    time.sleep(wait)
+
+            if direction == SENT:
+                _register(client, data)
+                continue
+
+            for message in client.receive(data):
+                messages += 1
+                if on_message is not None:
+                    on_message(message)
+
+        return messages
+
+
+class TraceReader:
+    """Random access to a log written by a `Recorder`, without loading it into memory.
+
+    The log is memory-mapped and the records are returned as views into the mapping,
+    so logs of long sessions, gigabytes in size, can be read, sliced and replayed in
+    constant memory. The records are located through an index of the offset and time
+    of every 64th record, built as far as needed the first time a record is accessed.
+
+    The data of the records, and the records themselves, are only valid until the
+    reader is closed.
+
+    Example:
+
+    ```python
+    with TraceReader("session.daplog") as trace:
+        start = trace.find(stop_time_ns)
+        trace.feed(client, start, start + 1000)
+    ```
+    """
+
+    def __init__(self, path: str) -> None:
+        """Initializes the reader.
+
+        Args:
+            path: The path of the log.
+
+        Raises:
+            ValueError: The file is not a session log.
+        """
+
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"Not a session log: {path}")
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+
+        self._offsets = array("Q")
+        self._timestamps = array("Q")
+        # the first record that is not indexed yet, and where it starts
+        self._scanned = 0
+        self._scan_offset = len(MAGIC)
+        self._length: Optional[int] = None
+
+    def __len__(self) -> int:
+        """The number of records, indexing the whole log the first time."""
+
+        self._index(None)
+        return self._length
+
+    def __getitem__(self, index: int) -> Record:
+        if index < 0:
+            index += len(self)
+        for record in self.records(index, index + 1):
+            return record
+        raise IndexError("record index out of range")
+
+    def __iter__(self) -> Iterator[Record]:
+        return self.records()
+
+    def records(self, start: int = 0, stop: Optional[int] = None) -> Iterator[Record]:
+        """The records from index `start` up to, excluding, `stop`, or to the end.
+
+        Their data are memoryviews of the mapped log, nothing is copied.
+        """
+
+        view = self._view
+        for direction, timestamp, begin, end in self._spans(start, stop):
+            yield Record(direction, timestamp, view[begin:end])
+
+    def find(self, timestamp: int) -> int:
+        """The index of the first record at or after a wall clock time.
+
+        Args:
+            timestamp: The time in nanoseconds, like `time.time_ns`.
+
+        Returns:
+            The index of the record, or the number of records if all are older.
+        """
+
+        self._index(None)
+        # the last indexed record before the time, then walk from there
+        entry = max(0, bisect.bisect_left(self._timestamps, timestamp) - 1)
+        index = entry * _INDEX_STRIDE
+        for _, recorded, _, _ in self._spans(index, None):
+            if recorded >= timestamp:
+                break
+            index += 1
+        return index
+
+    def feed(
+        self,
+        client: Client,
+        start: int = 0,
+        stop: Optional[int] = None,
+        on_message: Optional[Callable[[Any], None]] = None,
+    ) -> int:
+        """Stream the received messages of a range of records through a client.
+
+        The content of every message is handed to the handler of the client as a view
+        of the mapped log, without being copied into its receive buffer. The requests
+        sent in the range are registered as pending, like with a `Replayer`.
+
+        Args:
+            client: The client to feed. It should not have sent requests of its own.
+            start: The index of the first record.
+            stop: The index after the last record, the end of the log if not given.
+            on_message: Called with every message the client yields.
+
+        Returns:
+            The number of messages the client yielded.
+        """
+
+        # the initialize request of a new client is part of the log again
+        client.send()
+
+        handle_frame = client.handler.handle_frame
+        data = self._map
+        view = self._view
+        messages = 0
+        for direction, _, begin, end in self._spans(start, stop):
+            if direction == SENT:
+                _register(client, view[begin:end])
+                continue
+
+            # a received record is a single message
+            content = data.find(b"\r\n\r\n", begin, end) + 4
+            if (message := handle_frame(view[content:end])) is not None:
+                messages += 1
+                if on_message is not None:
+                    on_message(message)
+
+        return messages
+
+    def close(self) -> None:
+        """Unmap the log, invalidating the records read from it."""
+
+        self._view.release()
+        try:
+            self._map.close()
+        except BufferError:
+            # records still referenced, unmapped once they are collected
+            pass
+
+    def __enter__(self) -> TraceReader:
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def _spans(
+        self, start: int, stop: Optional[int]
+    ) -> Iterator[tuple[int, int, int, int]]:
+        # direction, time, and where the data of every record begins and ends
+        offset = self._locate(start)
+        if offset is None:
+            return
+
+        data = self._map
+        size = len(data)
+        unpack = _HEADER.unpack_from
+        index = start
+        while stop is None or index < stop:
+            begin = offset + _HEADER.size
+            if begin > size:
+                break
+            direction, timestamp, length = unpack(data, offset)
+            if (offset := begin + length) > size:
+                # cut off while recording
+                break
+            yield direction, timestamp, begin, offset
+            index += 1
+
+    def _locate(self, index: int) -> Optional[int]:
+        # the offset of a record, or None if there are fewer records
+        if index < 0:
+            raise IndexError("record index out of range")
+        self._index(index)
+        if index >= self._scanned:
+            return None
+
+        offset = self._offsets[index // _INDEX_STRIDE]
+        for _ in range(index % _INDEX_STRIDE):
+            offset += _HEADER.size + _HEADER.unpack_from(self._map, offset)[2]
+        return offset
+
+    def _index(self, index: Optional[int]) -> None:
+        # index the log up to the given record, or to the end
+        if self._length is not None:
+            return
+
+        data = self._map
+        size = len(data)
+        unpack = _HEADER.unpack_from
+        offset = self._scan_offset
+        scanned = self._scanned
+        while index is None or scanned <= index:
+            if offset + _HEADER.size > size:
+                self._length = scanned
+                break
+            _, timestamp, length = unpack(data, offset)
+            if offset + _HEADER.size + length > size:
+                self._length = scanned
+                break
+            if scanned % _INDEX_STRIDE == 0:
+                self._offsets.append(offset)
+                self._timestamps.append(timestamp)
+            offset += _HEADER.size + length
+            scanned += 1
+
+        self._scanned = scanned
+        self._scan_offset = offset
+
+
+def _register(client: Client, data: bytes | memoryview) -> None:
+    # register the requests in sent data as pending with the client
+    buffer = ReceiveBuffer(len(data))
+    buffer.extend(data)
+    while (frame := buffer.pop_frame()) is not None:
+        with frame:
+            content = json.loads(str(frame, "utf-8"))
+        if content.get("type") != "request":
+            continue
+
+        seq = content["seq"]
+        command = content["command"]
+        client._pending_requests[seq] = Request(
+            seq=seq, command=command, arguments=content.get("arguments")
+        )
+        if command in SUPERSEDABLE_REQUESTS:
+            client._request_epochs[seq] = client.stop_epoch
+        # requests the client queues itself, like cancellations, must not collide
+        client._seq = max(client._seq, seq + 1)
@@ -1,4 +1,4 @@
-from typing import Literal, Optional, TypedDict
+from typing import Any, Literal, Optional, TypedDict
 
 from pydantic import Field
 
@@ -66,11 +66,13 @@ class RunInTerminalRequest(Request):
         success: bool,
         processId: Optional[int] = None,
         shellProcessId: Optional[int] = None,
+        message: Optional[str] = None,
     ) -> RunInTerminalResponse:
         return RunInTerminalResponse(
-            seq=self.seq,
+            seq=0,  # assigned by `Client.respond`
             request_seq=self.seq,
             success=success,
+            message=message,
             body=RunInTerminalResponseBody(
                 processId=processId,
                 shellProcessId=shellProcessId,
@@ -81,7 +83,7 @@ class RunInTerminalRequest(Request):
 class StartDebuggingRequestArguments(RequestArguments):
     """Arguments for 'startDebugging' request."""
 
-    configuration: dict[str, str] = Field(
+    configuration: dict[str, Any] = Field(
         ...,
         description="Arguments passed to the new debug session. The arguments must only contain properties understood by "
         "the `launch` or `attach` requests of the debug adapter and they must not contain any client-specific properties "
@@ -99,9 +101,12 @@ class StartDebuggingRequest(Request):
     command: Literal["startDebugging"] = "startDebugging"
     arguments: StartDebuggingRequestArguments
 
-    def reply(self, success: bool) -> StartDebuggingResponse:
+    def reply(
+        self, success: bool, message: Optional[str] = None
+    ) -> StartDebuggingResponse:
         return StartDebuggingResponse(
-            seq=self.seq,
+            seq=0,  # assigned by `Client.respond`
             request_seq=self.seq,
             success=success,
+            message=message,
         )
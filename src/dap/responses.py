@@ -43,13 +43,13 @@ class StartDebuggingResponse(Response):
 
 
 # Request Responses
-class Cancelled(Response):
+class Cancelled(ResponseBody):
     """Response to 'cancel' request."""
 
     ...
 
 
-class Attached(Response):
+class Attached(ResponseBody):
     """Response to 'attach' request."""
 
     ...
@@ -69,7 +69,7 @@ class CompletionsResponse(ResponseBody):
     targets: list[CompletionItem] = Field(..., description="List of completion items.")
 
 
-class ConfigurationDone(Response):
+class ConfigurationDone(ResponseBody):
     """Response to 'configurationDone' request."""
 
     ...
@@ -108,7 +108,7 @@ class DisassembleResponse(ResponseBody):
     )
 
 
-class Disconnected(Response):
+class Disconnected(ResponseBody):
     """Response to 'disconnect' request."""
 
     ...
@@ -150,7 +150,7 @@ class ExceptionInfoResponse(ResponseBody):
     )
 
 
-class GotoDone(Response):
+class GotoDone(ResponseBody):
     """Response to 'goto' request."""
 
     ...
@@ -168,7 +168,7 @@ class Initialized(Capabilities):
     ...
 
 
-class LaunchDone(Response):
+class LaunchDone(ResponseBody):
     """Response to 'launch' request."""
 
     ...
@@ -189,13 +189,13 @@ class ModulesResponse(ResponseBody):
     )
 
 
-class NextResponse(Response):
+class NextResponse(ResponseBody):
     """Response to 'next' request."""
 
     ...
 
 
-class Paused(Response):
+class Paused(ResponseBody):
     """Response to 'pause' request."""
 
     ...
@@ -211,19 +211,19 @@ class ReadMemoryResponse(ResponseBody):
     data: Optional[str] = Field(None, description="The data read from memory.")
 
 
-class Restarted(Response):
+class Restarted(ResponseBody):
     """Response to 'restart' request."""
 
     ...
 
 
-class RestartFrameDone(Response):
+class RestartFrameDone(ResponseBody):
     """Response to 'restartFrame' request."""
 
     ...
 
 
-class ReverseContinueDone(Response):
+class ReverseContinueDone(ResponseBody):
     """Response to 'reverseContinue' request."""
 
     ...
@@ -253,7 +253,7 @@ class SetExceptionBreakpointsResponse(ResponseBody):
     breakpoints: list[ExceptionBreakpointsFilter]
 
 
-class SetExceptionBreakpointsResponse(Response):
+class SetExceptionBreakpointsResponse(ResponseBody):
     """Response to 'setExceptionBreakpoints' request."""
 
     ...
@@ -330,13 +330,13 @@ class StackTraceResponse(ResponseBody):
     totalFrames: Optional[int] = Field(None, description="The total number of frames.")
 
 
-class StepBackDone(Response):
+class StepBackDone(ResponseBody):
     """Response to 'stepBack' request."""
 
     ...
 
 
-class StepInDone(Response):
+class StepInDone(ResponseBody):
     """Response to 'stepIn' request."""
 
     ...
@@ -348,19 +348,19 @@ class StepInTargetsResponse(ResponseBody):
     targets: list[StepInTarget] = Field(..., description="List of step in targets.")
 
 
-class StepOutDone(Response):
+class StepOutDone(ResponseBody):
     """Response to 'stepOut' request."""
 
     ...
 
 
-class Terminated(Response):
+class Terminated(ResponseBody):
     """Response to 'terminate' request."""
 
     ...
 
 
-class TerminateThreadsDone(Response):
+class TerminateThreadsDone(ResponseBody):
     """Response to 'terminateThreads' request."""
 
     ...
@@ -1,4 +1,5 @@
 import threading
+from typing import Optional
 
 from .client import Client
 from .connection import Connection
@@ -12,19 +13,28 @@ class ThreadedServer:
     - handle_message
     """
 
-    def __init__(self, adapter_id: str, host="localhost", port=6789) -> None:
+    def __init__(
+        self,
+        adapter_id: str,
+        host="localhost",
+        port=6789,
+        connection: Optional[Connection] = None,
+    ) -> None:
         """Initializes the server with the given adapter_id, host and port
 
         Args:
             adapter_id (str): The adapter id
             host (str, optional): The host to connect to. Defaults to "localhost".
             port (int, optional): The port to connect to. Defaults to 6789.
+            connection (Connection, optional): The transport to use instead of a TCP \
+                connection to host and port, e.g. a `StdioConnection`.
         """
 
-        self.connection = Connection(host, port)
+        self.connection = connection or Connection(host, port)
         self.connection.start()
 
         self.client = Client(adapter_id)
+        self.client.on_send = self.connection.wakeup
         self.running = False
 
     def start(self):
@@ -36,23 +46,41 @@ class ThreadedServer:
     def stop(self):
         """Stops the server"""
 
-        self.running = False
+        self.client.on_send = None
+        self.client.flush()
         self.client.terminate()
-        self.connection.stop()
+        try:
+            if s := self.client.send():
+                self.connection.write(s)
+        finally:
+            # also when the adapter is already gone and the write fails
+            self.running = False
+            self.connection.stop()
 
     def _run_loop(self):
         while self.running and self.connection.alive and self.run_single():
             ...
 
     def run_single(self):
+        """Flush queued requests, then wait for and handle data from the adapter.
+
+        Returns:
+            False once the connection is closed.
+        """
+
         if s := self.client.send():
             self.connection.write(s)
 
-        r = self.connection.read()
-        if not r:
+        if not self.connection.wait_readable():
+            # woken up to send new requests
+            return self.connection.alive
+
+        with self.client.get_buffer(self.connection.read_size) as buf:
+            nbytes = self.connection.recv_into(buf)
+        if not nbytes:
             return False
 
-        for result in self.client.receive(r):
+        for result in self.client.buffer_updated(nbytes):
             self.handle_message(result)
 
         return True
@@ -0,0 +1,451 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, fields
+from typing import Any, Hashable, Iterator, Optional
+
+from .client import Client
+from .connection import AsyncConnection, CloneUnsupported
+from .events import StoppedEvent, ThreadEvent
+from .requests import StartDebuggingRequest
+from .responses import ThreadsResponse
+
+
+@dataclass
+class SessionStats:
+    """Counters of a session driven by a `SessionManager`."""
+
+    messages: int = 0
+    """The number of messages handled."""
+
+    bytes_received: int = 0
+    bytes_sent: int = 0
+
+    turns: int = 0
+    """The number of times the session was scheduled."""
+
+    handle_time: float = 0.0
+    """The time in seconds spent handling the session's messages."""
+
+    max_wait: float = 0.0
+    """The longest time in seconds the session waited for its turn."""
+
+    max_backlog: int = 0
+    """The most received bytes buffered but not handled yet at the start of a turn."""
+
+    read_pauses: int = 0
+    """The number of times reading was paused because the backlog was too large."""
+
+    def merge(self, other: SessionStats) -> None:
+        for field in fields(self):
+            mine, theirs = getattr(self, field.name), getattr(other, field.name)
+            if field.name.startswith("max_"):
+                setattr(self, field.name, max(mine, theirs))
+            else:
+                setattr(self, field.name, mine + theirs)
+
+
+class Session:
+    """A client and its connection, driven by a `SessionManager`."""
+
+    def __init__(
+        self,
+        manager: SessionManager,
+        session_id: Hashable,
+        adapter_id: str,
+        connection: AsyncConnection,
+        parent: Optional[Session] = None,
+    ) -> None:
+        self.manager = manager
+        self.id = session_id
+        self.adapter_id = adapter_id
+        self.client = Client(adapter_id)
+        self.connection = connection
+        self.stats = SessionStats()
+        self.closed = False
+        self.error: Optional[BaseException] = None
+
+        self.parent = parent
+        self.children: list[Session] = []
+        self._child_ids = itertools.count(1)
+        if parent is not None:
+            parent.children.append(self)
+
+        # threads of the debuggee, from thread and stopped events and threads responses
+        self.threads: set[int] = set()
+        self._stopped_thread: Optional[int] = None
+
+        self._scheduled = False
+        self._ready_since = 0.0
+        self._reading_paused = False
+        self._removing = False
+        self._done = asyncio.get_running_loop().create_future()
+
+    @property
+    def backlog(self) -> int:
+        """The number of received bytes not handled yet."""
+
+        return len(self.client._receive_buf)
+
+    @property
+    def thread_id(self) -> int:
+        """A thread to address requests acting on the whole debuggee to, like `pause`.
+
+        The last stopped thread, else the lowest known one, else 0."""
+
+        if self._stopped_thread is not None:
+            return self._stopped_thread
+        return min(self.threads, default=0)
+
+    def tree(self) -> Iterator[Session]:
+        """The session and all of its descendants, parents first."""
+
+        yield self
+        for child in self.children:
+            yield from child.tree()
+
+    def _track(self, message: Any) -> None:
+        if isinstance(message, ThreadEvent):
+            if message.reason == "exited":
+                self.threads.discard(message.threadId)
+            else:
+                self.threads.add(message.threadId)
+        elif isinstance(message, StoppedEvent):
+            if message.threadId is not None:
+                self._stopped_thread = message.threadId
+                self.threads.add(message.threadId)
+        elif isinstance(message, ThreadsResponse):
+            self.threads = {thread.id for thread in message.threads}
+
+    async def wait_closed(self) -> None:
+        """Wait until the session is closed.
+
+        Raises the exception that broke the connection, if any."""
+
+        await asyncio.shield(self._done)
+        if self.error is not None:
+            raise self.error
+
+    def __repr__(self) -> str:
+        return (
+            f"<Session id={self.id!r} children={len(self.children)} "
+            f"closed={self.closed}>"
+        )
+
+
+class SessionManager:
+    """Abstract driver of many debug adapter sessions on a single asyncio event loop.
+
+    Unlike one `AsyncServer` or `ThreadedServer` per session, all sessions share one loop
+    and one scheduler task, so hundreds of them need no threads of their own. Received
+    data is read straight into each session's client and the session is queued; the
+    scheduler then gives the queued sessions turns in round-robin order. In a turn the
+    session's queued requests are written, unless its transport asks to back off, and at
+    most `budget` of its received messages are handled. A session with more messages is
+    queued again behind the others, so a session flooding output events cannot starve
+    the rest. Reading from a session is paused while more than `max_backlog` received
+    bytes of complete messages wait to be handled; a single message larger than that is
+    still read to its end.
+
+    When an adapter sends a `startDebugging` request, e.g. for a subprocess of the
+    debuggee, a child session is started on the same loop: it connects to the adapter
+    with `connection.clone()` of the parent, and its `initialize`, `launch` or `attach`
+    and `configurationDone` requests are pipelined without waiting for each other.
+    The reply goes back through the parent's client as soon as the child is connected.
+    `pause_tree` and `continue_tree` act on a session and all of its descendants.
+
+    Child classes should implement the following methods:
+
+    - handle_message: Handle a message of one of the sessions.
+    - configure_child: Optionally, queue requests like breakpoints for a new child \
+        session before its `configurationDone`.
+
+    Example:
+
+    ```python
+    class MyManager(SessionManager):
+        def handle_message(self, session, message):
+            print(session.id, message)
+
+    manager = MyManager()
+    await manager.start()
+    session = await manager.add("debugpy", port=5678)
+    ```
+    """
+
+    def __init__(
+        self,
+        budget: int = 64,
+        max_backlog: int = 1 << 20,
+        start_children: bool = True,
+    ) -> None:
+        """Initializes the manager.
+
+        Args:
+            budget: The most messages handled per session in one turn.
+            max_backlog: The number of received but unhandled bytes of a session above \
+                which reading from it is paused.
+            start_children: Whether `startDebugging` requests start child sessions, \
+                otherwise they are passed to `handle_message`.
+        """
+
+        self.budget = budget
+        self.max_backlog = max_backlog
+        self.start_children = start_children
+        self.sessions: dict[Hashable, Session] = {}
+        self.running = False
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self._ids = itertools.count(1)
+        self._ready: deque[Session] = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop_thread: Optional[int] = None
+        self._scheduler: Optional[asyncio.Task] = None
+        self._tasks: set[asyncio.Task] = set()
+
+    async def start(self) -> None:
+        """Start scheduling sessions on the running loop."""
+
+        self.running = True
+        self.loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._wakeup = asyncio.Event()
+        self._scheduler = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Terminate and close all sessions, then stop scheduling."""
+
+        await asyncio.gather(*(self.remove(s) for s in list(self.sessions.values())))
+        self.running = False
+        if self._scheduler is not None:
+            self._scheduler.cancel()
+
+    async def add(
+        self,
+        adapter_id: str,
+        host: str = "localhost",
+        port: int = 6789,
+        connection: Optional[AsyncConnection] = None,
+        session_id: Optional[Hashable] = None,
+        parent: Optional[Session] = None,
+    ) -> Session:
+        """Connect to a debug adapter and start a session with it.
+
+        Args:
+            adapter_id: The adapter id.
+            host: The host to connect to.
+            port: The port to connect to.
+            connection: The transport to use instead of a TCP connection to host and port.
+            session_id: The key of the session in `sessions`, a counter if not given.
+            parent: The session this one is a child of.
+
+        Returns:
+            The new session.
+        """
+
+        connection = connection or AsyncConnection(host, port)
+        await connection.start()
+
+        if session_id is None:
+            session_id = next(self._ids)
+        session = Session(self, session_id, adapter_id, connection, parent)
+        self.sessions[session_id] = session
+
+        session.client.on_send = lambda: self._schedule_threadsafe(session)
+        connection.bind(
+            session.client,
+            lambda message: self.handle_message(session, message),
+            on_ready=lambda: self._schedule(session),
+        )
+
+        # the initialize request is already queued
+        self._schedule(session)
+        return session
+
+    async def remove(self, session: Session) -> None:
+        """Terminate a session and its child sessions and close their connections."""
+
+        if session._removing:
+            return
+
+        session._removing = True
+        await asyncio.gather(*(self.remove(child) for child in list(session.children)))
+
+        session.client.on_send = None
+        if session.connection.alive:
+            session.client.flush()
+            session.client.terminate()
+            await session.connection.write(session.client.send())
+            await session.connection.stop()
+        self._close(session)
+
+    def stats(self) -> dict[Hashable, SessionStats]:
+        """The stats of every open session, by session id."""
+
+        return {session_id: s.stats for session_id, s in self.sessions.items()}
+
+    def totals(self) -> SessionStats:
+        """The stats of all open sessions combined."""
+
+        totals = SessionStats()
+        for session in self.sessions.values():
+            totals.merge(session.stats)
+        return totals
+
+    def pause_tree(self, session: Session) -> None:
+        """Pause the debuggees of a session and all of its descendants."""
+
+        for s in session.tree():
+            s.client.pause(s.thread_id)
+
+    def continue_tree(self, session: Session) -> None:
+        """Resume all threads of a session and all of its descendants."""
+
+        for s in session.tree():
+            s.client.continue_(s.thread_id, single_thread=False)
+
+    def handle_message(self, session: Session, message: Any) -> None:
+        """Handle a message from one of the sessions.
+
+        To be implemented by subclasses.
+        """
+
+        print(session.id, type(message), flush=True)
+
+    def configure_child(self, child: Session) -> None:
+        """Called when a child session was started, before its `configurationDone`.
+
+        Can be implemented by subclasses to queue requests like `setBreakpoints`.
+        """
+
+    async def _start_child(self, parent: Session, request: StartDebuggingRequest):
+        try:
+            connection = parent.connection.clone()
+        except CloneUnsupported as e:
+            parent.client.respond(request.reply(success=False, message=str(e)))
+            return
+
+        try:
+            child = await self.add(
+                parent.adapter_id,
+                connection=connection,
+                session_id=(parent.id, next(parent._child_ids)),
+                parent=parent,
+            )
+        except OSError as e:
+            parent.client.respond(request.reply(success=False, message=str(e)))
+            return
+
+        arguments = request.arguments
+        child.client.send_request(arguments.request, arguments.configuration)
+        self.configure_child(child)
+        child.client.configuration_done()
+        parent.client.respond(request.reply(success=True))
+
+    def _schedule(self, session: Session) -> None:
+        if session._scheduled or session.closed:
+            return
+
+        session._scheduled = True
+        session._ready_since = time.perf_counter()
+        self._ready.append(session)
+        self._wakeup.set()
+
+    def _schedule_threadsafe(self, session: Session) -> None:
+        if self._loop_thread == threading.get_ident():
+            self._schedule(session)
+        else:
+            # requests may be queued from other threads than the loop's
+            self.loop.call_soon_threadsafe(self._schedule, session)
+
+    async def _run(self) -> None:
+        while self.running:
+            if not self._ready:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            # one round: every session queued so far gets one turn
+            for _ in range(len(self._ready)):
+                self._turn(self._ready.popleft())
+
+            # let the loop read from the transports before the next round
+            await asyncio.sleep(0)
+
+    def _turn(self, session: Session) -> None:
+        session._scheduled = False
+        if session.closed:
+            return
+
+        connection = session.connection
+        stats = session.stats
+        start = time.perf_counter()
+        stats.turns += 1
+        stats.max_wait = max(stats.max_wait, start - session._ready_since)
+        stats.max_backlog = max(stats.max_backlog, session.backlog)
+
+        if connection.writable and (data := session.client.send()):
+            connection.write_nowait(data)
+
+        handled = 0
+        try:
+            for message in session.client.messages():
+                handled += 1
+                session._track(message)
+                if self.start_children and isinstance(message, StartDebuggingRequest):
+                    task = asyncio.create_task(self._start_child(session, message))
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+                else:
+                    self.handle_message(session, message)
+                if handled == self.budget:
+                    # the generator is left at its yield, so it cannot end the span
+                    if session.client.tracer is not None:
+                        session.client.tracer.delivered()
+                    break
+        except Exception as e:
+            # only this session breaks, the connection reports back once it is lost
+            connection.fail(e)
+
+        stats.messages += handled
+        stats.handle_time += time.perf_counter() - start
+        stats.bytes_received = connection.bytes_received
+        stats.bytes_sent = connection.bytes_sent
+
+        if handled == self.budget:
+            # there may be more, continue after the other sessions
+            self._schedule(session)
+        elif not connection.alive:
+            self._close(session)
+            return
+
+        # below the budget every complete message was handled, and what is left is
+        # the start of one that can only complete by reading on, however large it is.
+        # A paused session always used its budget, so it is scheduled again.
+        if handled < self.budget:
+            if session._reading_paused:
+                connection.resume_reading()
+                session._reading_paused = False
+        elif not session._reading_paused and session.backlog > self.max_backlog:
+            connection.pause_reading()
+            session._reading_paused = True
+            stats.read_pauses += 1
+        elif session._reading_paused and session.backlog <= self.max_backlog // 2:
+            connection.resume_reading()
+            session._reading_paused = False
+
+    def _close(self, session: Session) -> None:
+        if session.closed:
+            return
+
+        session.closed = True
+        session.error = session.connection._error
+        self.sessions.pop(session.id, None)
+        if session.parent is not None:
+            session.parent.children.remove(session)
+        if not session._done.done():
+            session._done.set_result(None)
@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import time
+import typing
+from typing import Any, Callable, Optional
+
+from .base import ErrorResponse, Requests
+from .types import StackFrame
+
+if typing.TYPE_CHECKING:
+    from .client import Client
+
+
+class StackFetcher:
+    """Loads the stack of a thread incrementally, top frames first.
+
+    The first `stackTrace` request only asks for the top `initial_levels` frames so
+    they can be shown right away, independently of the depth of the stack. When the
+    adapter supports delayed stack trace loading (`supportsDelayedStackTraceLoading`),
+    the remaining frames are paged in with follow-up requests. The size of each page is
+    adapted to the latency measured for the previous one, aiming for `target_latency`
+    seconds per page.
+
+    Adapters without delayed loading support get a single request for the whole stack.
+
+    Example:
+
+    ```python
+    fetcher = client.fetch_stack_trace(
+        thread_id, on_frames=lambda frames, start: render(frames, start)
+    )
+    ```
+    """
+
+    def __init__(
+        self,
+        client: Client,
+        thread_id: int,
+        initial_levels: int = 20,
+        min_levels: int = 20,
+        max_levels: int = 2000,
+        target_latency: float = 0.05,
+        format: Optional[Any] = None,
+        on_frames: Optional[Callable[[list[StackFrame], int], None]] = None,
+        on_complete: Optional[Callable[[StackFetcher], None]] = None,
+    ) -> None:
+        """Initializes the fetcher.
+
+        Args:
+            client: The client to queue the requests on.
+            thread_id: Retrieve the stacktrace for this thread.
+            initial_levels: The number of frames to request first.
+            min_levels: The smallest page size used for the remaining frames.
+            max_levels: The largest page size used for the remaining frames.
+            target_latency: The round trip time in seconds each page should take.
+            format: Specifies details on how to format the stack frames.
+            on_frames: Called with each loaded slice of frames and the index of its first frame.
+            on_complete: Called with the fetcher once the whole stack is loaded, loading \
+                failed, or a request was superseded because the thread resumed.
+        """
+
+        self.client = client
+        self.thread_id = thread_id
+        self.initial_levels = initial_levels
+        self.min_levels = min_levels
+        self.max_levels = max_levels
+        self.target_latency = target_latency
+        self.format = format
+        self.on_frames = on_frames
+        self.on_complete = on_complete
+
+        self.frames: list[StackFrame] = []
+        self.total_frames: Optional[int] = None
+        self.error: Optional[ErrorResponse] = None
+        self.done = False
+        self.cancelled = False
+
+        self.levels = initial_levels
+        self.latencies: list[float] = []
+        self._sent_at = 0.0
+        self._in_flight: Optional[int] = None
+
+    @property
+    def delayed_loading(self) -> bool:
+        capabilities = self.client.capabilities
+        return bool(capabilities and capabilities.supportsDelayedStackTraceLoading)
+
+    def start(self) -> None:
+        """Request the top of the stack."""
+
+        self._request(0, self.levels if self.delayed_loading else None)
+
+    def cancel(self) -> None:
+        """Stop paging in frames, e.g. because the thread was resumed.
+
+        The request in flight is cancelled if the adapter supports it, and the fetcher
+        completes right away, like when the client supersedes its request.
+        """
+
+        if self.done:
+            return
+        capabilities = self.client.capabilities
+        if (
+            self._in_flight is not None
+            and capabilities
+            and capabilities.supportsCancelRequest
+        ):
+            self.client.cancel(request_id=self._in_flight)
+        self._cancelled()
+
+    def _request(self, start_frame: int, levels: Optional[int]) -> None:
+        self._sent_at = time.perf_counter()
+        self._in_flight = self.client.send_request(
+            Requests.STACKTRACE,
+            {
+                "threadId": self.thread_id,
+                "startFrame": start_frame or None,
+                "levels": levels,
+                "format": self.format,
+            },
+            lambda response: self._on_response(start_frame, levels, response),
+        )
+
+    def _on_response(
+        self, start_frame: int, levels: Optional[int], response: Any
+    ) -> None:
+        self._in_flight = None
+        if self.done:
+            # cancelled while the request was in flight
+            return
+
+        if isinstance(response, ErrorResponse) and response.message == "cancelled":
+            # superseded by the client, the stack is gone with the stop
+            self._cancelled()
+            return
+
+        latency = time.perf_counter() - self._sent_at
+        self.latencies.append(latency)
+
+        if isinstance(response, ErrorResponse):
+            self.error = response
+            self._complete()
+            return
+
+        frames = response.stackFrames
+        self.frames.extend(frames)
+        if response.totalFrames:
+            self.total_frames = response.totalFrames
+
+        if self.on_frames is not None:
+            self.on_frames(frames, start_frame)
+
+        if levels is None or len(frames) < levels or not frames:
+            self._complete()
+        elif self.total_frames is not None and len(self.frames) >= self.total_frames:
+            self._complete()
+        else:
+            self.levels = self._adapt(len(frames), latency)
+            self._request(len(self.frames), self.levels)
+
+    def _adapt(self, frames: int, latency: float) -> int:
+        # scale the page to the target latency, but never more than double at once
+        if latency <= 0:
+            levels = frames * 2
+        else:
+            levels = int(frames * self.target_latency / latency)
+            levels = min(levels, frames * 2)
+        return max(self.min_levels, min(self.max_levels, levels))
+
+    def _cancelled(self) -> None:
+        self.cancelled = True
+        self._complete()
+
+    def _complete(self) -> None:
+        self.done = True
+        if self.total_frames is None and self.error is None and not self.cancelled:
+            self.total_frames = len(self.frames)
+        if self.on_complete is not None:
+            self.on_complete(self)
+
+    def __repr__(self) -> str:
+        return (
+            f"<StackFetcher thread={self.thread_id} "
+            f"frames={len(self.frames)}/{self.total_frames} done={self.done}>"
+        )
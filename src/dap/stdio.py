@@ -0,0 +1,267 @@
+from __future__ import annotations
+
+import asyncio
+import selectors
+import subprocess
+import sys
+from collections import deque
+from typing import Any, Optional
+
+from .connection import AsyncConnection, Connection
+
+try:
+    import fcntl
+except ImportError:  # windows
+    fcntl = None
+
+
+def _set_pipe_size(fileno: int, size: int) -> None:
+    """Grow a pipe buffer where the platform allows it (Linux only)."""
+
+    if fcntl is None or not hasattr(fcntl, "F_SETPIPE_SZ"):
+        return
+
+    try:
+        fcntl.fcntl(fileno, fcntl.F_SETPIPE_SZ, size)
+    except OSError:
+        # above /proc/sys/fs/pipe-max-size for unprivileged processes
+        pass
+
+
+class StderrRing:
+    """Bounded ring of the last lines an adapter process wrote to stderr.
+
+    Only the last `max_line_length` bytes of each line are kept, so output without
+    newlines, like progress bars or binary data, stays bounded too."""
+
+    def __init__(self, max_lines: int = 1000, max_line_length: int = 4096) -> None:
+        self.lines: deque[str] = deque(maxlen=max_lines)
+        self.max_line_length = max_line_length
+        self._partial = b""
+
+    def feed(self, data: bytes) -> None:
+        *lines, partial = (self._partial + data).split(b"\n")
+        self._partial = partial[-self.max_line_length :]
+        self.lines.extend(
+            line[-self.max_line_length :].decode("utf-8", "replace").rstrip("\r")
+            for line in lines
+        )
+
+    def __str__(self) -> str:
+        return "\n".join(self.lines)
+
+
+class StdioConnection(Connection):
+    """Connection to a debug adapter process over its stdin and stdout.
+
+    The adapter command is spawned on `start` and spoken to through its standard
+    streams, so no port has to be chosen or polled for. The pipes are enlarged to
+    `pipe_size` where the platform allows it, and stderr is drained into a bounded ring
+    of lines (`stderr`) by the same loop that reads stdout.
+
+    Waiting on pipes with a selector is only supported on POSIX systems.
+
+    Example:
+
+    ```python
+    connection = StdioConnection(["python", "-m", "debugpy.adapter"])
+    server = ThreadedServer("debugpy", connection=connection)
+    ```
+    """
+
+    def __init__(
+        self,
+        command: list[str],
+        cwd: Optional[str] = None,
+        env: Optional[dict[str, str]] = None,
+        read_size: int = 65536,
+        pipe_size: int = 1 << 20,
+        stderr_lines: int = 1000,
+    ) -> None:
+        """Initializes the connection.
+
+        Args:
+            command: The adapter command and its arguments.
+            cwd: The working directory of the adapter process.
+            env: The environment of the adapter process, inherited if not given.
+            read_size: The maximum number of bytes read at once.
+            pipe_size: The size to grow the stdin and stdout pipes to.
+            stderr_lines: The number of stderr lines to keep.
+        """
+
+        super().__init__(host=None, port=None, read_size=read_size)
+        self.command = command
+        self.cwd = cwd
+        self.env = env
+        self.pipe_size = pipe_size
+        self.stderr = StderrRing(stderr_lines)
+        self.process: Optional[subprocess.Popen] = None
+
+    @property
+    def returncode(self) -> Optional[int]:
+        return self.process.poll() if self.process is not None else None
+
+    def start(self, *_) -> None:
+        """Spawn the adapter process."""
+
+        super().start()
+        self._selector.register(
+            self.process.stderr, selectors.EVENT_READ, self._drain_stderr
+        )
+
+    def stop(self, *_) -> None:
+        """Close the adapter's stdin and wait for it to exit, killing it if it does not."""
+
+        if self.process.stderr in self._selector.get_map():
+            self._selector.unregister(self.process.stderr)
+        super().stop()
+        try:
+            self.process.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        self.process.stderr.close()
+
+    def _drain_stderr(self) -> None:
+        if data := self.process.stderr.read(65536):
+            self.stderr.feed(data)
+        else:
+            self._selector.unregister(self.process.stderr)
+
+    def _open(self) -> None:
+        self.process = subprocess.Popen(
+            self.command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            cwd=self.cwd,
+            env=self.env,
+            bufsize=0,
+        )
+        _set_pipe_size(self.process.stdin.fileno(), self.pipe_size)
+        _set_pipe_size(self.process.stdout.fileno(), self.pipe_size)
+
+    def _fileobj(self) -> Any:
+        return self.process.stdout
+
+    def _recv_into(self, buf: memoryview, nbytes: int) -> int:
+        return self.process.stdout.readinto(buf[:nbytes]) or 0
+
+    def _sendall(self, buf: bytes) -> None:
+        with memoryview(buf) as view:
+            while view:
+                view = view[self.process.stdin.write(view) :]
+
+    def _close(self) -> None:
+        self.process.stdin.close()
+        self.process.stdout.close()
+
+
+class _AdapterProcessProtocol(asyncio.SubprocessProtocol):
+    def __init__(self, connection: AsyncStdioConnection) -> None:
+        self.connection = connection
+
+    def pipe_data_received(self, fd: int, data: bytes) -> None:
+        if fd == 1:
+            self.connection.data_received(data)
+        else:
+            self.connection.stderr.feed(data)
+
+    def pause_writing(self) -> None:
+        self.connection.pause_writing()
+
+    def resume_writing(self) -> None:
+        self.connection.resume_writing()
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        # the process exited and all of its pipes are closed
+        self.connection.connection_lost(exc)
+
+
+class AsyncStdioConnection(AsyncConnection):
+    """Asyncio-based connection to a debug adapter process over its stdin and stdout.
+
+    The asyncio counterpart of `StdioConnection`. Pipes do not support buffered
+    protocols, so received data is copied into the client's receive buffer once.
+
+    Example:
+
+    ```python
+    connection = AsyncStdioConnection(["python", "-m", "debugpy.adapter"])
+    server = AsyncServer("debugpy", connection=connection)
+    ```
+    """
+
+    def __init__(
+        self,
+        command: list[str],
+        cwd: Optional[str] = None,
+        env: Optional[dict[str, str]] = None,
+        pipe_size: int = 1 << 20,
+        stderr_lines: int = 1000,
+    ) -> None:
+        """Initializes the connection.
+
+        Args:
+            command: The adapter command and its arguments.
+            cwd: The working directory of the adapter process.
+            env: The environment of the adapter process, inherited if not given.
+            pipe_size: The size to grow the stdin and stdout pipes to.
+            stderr_lines: The number of stderr lines to keep.
+        """
+
+        super().__init__(host=None, port=None)
+        self.command = command
+        self.cwd = cwd
+        self.env = env
+        self.pipe_size = pipe_size
+        self.stderr = StderrRing(stderr_lines)
+        self.process: Optional[asyncio.SubprocessTransport] = None
+
+    @property
+    def returncode(self) -> Optional[int]:
+        return self.process.get_returncode() if self.process is not None else None
+
+    async def _open(self, loop: asyncio.AbstractEventLoop) -> None:
+        self.process, _ = await loop.subprocess_exec(
+            lambda: _AdapterProcessProtocol(self),
+            *self.command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            cwd=self.cwd,
+            env=self.env,
+        )
+
+        if sys.platform != "win32":
+            for fd in (0, 1):
+                pipe = self.process.get_pipe_transport(fd).get_extra_info("pipe")
+                _set_pipe_size(pipe.fileno(), self.pipe_size)
+
+        self.connection_made(self.process.get_pipe_transport(0))
+
+    def clone(self) -> AsyncStdioConnection:
+        """A connection to a new process of the same adapter command."""
+
+        return AsyncStdioConnection(
+            self.command, self.cwd, self.env, self.pipe_size, self.stderr.lines.maxlen
+        )
+
+    def pause_reading(self) -> None:
+        self.process.get_pipe_transport(1).pause_reading()
+
+    def resume_reading(self) -> None:
+        self.process.get_pipe_transport(1).resume_reading()
+
+    async def stop(self):
+        """Close the adapter's stdin and wait for it to exit, killing it if it does not."""
+
+        self.transport.close()
+        try:
+            await asyncio.wait_for(asyncio.shield(self._closed), 1)
+        except asyncio.TimeoutError:
+            self.process.kill()
+            await asyncio.shield(self._closed)
+
+        self.process.close()
+        self.alive = False
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+import threading
+import typing
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import Any, Optional
+
+from .requests import RunInTerminalRequest
+
+if typing.TYPE_CHECKING:
+    from .client import Client
+
+
+class TerminalExecutor:
+    """Answers `runInTerminal` reverse requests by spawning the command off the I/O loop.
+
+    Starting a process takes long enough to stall an event loop or a `ThreadedServer`
+    loop, while the adapter usually waits for the reply before it continues. The
+    command is therefore spawned on a thread of `executor`, and the reply with its
+    process id is queued on the client from there as soon as the process started,
+    which wakes up the I/O loop to send it right away.
+
+    The process is started without a terminal, with the standard streams given here.
+
+    Example:
+
+    ```python
+    client = Client("debugpy", terminal=TerminalExecutor())
+    ```
+    """
+
+    def __init__(
+        self,
+        executor: Optional[Executor] = None,
+        stdin: Optional[Any] = subprocess.DEVNULL,
+        stdout: Optional[Any] = None,
+        stderr: Optional[Any] = None,
+    ) -> None:
+        """Initializes the executor.
+
+        Args:
+            executor: Where to spawn the processes, a small thread pool if not given.
+            stdin: The standard input of the processes.
+            stdout: The standard output of the processes, inherited if not given.
+            stderr: The standard error of the processes, inherited if not given.
+        """
+
+        self.executor = executor or ThreadPoolExecutor(
+            max_workers=4, thread_name_prefix="runInTerminal"
+        )
+        self.stdin = stdin
+        self.stdout = stdout
+        self.stderr = stderr
+        self.processes: list[subprocess.Popen] = []
+        self._lock = threading.Lock()
+
+    def submit(self, client: Client, request: RunInTerminalRequest) -> Future:
+        """Spawn the requested command and reply to the request once it started.
+
+        Args:
+            client: The client to reply through.
+            request: The request to answer.
+
+        Returns:
+            A future of the spawned process, `None` if it could not be started.
+        """
+
+        return self.executor.submit(self._run, client, request)
+
+    def shutdown(self, kill: bool = False) -> None:
+        """Stop accepting requests and optionally kill the processes still running."""
+
+        self.executor.shutdown(wait=True)
+        if kill:
+            with self._lock:
+                for process in self.processes:
+                    if process.poll() is None:
+                        process.kill()
+
+    def _run(
+        self, client: Client, request: RunInTerminalRequest
+    ) -> Optional[subprocess.Popen]:
+        arguments = request.arguments
+        shell = bool(arguments.argsCanBeInterpretedByShell)
+
+        env = None
+        if arguments.env:
+            env = dict(os.environ)
+            for name, value in arguments.env.items():
+                if value is None:
+                    env.pop(name, None)
+                else:
+                    env[name] = value
+
+        try:
+            process = subprocess.Popen(
+                # the adapter quoted the arguments it wants taken literally, the rest
+                # is left for the shell to interpret
+                " ".join(arguments.args) if shell else arguments.args,
+                cwd=arguments.cwd or None,
+                env=env,
+                shell=shell,
+                stdin=self.stdin,
+                stdout=self.stdout,
+                stderr=self.stderr,
+                start_new_session=sys.platform != "win32",
+            )
+        except (OSError, ValueError) as e:
+            client.respond(request.reply(success=False, message=str(e)))
+            return None
+
+        with self._lock:
+            self.processes = [p for p in self.processes if p.poll() is None]
+            self.processes.append(process)
+
+        if shell:
+            client.respond(request.reply(success=True, shellProcessId=process.pid))
+        else:
+            client.respond(request.reply(success=True, processId=process.pid))
+        return process
@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, NamedTuple, Optional
+
+from .base import DAPMessage
+
+# looked up once, enum attributes are slow to get on every message
+_RESPONSE = DAPMessage.RESPONSE
+_EVENT = DAPMessage.EVENT
+
+
+class Span(NamedTuple):
+    """The lifecycle of a message received by a client, as traced by a `Tracer`.
+
+    Times are `time.perf_counter_ns` values. The request times are only set for
+    responses, `delivered` is `None` if the message was not waited for, e.g. the
+    last of a batch handled by a `SessionManager`.
+    """
+
+    kind: str
+    """`DAPMessage.RESPONSE`, `EVENT` or `REQUEST` for reverse requests."""
+
+    name: str
+    """The command or the event."""
+
+    seq: Optional[int]
+    """The sequence number of the request a response answers."""
+
+    stop_epoch: int
+    """The stop epoch of the client, when the request was sent for responses."""
+
+    thread: int
+    """The thread that handled the message."""
+
+    queued: Optional[int]
+    """When the request was queued by `send_request`."""
+
+    written: Optional[int]
+    """When the request was returned by `send` to be written."""
+
+    framed: int
+    """When the message was popped from the receive buffer."""
+
+    decoded: int
+    """When the JSON of the message was decoded."""
+
+    validated: int
+    """When the message was validated and, for responses, their callbacks ran."""
+
+    delivered: Optional[int]
+    """When the consumer of the client, e.g. `handle_message`, was done with it."""
+
+
+class Tracer:
+    """Opt-in tracing of the lifecycle of the requests and events of a `Client`.
+
+    Pass it as the `tracer` of a client. Every response is traced from `send_request`
+    through `send`, the wait for the debug adapter, decoding and validating to its
+    delivery to the consumer of the client, like `handle_message` of the servers.
+    Events and reverse requests are traced from decoding to delivery. Spans carry
+    the sequence number of the request and the stop epoch it was sent in.
+
+    The spans are exported in the Chrome trace event format, which can be opened in
+    Perfetto (https://ui.perfetto.dev) or `chrome://tracing`: a track per request
+    with its phases, and the handling of every message on the thread that did it.
+
+    Example:
+
+    ```python
+    tracer = Tracer()
+    client = Client("debugpy", tracer=tracer)
+    ...
+    tracer.write("session.trace.json")
+    ```
+    """
+
+    def __init__(self, max_spans: int = 100_000) -> None:
+        """Initializes the tracer.
+
+        Args:
+            max_spans: The number of most recent spans kept.
+        """
+
+        # plain tuples, made spans only when read
+        self._spans: deque[tuple] = deque(maxlen=max_spans)
+        # command, stop epoch, queued and written time of the requests in flight
+        self._requests: dict[int, list] = {}
+        self._unwritten: list[int] = []
+        # the span of the last handled message, without the time it was delivered
+        self._current: Optional[tuple] = None
+
+    @property
+    def spans(self) -> list[Span]:
+        """The most recent spans, oldest first."""
+
+        spans = [Span._make(span) for span in self._spans]
+        if self._current is not None:
+            spans.append(Span(*self._current, None))
+        return spans
+
+    def queued(self, seq: int, command: str, stop_epoch: int) -> None:
+        """Start the span of a request, called by the client as it is queued."""
+
+        self._requests[seq] = [command, stop_epoch, time.perf_counter_ns(), None]
+        self._unwritten.append(seq)
+
+    def written(self) -> None:
+        """Mark the queued requests as written, called by the client's `send`."""
+
+        now = time.perf_counter_ns()
+        for seq in self._unwritten:
+            if (request := self._requests.get(seq)) is not None:
+                request[3] = now
+        self._unwritten.clear()
+
+    def dropped(self, seq: int) -> None:
+        """Forget a request whose response is dropped without being handled."""
+
+        self._requests.pop(seq, None)
+
+    def handled(
+        self, message: dict[str, Any], stop_epoch: int, framed: int, decoded: int
+    ) -> None:
+        """Record a message handled by the client, delivered next.
+
+        Args:
+            message: The decoded message.
+            stop_epoch: The stop epoch of the client.
+            framed: When the message was framed.
+            decoded: When it was decoded.
+        """
+
+        validated = time.perf_counter_ns()
+        if self._current is not None:
+            # the previous message was not waited for
+            self._spans.append(self._current + (None,))
+
+        kind = message.get("type")
+        seq = queued = written = None
+        if kind == _RESPONSE:
+            seq = message.get("request_seq")
+            name = message.get("command")
+            if (request := self._requests.pop(seq, None)) is not None:
+                name, stop_epoch, queued, written = request
+        elif kind == _EVENT:
+            name = message.get("event")
+        else:
+            name = message.get("command")
+
+        self._current = (
+            kind,
+            name,
+            seq,
+            stop_epoch,
+            threading.get_ident(),
+            queued,
+            written,
+            framed,
+            decoded,
+            validated,
+        )
+
+    def delivered(self) -> None:
+        """End the span of the last handled message, called as it was consumed."""
+
+        if self._current is not None:
+            self._spans.append(self._current + (time.perf_counter_ns(),))
+            self._current = None
+
+    def chrome_trace(self) -> dict[str, Any]:
+        """The spans in the Chrome trace event format, times in microseconds."""
+
+        pid = os.getpid()
+        events: list[dict[str, Any]] = [
+            {"ph": "M", "pid": pid, "name": "process_name", "args": {"name": "dap"}}
+        ]
+        for span in self.spans:
+            args = {"seq": span.seq, "stop_epoch": span.stop_epoch}
+            end = span.delivered or span.validated
+
+            # the handling on the thread, nested slices of a single track
+            phases = [
+                (span.name, span.framed, end),
+                ("decode", span.framed, span.decoded),
+                ("validate", span.decoded, span.validated),
+            ]
+            if span.delivered is not None:
+                phases.append(("deliver", span.validated, span.delivered))
+            for name, begin, finish in phases:
+                events.append(
+                    {
+                        "ph": "X",
+                        "cat": span.kind,
+                        "name": name,
+                        "pid": pid,
+                        "tid": span.thread,
+                        "ts": begin / 1e3,
+                        "dur": (finish - begin) / 1e3,
+                        "args": args,
+                    }
+                )
+
+            if span.queued is None:
+                continue
+
+            # the lifecycle of a request, an async track correlated by its seq
+            title = f"{span.name} #{span.seq}"
+            marks = [("b", title, span.queued)]
+            for name, begin, finish in (
+                ("queued", span.queued, span.written),
+                ("adapter", span.written, span.framed),
+                ("client", span.framed, end),
+            ):
+                if begin is not None and finish is not None:
+                    marks += [("b", name, begin), ("e", name, finish)]
+            marks.append(("e", title, end))
+
+            for phase, name, ts in marks:
+                events.append(
+                    {
+                        "ph": phase,
+                        "cat": "request",
+                        "id": span.seq,
+                        "name": name,
+                        "pid": pid,
+                        "tid": span.thread,
+                        "ts": ts / 1e3,
+                        "args": args,
+                    }
+                )
+
+        # async slices must be in order to nest, the sort keeps ties in order
+        events.sort(key=lambda event: event.get("ts", 0))
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write(self, path: str) -> None:
+        """Write the spans as a Chrome trace JSON file."""
+
+        with open(path, "w") as f:
+            json.dump(self.chrome_trace(), f)
@@ -2,10 +2,12 @@ from __future__ import annotations
 
 from typing import Any, Dict, List, Literal, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import Field
 
+from .model import DAPModel
 
-class Breakpoint(BaseModel):
+
+class Breakpoint(DAPModel):
     id: int = Field(..., description="Breakpoint ID.")
     verified: bool = Field(
         ...,
@@ -45,7 +47,7 @@ class Breakpoint(BaseModel):
     )
 
 
-class BreakpointLocation(BaseModel):
+class BreakpointLocation(DAPModel):
     line: int = Field(..., description="Start line of the breakpoint location.")
     column: Optional[int] = Field(
         None, description="Start column of the breakpoint location."
@@ -63,7 +65,7 @@ BreakpointModeApplicability = (
 )
 
 
-class BreakpointMode(BaseModel):
+class BreakpointMode(DAPModel):
     mode: str = Field(..., description="The breakpoint mode.")
     label: str = Field(..., description="A label for the mode.")
     description: Optional[str] = Field(None, description="A description of the mode.")
@@ -72,7 +74,7 @@ class BreakpointMode(BaseModel):
     )
 
 
-class Capabilities(BaseModel):
+class Capabilities(DAPModel):
     supportsConfigurationDoneRequest: Optional[bool] = Field(
         None, description="The debug adapter supports the `configurationDone` request."
     )
@@ -228,7 +230,7 @@ class Capabilities(BaseModel):
 ChecksumAlgorithm = Literal["MD5", "SHA1", "SHA256", "timestamp"]
 
 
-class Checksum(BaseModel):
+class Checksum(DAPModel):
     algorithm: ChecksumAlgorithm = Field(
         ..., description="The algorithm used to calculate the checksum."
     )
@@ -237,7 +239,7 @@ class Checksum(BaseModel):
     )
 
 
-class ColumnDescriptor(BaseModel):
+class ColumnDescriptor(DAPModel):
     attributeName: str = Field(
         ..., description="Name of the attribute rendered in this column."
     )
@@ -277,7 +279,7 @@ CompletionItemType = Literal[
 ]
 
 
-class CompletionItem(BaseModel):
+class CompletionItem(DAPModel):
     label: str = Field(..., description="The label of this completion item.")
     text: Optional[str] = Field(
         None,
@@ -312,7 +314,7 @@ class CompletionItem(BaseModel):
 DataBreakpointAccessType = Literal["read", "write", "readWrite"]
 
 
-class DataBreakpoint(BaseModel):
+class DataBreakpoint(DAPModel):
     dataId: str = Field(
         ...,
         description="An id representing the data. This id is returned from the `dataBreakpointInfo` request.",
@@ -329,7 +331,7 @@ class DataBreakpoint(BaseModel):
     )
 
 
-class DisassembledInstruction(BaseModel):
+class DisassembledInstruction(DAPModel):
     instructionBytes: Optional[str] = Field(
         None,
         description="Raw bytes representing the instruction and its operands, in an implementation-defined format.",
@@ -373,7 +375,7 @@ class DisassembledInstruction(BaseModel):
 ExceptionBreakMode = Literal["never", "always", "unhandled", "userUnhandled"]
 
 
-class ExceptionBreakpointsFilter(BaseModel):
+class ExceptionBreakpointsFilter(DAPModel):
     filter: str = Field(
         ...,
         description="The internal ID of the filter option. This value is passed to the `setExceptionBreakpoints` request.",
@@ -402,7 +404,7 @@ class ExceptionBreakpointsFilter(BaseModel):
     )
 
 
-class ExceptionDetails(BaseModel):
+class ExceptionDetails(DAPModel):
     message: Optional[str] = Field(
         None, description="Message contained in the exception."
     )
@@ -425,7 +427,7 @@ class ExceptionDetails(BaseModel):
     )
 
 
-class ExceptionFilterOptions(BaseModel):
+class ExceptionFilterOptions(DAPModel):
     filterId: str = Field(
         ...,
         description="ID of the exception filter.",
@@ -440,7 +442,7 @@ class ExceptionFilterOptions(BaseModel):
     )
 
 
-class ExceptionOptions(BaseModel):
+class ExceptionOptions(DAPModel):
     path: Optional[List[ExceptionPathSegment]] = Field(
         None,
         description="A path that selects a single or multiple exceptions in a tree."
@@ -452,7 +454,7 @@ class ExceptionOptions(BaseModel):
     )
 
 
-class ExceptionPathSegment(BaseModel):
+class ExceptionPathSegment(DAPModel):
     negate: Optional[bool] = Field(
         None,
         description="If false or missing this segment matches the names provided, "
@@ -464,7 +466,7 @@ class ExceptionPathSegment(BaseModel):
     )
 
 
-class FunctionBreakpoint(BaseModel):
+class FunctionBreakpoint(DAPModel):
     name: Optional[str] = Field(None, description="The name of the function.")
     condition: Optional[str] = Field(
         None, description="An expression for conditional breakpoints."
@@ -475,7 +477,7 @@ class FunctionBreakpoint(BaseModel):
     )
 
 
-class GotoTarget(BaseModel):
+class GotoTarget(DAPModel):
     id: str = Field(..., description="Unique identifier for a goto target.")
     label: str = Field(
         ..., description="The label shown to the user for the goto target."
@@ -494,7 +496,7 @@ class GotoTarget(BaseModel):
     )
 
 
-class InstructionBreakpoint(BaseModel):
+class InstructionBreakpoint(DAPModel):
     instructionReference: str = Field(
         ...,
         description="The instruction reference of the breakpoint. This should be a memory or instruction "
@@ -525,7 +527,7 @@ class InstructionBreakpoint(BaseModel):
 InvalidatedAreas = Literal["all", "stacks", "threads", "variables"] | str
 
 
-class Message(BaseModel):
+class Message(DAPModel):
     id: int = Field(..., description="Unique identifier for the message.")
     format: str = Field(
         ...,
@@ -551,7 +553,7 @@ class Message(BaseModel):
     )
 
 
-class Module(BaseModel):
+class Module(DAPModel):
     id: int | str = Field(..., description="Unique identifier for the module.")
     name: str = Field(..., description="Name of the module.")
     path: Optional[str] = Field(None, description="Path to the module.")
@@ -568,7 +570,7 @@ class Module(BaseModel):
     addressRange: Optional[str] = Field(None, description="Address range of Module.")
 
 
-class Scope(BaseModel):
+class Scope(DAPModel):
     name: str = Field(
         ...,
         description="Name of the scope such as 'Arguments', 'Locals', or 'Registers'.",
@@ -614,7 +616,7 @@ class Scope(BaseModel):
     )
 
 
-class Source(BaseModel):
+class Source(DAPModel):
     name: Optional[str] = Field(None, description=" The short name of the source.")
     path: Optional[str] = Field(
         None, description="The path used to be shown in the UI."
@@ -640,7 +642,7 @@ class Source(BaseModel):
     )
 
 
-class SourceBreakpoint(BaseModel):
+class SourceBreakpoint(DAPModel):
     line: int = Field(..., description="The source line of the breakpoint.")
     column: Optional[int] = Field(
         None, description="An optional source column of the breakpoint."
@@ -664,7 +666,7 @@ class SourceBreakpoint(BaseModel):
     )
 
 
-class StackFrame(BaseModel):
+class StackFrame(DAPModel):
     id: int = Field(..., description="An identifier for the stack frame.")
     name: str = Field(..., description="The name of the stack frame.")
     source: Optional[Source] = Field(
@@ -695,7 +697,7 @@ class StackFrame(BaseModel):
     )
 
 
-class StackFrameFormat(BaseModel):
+class StackFrameFormat(DAPModel):
     parameters: Optional[bool] = Field(
         None, description="Displays parameters for the stack frame."
     )
@@ -720,7 +722,7 @@ class StackFrameFormat(BaseModel):
     )
 
 
-class StepInTarget(BaseModel):
+class StepInTarget(DAPModel):
     id: str = Field(..., description="Unique identifier for a stepIn target.")
     label: str = Field(
         ..., description="The name of the stepIn target (shown in the UI)."
@@ -738,16 +740,16 @@ class StepInTarget(BaseModel):
 SteppingGranularity = Literal["statement", "line", "instruction"]
 
 
-class Thread(BaseModel):
+class Thread(DAPModel):
     id: int = Field(..., description="Unique identifier for the thread.")
     name: str = Field(..., description="A name for the thread.")
 
 
-class ValueFormat(BaseModel):
+class ValueFormat(DAPModel):
     hex: Optional[bool] = Field(None, description="Display the value in hex.")
 
 
-class Variable(BaseModel):
+class Variable(DAPModel):
     name: str = Field(..., description="The variable's name.")
     value: str = Field(..., description="The variable's value.")
     type: Optional[str] = Field(None, description="The variable's type.")
@@ -778,7 +780,7 @@ class Variable(BaseModel):
     )
 
 
-class VariablePresentationHint(BaseModel):
+class VariablePresentationHint(DAPModel):
     kind: (
         Literal[
             "property",
@@ -0,0 +1,84 @@
+import json
+from typing import Any, Optional
+
+from dap import Client
+
+
+def frame(message: dict) -> bytes:
+    """Encode a message with its `Content-Length` header."""
+
+    content = json.dumps(message).encode("utf-8")
+    return f"Content-Length: {len(content)}\r\n\r\n".encode("ascii") + content
+
+
+def messages_of(data: bytes) -> list[dict]:
+    """Decode all the messages framed in `data`, e.g. the result of `Client.send`."""
+
+    data = bytes(data)
+    messages = []
+    while data:
+        headers, rest = data.split(b"\r\n\r\n", 1)
+        length = int(headers.split(b":")[1])
+        messages.append(json.loads(rest[:length]))
+        data = rest[length:]
+    return messages
+
+
+def response(request_seq: int, command: str, body: Any, success: bool = True) -> bytes:
+    """Encode the response to a request."""
+
+    return frame(
+        {
+            "seq": 0,
+            "type": "response",
+            "request_seq": request_seq,
+            "success": success,
+            "command": command,
+            "body": body,
+        }
+    )
+
+
+def respond(client: Client, request: dict, body: Any, success: bool = True) -> list:
+    """Feed the response to a decoded request to the client.
+
+    Returns:
+        The messages yielded by the client.
+    """
+
+    return list(
+        client.receive(response(request["seq"], request["command"], body, success))
+    )
+
+
+def answer(sock, bodies: Optional[dict[str, Any]] = None) -> None:
+    """Answer every request on a blocking socket with a successful response.
+
+    Args:
+        sock: The socket of the client, closed once the client disconnects.
+        bodies: The response body by command, by default an empty list of threads \
+            for `threads` and an empty body for everything else.
+    """
+
+    if bodies is None:
+        bodies = {"threads": {"threads": []}}
+
+    with sock, sock.makefile("rwb", buffering=0) as stream:
+        try:
+            seq = 1
+            while headers := stream.readline():
+                length = int(headers.split(b":")[1])
+                stream.readline()
+                request = json.loads(stream.read(length))
+                message = {
+                    "seq": seq,
+                    "type": "response",
+                    "request_seq": request["seq"],
+                    "success": True,
+                    "command": request["command"],
+                    "body": bodies.get(request["command"], {}),
+                }
+                stream.write(frame(message))
+                seq += 1
+        except ConnectionError:
+            pass
@@ -0,0 +1,48 @@
+from conftest import messages_of, respond
+
+from dap import Client
+
+
+def respond_breakpoints(client: Client, request: dict, success: bool = True) -> list:
+    breakpoints = request["arguments"]["breakpoints"]
+    body = {
+        "breakpoints": [{"id": i, "verified": True} for i, _ in enumerate(breakpoints)]
+    }
+    if not success:
+        body = {"error": {"id": 1, "format": "no such file"}}
+    return respond(client, request, body, success)
+
+
+def test_load_breakpoints_bounded_in_flight():
+    client = Client("test")
+    client.send()
+
+    progress = []
+    completed = []
+    loader = client.load_breakpoints(
+        [({"path": f"file{i}.py"}, [{"line": 1}, {"line": 2}]) for i in range(10)],
+        function_breakpoints=[{"name": "main"}],
+        max_in_flight=3,
+        on_progress=lambda result, done, total: progress.append((done, total)),
+        on_complete=completed.append,
+    )
+
+    sent = messages_of(client.send())
+    assert len(sent) == 3
+
+    while sent:
+        request = sent.pop(0)
+        respond_breakpoints(
+            client,
+            request,
+            success=request["arguments"].get("source") != {"path": "file4.py"},
+        )
+        sent += messages_of(client.send())
+
+    assert loader.done
+    assert completed == [loader]
+    assert progress[-1] == (11, 11)
+    assert loader.elapsed is not None
+    assert [result.source for result in loader.failures] == [{"path": "file4.py"}]
+    assert loader.failures[0].error == "no such file"
+    assert sum(result.verified for result in loader.results) == 19
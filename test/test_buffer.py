@@ -0,0 +1,60 @@
+import json
+
+from dap.buffer import ReceiveBuffer, RequestBuffer, encode_request
+from dap.types import StackFrameFormat
+
+
+def frame(message: dict, headers: str = "") -> bytes:
+    content = json.dumps(message).encode("utf-8")
+    header = f"Content-Length: {len(content)}\r\n{headers}\r\n".encode("ascii")
+    return header + content
+
+
+def test_pop_frame_across_chunks():
+    messages = [{"seq": i, "data": "x" * (i * 5000)} for i in range(20)]
+    data = b"".join(frame(message) for message in messages)
+
+    buffer = ReceiveBuffer(size=1024, read_size=1024)
+    received = []
+    for i in range(0, len(data), 777):
+        chunk = data[i : i + 777]
+        view = buffer.get_buffer()
+        view[: len(chunk)] = chunk
+        view.release()
+        buffer.commit(len(chunk))
+
+        while (content := buffer.pop_frame()) is not None:
+            with content:
+                received.append(json.loads(str(content, "utf-8")))
+
+    assert received == messages
+    assert len(buffer) == 0
+
+
+def test_pop_frame_with_extra_headers():
+    buffer = ReceiveBuffer()
+    buffer.extend(frame({"seq": 1}, headers="Content-Type: application/json\r\n"))
+
+    content = buffer.pop_frame()
+    assert json.loads(bytes(content)) == {"seq": 1}
+    assert buffer.pop_frame() is None
+
+
+def test_templates_encode_like_request_buffer():
+    for seq, command, arguments in (
+        (1, "threads", None),
+        (2, "threads", {}),
+        (3, "continue", {"threadId": None}),
+        (4, "next", {"threadId": 1, "singleThread": None, "granularity": "line"}),
+        (5, "next", {"threadId": 1, "singleThread": True}),
+        (6, "stackTrace", {"threadId": 1, "startFrame": 0, "levels": 20}),
+        (7, "stackTrace", {"threadId": 1, "format": StackFrameFormat(line=True)}),
+        (8, "evaluate", {"expression": 'items["\u00e9"]\n', "context": "hover"}),
+        (123456, "variables", {"variablesReference": 5, "count": 1.5}),
+        (9, "setBreakpoints", {"source": {"path": "/a.py"}, "lines": [1]}),
+    ):
+        # twice, the second time from the cached template
+        for _ in range(2):
+            assert encode_request(seq, command, arguments) == bytes(
+                RequestBuffer(seq, command, arguments)
+            )
@@ -0,0 +1,166 @@
+from conftest import frame, messages_of, response
+
+from dap import Client
+from dap.events import ContinuedEvent
+
+
+def initialized_client(**capabilities) -> Client:
+    client = Client("test")
+    client.send()
+    list(client.receive(response(1, "initialize", capabilities)))
+    return client
+
+
+def test_superseded_requests_are_cancelled_and_dropped():
+    client = initialized_client(supportsCancelRequest=True)
+
+    variables = client.variables(1000)
+    threads = client.threads()
+    client.send()
+
+    continued = frame(
+        {"seq": 1, "type": "event", "event": "continued", "body": {"threadId": 1}}
+    )
+    assert [type(m) for m in client.receive(continued)] == [ContinuedEvent]
+    assert client.stop_epoch == 1
+
+    cancels = messages_of(client.send())
+    assert [(r["command"], r["arguments"]) for r in cancels] == [
+        ("cancel", {"requestId": variables})
+    ]
+
+    # a stale body that would not even validate is dropped before parsing
+    stale = response(variables, "variables", {"variables": "not a list"})
+    assert list(client.receive(stale)) == []
+    assert variables not in client._pending_requests
+    assert threads in client._pending_requests
+
+
+def test_superseded_requests_without_cancel_support():
+    client = initialized_client()
+
+    variables = client.variables(1000)
+    next_ = client.next(1)
+    client.send()
+    list(client.receive(response(next_, "next", {})))
+
+    assert client.send() == b""
+    assert list(client.receive(response(variables, "variables", {}))) == []
+
+
+def event(name: str, body: dict) -> bytes:
+    return frame({"seq": 1, "type": "event", "event": name, "body": body})
+
+
+def test_requests_sent_while_running_are_superseded():
+    client = initialized_client(supportsCancelRequest=True)
+
+    continue_ = client.continue_(1)
+    client.send()
+    list(client.receive(response(continue_, "continue", {})))
+    assert client.stop_epoch == 1
+
+    # sent while running, superseded by the continued event of the same resume
+    stack = client.stack_trace(1)
+    client.send()
+    list(client.receive(event("continued", {"threadId": 1})))
+    assert client.stop_epoch == 1
+    cancels = messages_of(client.send())
+    assert [r["arguments"] for r in cancels] == [{"requestId": stack}]
+    assert list(client.receive(response(stack, "stackTrace", {}))) == []
+
+
+def test_unanswered_superseded_requests_are_forgotten():
+    client = initialized_client()
+
+    variables = client.variables(1000)
+    client.send()
+    list(client.receive(event("continued", {"threadId": 1})))
+    assert variables in client._dropped_requests
+
+    # the response may still arrive until the next resume and stop
+    list(client.receive(event("stopped", {"reason": "step", "threadId": 1})))
+    assert variables in client._dropped_requests
+    list(client.receive(event("continued", {"threadId": 1})))
+    list(client.receive(event("stopped", {"reason": "step", "threadId": 1})))
+    assert not client._dropped_requests
+    assert variables not in client._pending_requests
+
+    # a late response is still dropped
+    assert list(client.receive(response(variables, "variables", {}))) == []
+
+
+def test_superseded_callbacks_are_called_with_cancelled():
+    client = initialized_client()
+
+    responses = []
+    variables = client.send_request(
+        "variables", {"variablesReference": 1}, responses.append
+    )
+    client.send_request("threads", None, responses.append)
+    client.send()
+    list(client.receive(event("continued", {"threadId": 1})))
+
+    (cancelled,) = responses
+    assert cancelled.request_seq == variables
+    assert not cancelled.success and cancelled.message == "cancelled"
+
+    assert list(client.receive(response(variables, "variables", {}))) == []
+    assert len(responses) == 1
+
+
+def test_stale_responses_are_dropped_before_decoding():
+    client = initialized_client()
+
+    variables = client.variables(1000)
+    client.send()
+    list(client.receive(event("continued", {"threadId": 1})))
+
+    # the body is never decoded, so not even broken JSON is noticed
+    content = b'{"seq": 5, "type": "response", "request_seq": %d, "body": {' % variables
+    stale = b"Content-Length: %d\r\n\r\n" % len(content) + content
+    assert list(client.receive(stale)) == []
+    assert not client._dropped_requests
+
+
+def test_single_thread_resume_keeps_other_threads_requests():
+    client = initialized_client(supportsCancelRequest=True)
+
+    # the frames and variables of thread 1 are known from its stack and scopes
+    for thread_id in (1, 2):
+        stack = client.stack_trace(thread_id)
+        client.send()
+        frames = [{"id": thread_id * 10, "name": "f", "line": 1, "column": 1}]
+        list(client.receive(response(stack, "stackTrace", {"stackFrames": frames})))
+    scopes = client.scopes(10)
+    client.send()
+    body = {"scopes": [{"name": "Locals", "variablesReference": 100}]}
+    list(client.receive(response(scopes, "scopes", body)))
+
+    locals_ = client.variables(100)
+    other = client.scopes(20)
+    unknown = client.variables(1000)
+    client.send()
+
+    body = {"threadId": 2, "allThreadsContinued": False}
+    list(client.receive(event("continued", body)))
+    assert client.stop_epoch == 1
+    cancels = messages_of(client.send())
+    assert [r["arguments"] for r in cancels] == [{"requestId": other}]
+    assert locals_ in client._pending_requests
+    assert unknown in client._pending_requests
+
+    # a step of thread 1 alone supersedes its requests only
+    step = client.next(1, single_thread=True)
+    client.send()
+    list(client.receive(response(step, "next", {})))
+    assert client.stop_epoch == 2
+    cancels = messages_of(client.send())
+    assert [r["arguments"] for r in cancels] == [{"requestId": locals_}]
+    assert unknown in client._pending_requests
+
+    # all threads resuming supersedes everything left
+    list(client.receive(event("continued", {"threadId": 1})))
+    assert client.stop_epoch == 3
+    cancels = messages_of(client.send())
+    assert [r["arguments"] for r in cancels] == [{"requestId": unknown}]
@@ -0,0 +1,25 @@
+import subprocess
+import sys
+
+import dap
+
+
+def test_every_export_resolves():
+    for name in dap.__all__:
+        value = getattr(dap, name)
+        assert value.__name__ == name
+        assert value.__module__ == f"dap.{dap._EXPORTS[name]}"
+    assert set(dap.__all__) <= set(dir(dap))
+
+
+def test_import_is_lazy():
+    # a fresh interpreter, this one has long imported everything
+    script = """
+import sys
+import dap
+
+assert not [m for m in sys.modules if m.startswith(("dap.", "pydantic"))]
+dap.Client
+assert "dap.types" in sys.modules and "pydantic" in sys.modules
+"""
+    subprocess.run([sys.executable, "-c", script], check=True)
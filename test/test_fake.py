@@ -0,0 +1,161 @@
+import asyncio
+import threading
+
+import pytest
+
+from dap import (
+    AsyncConnection,
+    AsyncLoopbackConnection,
+    AsyncServer,
+    Client,
+    CloneUnsupported,
+    FakeAdapter,
+    LoopbackConnection,
+    ThreadedServer,
+)
+from dap.base import ErrorResponse, Requests, Response
+from dap.events import OutputEvent, StoppedEvent
+from dap.fake import FakeAdapterError, serve
+from dap.responses import StackTraceResponse, ThreadsResponse, VariablesResponse
+
+ARGUMENTS = {
+    Requests.SCOPES: {"frameId": 0},
+    Requests.SETBREAKPOINTS: {
+        "source": {"path": "main.py"},
+        "breakpoints": [{"line": 3}],
+    },
+    Requests.READMEMORY: {"memoryReference": "0x10", "count": 4},
+}
+
+
+def exchange(client, adapter):
+    adapter.feed(client.send())
+    return list(client.receive(adapter.send(1 << 30)))
+
+
+def test_every_request_is_answered():
+    client = Client("fake")
+    adapter = FakeAdapter()
+    exchange(client, adapter)
+
+    commands = [c for c in Requests if c not in ("runInTerminal", "startDebugging")]
+    commands.sort(key=lambda command: command == Requests.DISCONNECT)
+    for command in commands:
+        results = []
+        client.send_request(command, ARGUMENTS.get(command), results.append)
+        exchange(client, adapter)
+
+        assert len(results) == 1, command
+        assert not isinstance(results[0], (ErrorResponse, Response)), command
+
+    assert adapter.closed
+    assert set(adapter.received) == set(commands) | {"initialize"}
+
+
+def test_scripted_replies():
+    client = Client("fake")
+    adapter = FakeAdapter(stack_depth=10_000, variable_count=1_000)
+
+    def fail(arguments):
+        raise FakeAdapterError("not now")
+
+    adapter.on("evaluate", fail)
+    adapter.on("configurationDone", lambda arguments: adapter.stop())
+    exchange(client, adapter)
+
+    results = []
+    client.send_request("evaluate", {"expression": "x"}, results.append)
+    client.send_request(
+        "stackTrace", {"threadId": 1, "startFrame": 9_990, "levels": 20}, results.append
+    )
+    client.send_request(
+        "variables",
+        {"variablesReference": 1, "start": 500, "count": 100},
+        results.append,
+    )
+    messages = exchange(client, adapter)
+    client.configuration_done()
+    messages += exchange(client, adapter)
+
+    error, stack, variables = results
+    assert isinstance(error, ErrorResponse) and error.message == "not now"
+    assert [frame.id for frame in stack.stackFrames] == list(range(9_990, 10_000))
+    assert stack.totalFrames == 10_000
+    assert [v.name for v in variables.variables] == [f"var{i}" for i in range(500, 600)]
+    assert isinstance(messages[-1], StoppedEvent)
+
+
+class FloodServer(ThreadedServer):
+    def __init__(self, *args, **kwargs):
+        self.outputs = 0
+        self.done = threading.Event()
+        super().__init__(*args, **kwargs)
+
+    def handle_message(self, message):
+        if isinstance(message, OutputEvent):
+            self.outputs += 1
+        elif isinstance(message, StackTraceResponse):
+            self.done.set()
+
+
+def test_loopback_flood():
+    adapter = FakeAdapter(stack_depth=10_000)
+    adapter.on("configurationDone", lambda arguments: adapter.output_flood(10_000))
+    server = FloodServer("fake", connection=LoopbackConnection(adapter))
+    server.start()
+
+    server.client.configuration_done()
+    server.client.stack_trace(1)
+    assert server.done.wait(10)
+    assert server.outputs == 10_000
+
+    server.stop()
+
+
+def test_async_loopback_and_socket():
+    class Server(AsyncServer):
+        def __init__(self, *args, **kwargs):
+            self.messages = []
+            super().__init__(*args, **kwargs)
+
+        def handle_message(self, message):
+            self.messages.append(message)
+
+    async def run(connection):
+        server = Server("fake", connection=connection)
+        task = asyncio.create_task(server.start())
+
+        done = asyncio.Event()
+        server.client.threads()
+        server.client.send_request(
+            "variables", {"variablesReference": 1}, lambda _: done.set()
+        )
+        await asyncio.wait_for(done.wait(), 5)
+
+        await server.stop()
+        task.cancel()
+        return server.messages
+
+    async def over_socket():
+        adapter_server = await serve(
+            adapter_factory=lambda: FakeAdapter(thread_count=3, variable_count=50_000)
+        )
+        port = adapter_server.sockets[0].getsockname()[1]
+        messages = await run(AsyncConnection("127.0.0.1", port))
+        adapter_server.close()
+        return messages
+
+    adapter = FakeAdapter(thread_count=3, variable_count=50_000)
+    for messages in (
+        asyncio.run(run(AsyncLoopbackConnection(adapter, read_size=4096))),
+        asyncio.run(over_socket()),
+    ):
+        threads, variables = messages[-2:]
+        assert isinstance(threads, ThreadsResponse) and len(threads.threads) == 3
+        assert isinstance(variables, VariablesResponse)
+        assert len(variables.variables) == 50_000
+
+
+def test_loopback_cannot_clone():
+    with pytest.raises(CloneUnsupported):
+        AsyncLoopbackConnection().clone()
@@ -0,0 +1,104 @@
+import os
+import tempfile
+import urllib.request
+
+from dap import Client, ClientMetrics, FakeAdapter
+from dap.fake import FakeAdapterError
+from dap.metrics import Histogram
+
+
+def fail(arguments):
+    raise FakeAdapterError("no such frame")
+
+
+def exchange(client, adapter):
+    data = client.send()
+    adapter.feed(data)
+    received = adapter.send()
+    return data, received, list(client.receive(received))
+
+
+def test_client_metrics():
+    metrics = ClientMetrics()
+    client = Client("fake", metrics=metrics)
+    adapter = FakeAdapter()
+    adapter.on("configurationDone", lambda arguments: adapter.output_flood(10))
+    adapter.on("scopes", fail)
+
+    sent = received = 0
+    client.configuration_done()
+    client.threads()
+    client.scopes(1)
+    assert metrics.in_flight() == {
+        "initialize": 1,
+        "configurationDone": 1,
+        "threads": 1,
+        "scopes": 1,
+    }
+
+    data, response, _ = exchange(client, adapter)
+    sent += len(data)
+    received += len(response)
+
+    assert metrics.in_flight() == {}
+    assert metrics.requests == {
+        "initialize": 1,
+        "configurationDone": 1,
+        "threads": 1,
+        "scopes": 1,
+    }
+    assert metrics.failures == {"scopes": 1}
+    assert metrics.events == {"initialized": 1, "output": 10}
+    assert metrics.bytes_sent == sent
+    assert metrics.bytes_received == received
+
+    snapshot = metrics.snapshot()
+    assert snapshot["latency"]["threads"]["count"] == 1
+    assert 0 < snapshot["latency"]["threads"]["p99"] <= 10.0
+    assert snapshot["event_rates"]["output"] > 0
+
+    text = metrics.prometheus(labels={"session": "1"})
+    assert 'dap_requests_total{session="1",command="scopes"} 1' in text
+    assert 'dap_request_failures_total{session="1",command="scopes"} 1' in text
+    assert 'dap_events_total{session="1",event="output"} 10' in text
+    assert (
+        'dap_request_duration_seconds_bucket{session="1",command="threads",le="+Inf"} 1'
+        in text
+    )
+    assert f'dap_received_bytes_total{{session="1"}} {received}' in text
+
+    path = os.path.join(tempfile.mkdtemp(), "dap.prom")
+    metrics.write(path)
+    with open(path) as f:
+        assert f.read() == metrics.prometheus()
+
+    server = metrics.serve()
+    try:
+        url = "http://%s:%d/metrics" % server.server_address
+        with urllib.request.urlopen(url) as response:
+            assert response.read().decode() == metrics.prometheus()
+    finally:
+        server.shutdown()
+
+
+def test_histogram_quantile():
+    histogram = Histogram((1.0, 2.0, 4.0))
+    assert histogram.quantile(0.5) == 0.0
+
+    for value in (0.5, 1.5, 1.5, 3.0, 100.0):
+        histogram.observe(value)
+    assert histogram.counts == [1, 2, 1, 1]
+    assert histogram.quantile(0.5) == 1.75
+    assert histogram.quantile(1.0) == 4.0
+
+
+def test_prometheus_escapes_label_values():
+    metrics = ClientMetrics()
+    metrics.events['custom "event"\n'] += 1
+
+    text = metrics.prometheus(labels={"path": "C:\\dap\\"})
+    assert (
+        'dap_events_total{path="C:\\\\dap\\\\",event="custom \\"event\\"\\n"} 1' in text
+    )
+    # the newline did not split the sample
+    assert not any(line.startswith('"') for line in text.splitlines())
@@ -0,0 +1,247 @@
+import itertools
+import json
+import socket
+import threading
+import time
+
+from conftest import answer
+
+from dap import SessionPool
+from dap.responses import StackTraceResponse
+
+STACK = {
+    "stackFrames": [
+        {
+            "id": i,
+            "name": f"frame{i}",
+            "line": i,
+            "column": 1,
+            "source": {"name": "a.py"},
+        }
+        for i in range(5)
+    ],
+    "totalFrames": 5,
+}
+
+
+def serve_adapter():
+    listener = socket.create_server(("127.0.0.1", 0))
+
+    def accept():
+        while True:
+            sock, _ = listener.accept()
+            threading.Thread(
+                target=answer, args=(sock, {"stackTrace": STACK}), daemon=True
+            ).start()
+
+    threading.Thread(target=accept, daemon=True).start()
+    return listener.getsockname()[1]
+
+
+class RecordingPool(SessionPool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.messages = []
+        self.closed = []
+
+    def handle_message(self, session_id, message):
+        self.messages.append((session_id, message))
+
+    def session_closed(self, session_id, error):
+        self.closed.append((session_id, error))
+
+
+def test_session_pool():
+    port = serve_adapter()
+    pool = RecordingPool(workers=2)
+    pool.start()
+
+    session_ids = [pool.add("test", "127.0.0.1", port) for _ in range(4)]
+    responses = {}
+    received = threading.Event()
+
+    def on_response(session_id, response):
+        responses[session_id] = response
+        if len(responses) == len(session_ids):
+            received.set()
+
+    for session_id in session_ids:
+        pool.send_request(
+            session_id,
+            "stackTrace",
+            {"threadId": 1},
+            lambda response, session_id=session_id: on_response(session_id, response),
+        )
+    assert received.wait(10)
+
+    # forwarded as decoded from JSON, not as models
+    for response in responses.values():
+        assert response["type"] == "response"
+        assert response["command"] == "stackTrace"
+        assert response["body"] == STACK
+
+    pool.stop()
+    assert sorted(session_id for session_id, _ in pool.closed) == session_ids
+    assert not pool.sessions
+
+
+def frame_names(session_id, message):
+    if isinstance(message, StackTraceResponse):
+        return [frame.name for frame in message.stackFrames]
+
+
+def test_session_pool_process():
+    port = serve_adapter()
+    pool = RecordingPool(workers=1, process=frame_names)
+    pool.start()
+
+    session_id = pool.add("test", "127.0.0.1", port)
+    received = threading.Event()
+    names = []
+    pool.send_request(
+        session_id,
+        "stackTrace",
+        {"threadId": 1},
+        lambda response: (names.extend(response), received.set()),
+    )
+    assert received.wait(10)
+    pool.stop()
+
+    assert names == [f"frame{i}" for i in range(5)]
+    # the initialize response was not forwarded
+    assert pool.messages == [(session_id, names)]
+
+
+def serve_parent_adapter():
+    # the first connection asks for a child session when launched, the child's
+    # connection is closed once it is configured, like a subprocess exiting
+    listener = socket.create_server(("127.0.0.1", 0))
+
+    def handle(sock, child):
+        with sock, sock.makefile("rwb", buffering=0) as stream:
+            try:
+                seq = 1
+                while headers := stream.readline():
+                    length = int(headers.split(b":")[1])
+                    stream.readline()
+                    request = json.loads(stream.read(length))
+                    if request["type"] != "request":
+                        continue
+                    messages = [
+                        {
+                            "type": "response",
+                            "request_seq": request["seq"],
+                            "success": True,
+                            "command": request["command"],
+                            "body": {},
+                        }
+                    ]
+                    if request["command"] == "launch" and not child:
+                        messages.append(
+                            {
+                                "type": "request",
+                                "command": "startDebugging",
+                                "arguments": {"request": "attach", "configuration": {}},
+                            }
+                        )
+                    for message in messages:
+                        content = json.dumps({"seq": seq, **message}).encode()
+                        stream.write(
+                            b"Content-Length: %d\r\n\r\n" % len(content) + content
+                        )
+                        seq += 1
+                    if request["command"] == "configurationDone" and child:
+                        return
+            except ConnectionError:
+                pass
+
+    def accept():
+        for index in itertools.count():
+            sock, _ = listener.accept()
+            threading.Thread(target=handle, args=(sock, index > 0), daemon=True).start()
+
+    threading.Thread(target=accept, daemon=True).start()
+    return listener.getsockname()[1]
+
+
+def test_child_session_closed():
+    port = serve_parent_adapter()
+    pool = RecordingPool(workers=1)
+    pool.start()
+
+    session_id = pool.add("test", "127.0.0.1", port)
+    pool.send_request(session_id, "launch")
+    child_id = (session_id, 1)
+    for _ in range(500):
+        if child_id in (closed for closed, _ in pool.closed):
+            break
+        time.sleep(0.01)
+
+    assert pool.closed == [(child_id, None)]
+    assert pool.sessions == [session_id]
+    assert pool._load == [1]
+
+    pool.remove(session_id)
+    pool.remove(child_id)
+    pool.stop()
+    assert pool._load == [0]
+
+
+def test_superseded_request_callback():
+    port = serve_adapter()
+    pool = RecordingPool(workers=1)
+    pool.start()
+
+    session_id = pool.add("test", "127.0.0.1", port)
+    received = threading.Event()
+    responses = []
+    pool.send_request(session_id, "continue", {"threadId": 1})
+    pool.send_request(
+        session_id,
+        "variables",
+        {"variablesReference": 1},
+        lambda response: (responses.append(response), received.set()),
+    )
+    assert received.wait(10)
+    pool.stop()
+
+    # answered by the client when the continue response superseded the request
+    (cancelled,) = responses
+    assert cancelled["command"] == "variables"
+    assert not cancelled["success"] and cancelled["message"] == "cancelled"
+    assert (session_id, cancelled) in pool.messages
+
+
+class FailingPool(RecordingPool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.errors = []
+
+    def handle_message(self, session_id, message):
+        super().handle_message(session_id, message)
+        if message.get("command") == "launch":
+            raise RuntimeError("broken handler")
+
+    def handle_error(self, session_id, error):
+        self.errors.append((session_id, error))
+
+
+def test_errors_do_not_stop_the_pool():
+    port = serve_adapter()
+    pool = FailingPool(workers=1)
+    pool.start()
+
+    session_id = pool.add("test", "127.0.0.1", port)
+    received = threading.Event()
+    pool.send_request(session_id, "stackTrace", callback=lambda response: 1 / 0)
+    pool.send_request(session_id, "launch")
+    pool.send_request(session_id, "stackTrace", callback=lambda _: received.set())
+    assert received.wait(10)
+
+    # requests to sessions that are gone are ignored
+    pool.send_request("closed", "threads")
+    pool.stop()
+
+    errors = [(session, type(error)) for session, error in pool.errors]
+    assert errors == [(session_id, ZeroDivisionError), (session_id, RuntimeError)]
+    assert pool.closed == [(session_id, None)]
@@ -0,0 +1,42 @@
+from dap import Client, FakeAdapter, HandlerProfiler
+from dap.profiling import STAGES
+
+
+def exchange(client, adapter):
+    adapter.feed(client.send())
+    return list(client.receive(adapter.send()))
+
+
+def test_toggle_on_live_client():
+    client = Client("fake")
+    adapter = FakeAdapter(stack_depth=50)
+    adapter.on("configurationDone", lambda arguments: adapter.output_flood(100))
+    exchange(client, adapter)
+
+    profiler = client.profiler = HandlerProfiler()
+    client.configuration_done()
+    client.stack_trace(1)
+    exchange(client, adapter)
+
+    stats = profiler.stats
+    for stage in STAGES:
+        assert stats[stage, "event", "output"][0] == 100
+        assert stats[stage, "response", "stackTrace"][0] == 1
+    assert ("decode", "response", "initialize") not in stats
+
+    rows = profiler.rows()
+    assert rows == sorted(rows, key=lambda row: row.total, reverse=True)
+    assert {row.stage for row in rows} == set(STAGES)
+    assert all(0 < row.mean <= row.max for row in rows)
+
+    report = profiler.report(3)
+    assert len(report.splitlines()) == 2 + 3
+    assert "event output" in report
+
+    client.profiler = None
+    client.threads()
+    exchange(client, adapter)
+    assert ("decode", "response", "threads") not in profiler.stats
+
+    profiler.reset()
+    assert profiler.rows() == []
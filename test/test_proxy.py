@@ -0,0 +1,194 @@
+import asyncio
+
+from dap import AsyncConnection, Client, Proxy
+from dap.base import ErrorResponse
+from dap.events import InitializedEvent, StoppedEvent
+from dap.fake import FakeAdapter, serve
+from dap.responses import (
+    Cancelled,
+    Continued,
+    SetVariableResponse,
+    StackTraceResponse,
+    ThreadsResponse,
+    VariablesResponse,
+)
+
+
+class Frontend:
+    """A client talking to the proxy over a socket."""
+
+    def __init__(self, reader, writer):
+        self.client = Client("frontend")
+        self.reader = reader
+        self.writer = writer
+        self.received = []
+
+    def send(self):
+        self.writer.write(self.client.send())
+
+    async def until(self, kind, count=1):
+        while sum(isinstance(message, kind) for message in self.received) < count:
+            self.send()
+            data = await asyncio.wait_for(self.reader.read(65536), 5)
+            assert data, "proxy closed the connection"
+            self.received.extend(self.client.receive(data))
+        return [message for message in self.received if isinstance(message, kind)]
+
+
+async def session():
+    adapters = []
+
+    def factory():
+        adapters.append(FakeAdapter(stack_depth=20))
+        return adapters[-1]
+
+    adapter_server = await serve(adapter_factory=factory)
+    port = adapter_server.sockets[0].getsockname()[1]
+    proxy = Proxy("fake", connection=AsyncConnection("127.0.0.1", port))
+    server = await proxy.listen()
+    task = asyncio.create_task(proxy.start())
+
+    async def connect():
+        frontend = Frontend(
+            *await asyncio.open_connection(*server.sockets[0].getsockname())
+        )
+        await frontend.until(InitializedEvent)
+        return frontend
+
+    return adapter_server, proxy, task, connect
+
+
+def test_shared_session():
+    async def run():
+        adapter_server, proxy, task, connect = await session()
+        ide, dashboard = await connect(), await connect()
+        assert len(proxy.frontends) == 2
+
+        ide.client.launch()
+        dashboard.client.launch()
+        ide.client.pause(1)
+        ide.send()
+        (stopped,) = await dashboard.until(StoppedEvent)
+        assert stopped.reason == "pause"
+        await ide.until(StoppedEvent)
+
+        # both read the same frames, only one read reaches the adapter
+        forwarded = proxy.stats.forwarded
+        ide.client.stack_trace(1, levels=5)
+        dashboard.client.stack_trace(1, levels=5)
+        ide.send()
+        dashboard.send()
+        for frontend in (ide, dashboard):
+            (frames,) = await frontend.until(StackTraceResponse)
+            assert len(frames.stackFrames) == 5
+        assert proxy.stats.forwarded == forwarded + 1
+        assert proxy.stats.cache_hits + proxy.stats.coalesced == 1
+
+        # a late frontend is told the debuggee is stopped and reads from the cache
+        late = await connect()
+        await late.until(StoppedEvent)
+        late.client.stack_trace(1, levels=5)
+        await late.until(StackTraceResponse)
+        assert proxy.stats.forwarded == forwarded + 1
+
+        # resuming invalidates the cache
+        ide.client.continue_(1)
+        await ide.until(Continued)
+        dashboard.client.stack_trace(1, levels=5)
+        await dashboard.until(StackTraceResponse, 2)
+        assert proxy.stats.forwarded == forwarded + 3
+
+        # a second launch is answered by the proxy, not the adapter
+        assert proxy.stats.answered == 1
+
+        await proxy.stop()
+        task.cancel()
+        adapter_server.close()
+
+    asyncio.run(run())
+
+
+def test_detach():
+    async def run():
+        adapter_server, proxy, task, connect = await session()
+        ide, dashboard = await connect(), await connect()
+
+        # only the last frontend detaching disconnects the adapter
+        dashboard.client.disconnect()
+        dashboard.send()
+        assert await asyncio.wait_for(dashboard.reader.read(), 5)
+        await asyncio.sleep(0.05)
+        assert len(proxy.frontends) == 1
+        assert proxy.stats.forwarded == 0
+
+        ide.client.threads()
+        await ide.until(ThreadsResponse)
+        assert proxy.stats.forwarded == 1
+
+        await proxy.stop()
+        task.cancel()
+        adapter_server.close()
+
+    asyncio.run(run())
+
+
+def test_reads_around_changes():
+    async def run():
+        adapter_server, proxy, task, connect = await session()
+        ide, dashboard = await connect(), await connect()
+
+        # a read after a change is not merged onto one sent before it
+        forwarded = proxy.stats.forwarded
+        ide.client.variables(2)
+        ide.client.set_variable(2, "x", "1")
+        ide.client.variables(2)
+        ide.send()
+        await ide.until(SetVariableResponse)
+        await ide.until(VariablesResponse, 2)
+        assert proxy.stats.coalesced == 0
+        assert proxy.stats.forwarded == forwarded + 3
+
+        # cancelling a merged read leaves it to the others waiting for it
+        first = ide.client.variables(3)
+        second = dashboard.client.variables(3)
+        dashboard.client.cancel(request_id=second)
+        ide.send()
+        dashboard.send()
+        (error,) = await dashboard.until(ErrorResponse)
+        assert error.request_seq == second and error.message == "cancelled"
+        await dashboard.until(Cancelled)
+        variables = (await ide.until(VariablesResponse, 3))[-1]
+        assert variables.variables
+        assert proxy.stats.coalesced == 1
+        assert proxy.stats.forwarded == forwarded + 4
+        assert first not in ide.client._pending_requests
+
+        await proxy.stop()
+        task.cancel()
+        adapter_server.close()
+
+    asyncio.run(run())
+
+
+def test_detach_ignores_uninitialized_frontends():
+    async def run():
+        adapter_server, proxy, task, connect = await session()
+        ide = await connect()
+        _, lurker = await asyncio.open_connection(
+            *proxy.server.sockets[0].getsockname()
+        )
+        await asyncio.sleep(0.05)
+        assert len(proxy.frontends) == 2
+
+        ide.client.disconnect()
+        ide.send()
+        await asyncio.sleep(0.1)
+        assert proxy.stats.forwarded == 1
+        assert proxy.stats.answered == 0
+
+        lurker.close()
+        await proxy.stop()
+        task.cancel()
+        adapter_server.close()
+
+    asyncio.run(run())
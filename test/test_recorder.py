@@ -0,0 +1,71 @@
+import os
+import tempfile
+import time
+
+from dap import Client, FakeAdapter, Recorder, Replayer, TraceReader
+from dap.recorder import RECEIVED, SENT
+
+
+def record_session(path):
+    adapter = FakeAdapter(stack_depth=50)
+    adapter.on("configurationDone", lambda arguments: adapter.output_flood(100))
+    messages = []
+
+    with Recorder(path) as recorder:
+        client = Client("fake", recorder=recorder)
+        for request in (
+            lambda: client.configuration_done(),
+            lambda: client.threads(),
+            lambda: client.stack_trace(1),
+            lambda: adapter.stop(),
+            lambda: client.continue_(1),
+        ):
+            request()
+            adapter.feed(client.send())
+            messages += client.receive(adapter.send())
+            time.sleep(0.01)
+
+    return messages
+
+
+def test_record_and_replay():
+    path = os.path.join(tempfile.mkdtemp(), "session.daplog")
+    recorded = record_session(path)
+
+    records = list(Replayer(path))
+    assert {record.direction for record in records} == {RECEIVED, SENT}
+    assert sum(r.direction == RECEIVED for r in records) == len(recorded)
+
+    replayed = []
+    assert Replayer(path).replay(on_message=replayed.append) == len(recorded)
+    assert replayed == recorded
+
+    start = time.perf_counter()
+    Replayer(path).replay(pacing=True, speed=2)
+    recorded_time = (records[-1].timestamp - records[0].timestamp) / 1e9
+    assert time.perf_counter() - start >= recorded_time / 2 * 0.9
+
+
+def test_trace_reader():
+    path = os.path.join(tempfile.mkdtemp(), "session.daplog")
+    recorded = record_session(path)
+    records = list(Replayer(path))
+
+    with TraceReader(path) as trace:
+        assert len(trace) == len(records) > 64
+        for index in (0, 63, 64, 65, len(records) - 1, -1):
+            record = trace[index]
+            assert record.data.tobytes() == records[index].data
+        assert [bytes(record.data) for record in trace.records(60, 70)] == [
+            record.data for record in records[60:70]
+        ]
+
+        timestamp = records[80].timestamp
+        assert trace.find(timestamp) == min(
+            i for i, record in enumerate(records) if record.timestamp >= timestamp
+        )
+        assert trace.find(records[-1].timestamp + 1) == len(records)
+
+        fed = []
+        assert trace.feed(Client("fake"), on_message=fed.append) == len(recorded)
+        assert fed == recorded
@@ -0,0 +1,268 @@
+import asyncio
+import json
+import socket
+
+from conftest import frame
+
+from dap import AsyncFdConnection, SessionManager, Tracer
+from dap.events import OutputEvent
+from dap.fake import FakeAdapter, serve
+from dap.responses import ThreadsResponse, VariablesResponse
+
+
+async def serve_adapter(flood=0):
+    # answers every request, `threads` only after `flood` output events
+    async def serve(reader, writer):
+        seq = 1
+        while True:
+            try:
+                headers = await reader.readuntil(b"\r\n\r\n")
+            except (asyncio.IncompleteReadError, ConnectionError):
+                break
+            request = json.loads(await reader.readexactly(int(headers.split(b":")[1])))
+
+            data = bytearray()
+            if request["command"] == "threads":
+                for _ in range(flood):
+                    data += frame(
+                        {
+                            "seq": seq,
+                            "type": "event",
+                            "event": "output",
+                            "body": {"category": "stdout", "output": "x" * 100},
+                        }
+                    )
+                    seq += 1
+            body = {"threads": []} if request["command"] == "threads" else {}
+            data += frame(
+                {
+                    "seq": seq,
+                    "type": "response",
+                    "request_seq": request["seq"],
+                    "success": True,
+                    "command": request["command"],
+                    "body": body,
+                }
+            )
+            seq += 1
+            writer.write(data)
+        writer.close()
+
+    server = await asyncio.start_server(serve, "127.0.0.1", 0)
+    return server, server.sockets[0].getsockname()[1]
+
+
+class RecordingManager(SessionManager):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.handled = []
+        self.done = {}
+
+    def handle_message(self, session, message):
+        self.handled.append((session.id, message))
+        if isinstance(message, ThreadsResponse):
+            self.done[session.id].set()
+
+
+def test_many_sessions():
+    async def run():
+        adapter, port = await serve_adapter()
+        manager = RecordingManager()
+        await manager.start()
+
+        sessions = [await manager.add("test", "127.0.0.1", port) for _ in range(50)]
+        for session in sessions:
+            manager.done[session.id] = asyncio.Event()
+            session.client.threads()
+        await asyncio.wait_for(
+            asyncio.gather(*(e.wait() for e in manager.done.values())), 5
+        )
+
+        assert len(manager.sessions) == 50
+        totals = manager.totals()
+        assert totals.messages == 100
+        assert totals.bytes_sent > 0 and totals.bytes_received > 0
+
+        await manager.stop()
+        assert not manager.sessions
+        assert all(s.closed for s in sessions)
+        adapter.close()
+
+    asyncio.run(run())
+
+
+def test_flooding_session_is_sliced():
+    async def run():
+        adapter, port = await serve_adapter(flood=500)
+        manager = RecordingManager(budget=10)
+        await manager.start()
+
+        flood = await manager.add("test", "127.0.0.1", port)
+        flood.client.tracer = Tracer()
+        quiet = await manager.add("test", "127.0.0.1", port)
+        manager.done[flood.id] = asyncio.Event()
+        manager.done[quiet.id] = asyncio.Event()
+        flood.client.threads()
+        quiet.client.initialize("test")
+        await asyncio.wait_for(manager.done[flood.id].wait(), 5)
+
+        outputs = [m for i, m in manager.handled if isinstance(m, OutputEvent)]
+        assert len(outputs) == 500
+        assert flood.stats.turns >= 50
+        assert flood.stats.messages == 502
+        assert quiet.stats.messages == 2
+        # also the last message of every full turn is traced as delivered
+        spans = flood.client.tracer.spans
+        assert len(spans) >= 501
+        assert all(span.delivered is not None for span in spans)
+
+        await manager.stop()
+        adapter.close()
+
+    asyncio.run(run())
+
+
+async def serve_parent_adapter(children):
+    # asks for `children` child sessions when launched, records all requests
+    connections = []
+
+    async def serve(reader, writer):
+        requests = []
+        connections.append(requests)
+        seq = 1
+        while True:
+            try:
+                headers = await reader.readuntil(b"\r\n\r\n")
+            except (asyncio.IncompleteReadError, ConnectionError):
+                break
+            request = json.loads(await reader.readexactly(int(headers.split(b":")[1])))
+            requests.append(request)
+            if request["type"] != "request":
+                continue
+
+            data = frame(
+                {
+                    "seq": seq,
+                    "type": "response",
+                    "request_seq": request["seq"],
+                    "success": True,
+                    "command": request["command"],
+                    "body": {},
+                }
+            )
+            seq += 1
+            if request["command"] == "launch" and len(connections) == 1:
+                for i in range(children):
+                    data += frame(
+                        {
+                            "seq": seq,
+                            "type": "request",
+                            "command": "startDebugging",
+                            "arguments": {
+                                "request": "attach",
+                                "configuration": {"subProcessId": i},
+                            },
+                        }
+                    )
+                    seq += 1
+            writer.write(data)
+        writer.close()
+
+    server = await asyncio.start_server(serve, "127.0.0.1", 0)
+    return server, server.sockets[0].getsockname()[1], connections
+
+
+def test_child_sessions():
+    async def run():
+        adapter, port, connections = await serve_parent_adapter(children=5)
+        manager = RecordingManager()
+        await manager.start()
+
+        parent = await manager.add("test", "127.0.0.1", port)
+        parent.client.launch()
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if len(parent.children) == 5 and len(connections[0]) == 7:
+                break
+
+        assert [child.id for child in parent.children] == [
+            (parent.id, i) for i in range(1, 6)
+        ]
+        replies = [m for m in connections[0] if m["type"] == "response"]
+        assert len(replies) == 5
+        assert all(reply["success"] for reply in replies)
+        assert len({reply["seq"] for reply in replies}) == 5
+
+        for requests in connections[1:]:
+            assert [r["command"] for r in requests] == [
+                "initialize",
+                "attach",
+                "configurationDone",
+            ]
+        assert sorted(r[1]["arguments"]["subProcessId"] for r in connections[1:]) == [
+            0,
+            1,
+            2,
+            3,
+            4,
+        ]
+
+        manager.pause_tree(parent)
+        await asyncio.sleep(0.05)
+        assert all(requests[-1]["command"] == "pause" for requests in connections)
+
+        await manager.remove(parent)
+        assert not manager.sessions
+        adapter.close()
+
+    asyncio.run(run())
+
+
+def test_message_larger_than_backlog():
+    async def run():
+        server = await serve(adapter_factory=lambda: FakeAdapter(variable_count=50_000))
+        manager = RecordingManager(budget=4, max_backlog=1 << 16)
+        await manager.start()
+
+        session = await manager.add("test", *server.sockets[0].getsockname())
+        manager.done[session.id] = asyncio.Event()
+        session.client.variables(1)
+        session.client.threads()
+        await asyncio.wait_for(manager.done[session.id].wait(), 5)
+
+        (variables,) = [
+            m for _, m in manager.handled if isinstance(m, VariablesResponse)
+        ]
+        assert len(variables.variables) == 50_000
+        assert session.stats.max_backlog > manager.max_backlog
+        assert not session._reading_paused
+
+        await manager.stop()
+        server.close()
+
+    asyncio.run(run())
+
+
+def test_child_session_without_clone():
+    async def run():
+        adapter, port, connections = await serve_parent_adapter(children=1)
+        manager = RecordingManager()
+        await manager.start()
+
+        sock = socket.create_connection(("127.0.0.1", port))
+        parent = await manager.add("test", connection=AsyncFdConnection(sock))
+        parent.client.launch()
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if any(m["type"] == "response" for m in connections[0]):
+                break
+
+        (reply,) = [m for m in connections[0] if m["type"] == "response"]
+        assert not reply["success"]
+        assert "cannot be connected again" in reply["message"]
+        assert not parent.children and len(connections) == 1
+
+        await manager.stop()
+        adapter.close()
+
+    asyncio.run(run())
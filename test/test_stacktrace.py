@@ -0,0 +1,112 @@
+from conftest import frame, messages_of, respond
+
+from dap import Client
+
+
+def stack_adapter(client: Client, depth: int) -> list[dict]:
+    """Answer every stackTrace request queued on the client until none are left."""
+
+    requests = []
+    while sent := messages_of(client.send()):
+        for request in sent:
+            if request["command"] != "stackTrace":
+                continue
+            requests.append(request)
+            start = request["arguments"].get("startFrame", 0)
+            levels = request["arguments"].get("levels") or depth
+            frames = [
+                {"id": i, "name": f"f{i}", "line": 1, "column": 1}
+                for i in range(start, min(start + levels, depth))
+            ]
+            respond(client, request, {"stackFrames": frames, "totalFrames": depth})
+    return requests
+
+
+def test_fetch_stack_trace_pages_with_delayed_loading():
+    client = Client("test")
+    respond(
+        client,
+        messages_of(client.send())[0],
+        {"supportsDelayedStackTraceLoading": True},
+    )
+
+    slices = []
+    fetcher = client.fetch_stack_trace(
+        1, on_frames=lambda frames, start: slices.append((start, len(frames)))
+    )
+    requests = stack_adapter(client, 1000)
+
+    assert fetcher.done
+    assert requests[0]["arguments"]["levels"] == 20
+    assert slices[0] == (0, 20)
+    assert len(requests) > 1
+    assert [frame.id for frame in fetcher.frames] == list(range(1000))
+    assert fetcher.total_frames == 1000
+
+
+def test_fetch_stack_trace_without_delayed_loading():
+    client = Client("test")
+    respond(client, messages_of(client.send())[0], {})
+
+    fetcher = client.fetch_stack_trace(1)
+    requests = stack_adapter(client, 500)
+
+    assert fetcher.done
+    assert len(requests) == 1
+    assert "levels" not in requests[0]["arguments"]
+    assert len(fetcher.frames) == 500
+
+
+def test_fetch_stack_trace_superseded():
+    client = Client("test")
+    respond(
+        client,
+        messages_of(client.send())[0],
+        {"supportsDelayedStackTraceLoading": True},
+    )
+
+    completed = []
+    fetcher = client.fetch_stack_trace(1, on_complete=completed.append)
+    (request,) = messages_of(client.send())
+
+    # the thread resumes before the first page arrives, its response is dropped
+    continued = {
+        "seq": 1,
+        "type": "event",
+        "event": "continued",
+        "body": {"threadId": 1},
+    }
+    list(client.receive(frame(continued)))
+    assert completed == [fetcher]
+    assert fetcher.done and fetcher.cancelled
+    assert fetcher.frames == [] and fetcher.total_frames is None
+
+    respond(client, request, {"stackFrames": [], "totalFrames": 0})
+    assert completed == [fetcher]
+
+
+def test_fetch_stack_trace_cancelled():
+    client = Client("test")
+    respond(
+        client,
+        messages_of(client.send())[0],
+        {"supportsDelayedStackTraceLoading": True, "supportsCancelRequest": True},
+    )
+
+    completed = []
+    fetcher = client.fetch_stack_trace(1, on_complete=completed.append)
+    (request,) = messages_of(client.send())
+
+    fetcher.cancel()
+    assert completed == [fetcher]
+    assert fetcher.done and fetcher.cancelled
+    (cancel,) = messages_of(client.send())
+    assert cancel["command"] == "cancel"
+    assert cancel["arguments"] == {"requestId": request["seq"]}
+
+    # the page still arrives, but nothing more is requested
+    frames = [{"id": i, "name": "f", "line": 1, "column": 1} for i in range(20)]
+    respond(client, request, {"stackFrames": frames, "totalFrames": 100})
+    assert completed == [fetcher]
+    assert fetcher.frames == []
+    assert client.send() == b""
@@ -0,0 +1,87 @@
+import asyncio
+import sys
+import threading
+
+from dap import AsyncServer, AsyncStdioConnection, StdioConnection, ThreadedServer
+from dap.responses import ThreadsResponse
+from dap.stdio import StderrRing
+
+# answers every request on stdin with a successful response on stdout
+ADAPTER = r"""
+import json, sys
+sys.stderr.write("adapter started\n")
+sys.stderr.flush()
+stdin, stdout = sys.stdin.buffer, sys.stdout.buffer
+seq = 1
+while headers := stdin.readline():
+    length = int(headers.split(b":")[1])
+    stdin.readline()
+    request = json.loads(stdin.read(length))
+    body = {"threads": [{"id": 1, "name": "main"}]} if request["command"] == "threads" else {}
+    content = json.dumps({"seq": seq, "type": "response", "request_seq": request["seq"],
+        "success": True, "command": request["command"], "body": body}).encode()
+    stdout.write(b"Content-Length: %d\r\n\r\n" % len(content) + content)
+    stdout.flush()
+    seq += 1
+"""
+
+
+class RecordingServer(ThreadedServer):
+    def __init__(self, *args, **kwargs):
+        self.messages = []
+        self.received = threading.Event()
+        super().__init__(*args, **kwargs)
+
+    def handle_message(self, message):
+        self.messages.append(message)
+        if isinstance(message, ThreadsResponse):
+            self.received.set()
+
+
+def test_threaded_stdio_connection():
+    connection = StdioConnection([sys.executable, "-c", ADAPTER])
+    server = RecordingServer("test", connection=connection)
+    server.start()
+
+    server.client.threads()
+    assert server.received.wait(5)
+
+    server.stop()
+    assert "adapter started" in str(connection.stderr)
+    assert connection.returncode is not None
+
+
+def test_async_stdio_connection():
+    async def main():
+        received = asyncio.get_running_loop().create_future()
+
+        class Server(AsyncServer):
+            def handle_message(self, message):
+                if isinstance(message, ThreadsResponse):
+                    received.set_result(message)
+
+        connection = AsyncStdioConnection([sys.executable, "-c", ADAPTER])
+        server = Server("test", connection=connection)
+        task = asyncio.create_task(server.start())
+
+        server.client.threads()
+        threads = await asyncio.wait_for(received, 5)
+        assert threads.threads[0].name == "main"
+
+        await server.stop()
+        await task
+        assert "adapter started" in str(connection.stderr)
+
+    asyncio.run(main())
+
+
+def test_stderr_ring_bounds_lines():
+    ring = StderrRing(max_lines=2, max_line_length=8)
+    for _ in range(1000):
+        ring.feed(b"\r progress 50%")
+    assert len(ring._partial) == 8
+
+    ring.feed(b"\nfirst\nsecond\nthird\n")
+    assert list(ring.lines) == ["second", "third"]
+    ring.feed(b"0123456789\n")
+    assert list(ring.lines) == ["third", "23456789"]
@@ -0,0 +1,84 @@
+import os
+import sys
+import tempfile
+
+import pytest
+from conftest import frame, messages_of
+
+from dap import Client, TerminalExecutor
+from dap.requests import RunInTerminalRequest
+
+
+def run_in_terminal(seq, args, **arguments):
+    return frame(
+        {
+            "seq": seq,
+            "type": "request",
+            "command": "runInTerminal",
+            "arguments": {"cwd": tempfile.gettempdir(), "args": args, **arguments},
+        }
+    )
+
+
+def test_run_in_terminal():
+    terminal = TerminalExecutor()
+    client = Client("test", terminal=terminal)
+    client.send()
+
+    out = os.path.join(tempfile.mkdtemp(), "out")
+    script = f"import os; open({out!r}, 'w').write(os.environ['DAP_TEST'])"
+    (request,) = client.receive(
+        run_in_terminal(7, [sys.executable, "-c", script], env={"DAP_TEST": "ok"})
+    )
+    assert isinstance(request, RunInTerminalRequest)
+
+    terminal.shutdown()
+    (response,) = messages_of(client.send())
+    assert response["type"] == "response"
+    assert response["request_seq"] == 7
+    assert response["command"] == "runInTerminal"
+    assert response["success"]
+    assert response["seq"] == 2
+    assert response["body"]["processId"] == terminal.processes[0].pid
+
+    terminal.processes[0].wait(5)
+    assert open(out).read() == "ok"
+
+
+def test_run_in_terminal_failure():
+    terminal = TerminalExecutor()
+    client = Client("test", terminal=terminal)
+    client.send()
+
+    list(client.receive(run_in_terminal(3, ["/nonexistent/command"])))
+    terminal.shutdown()
+
+    (response,) = messages_of(client.send())
+    assert response["request_seq"] == 3
+    assert not response["success"]
+    assert "message" in response
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="uses POSIX shell syntax")
+def test_run_in_terminal_shell_interprets_arguments():
+    terminal = TerminalExecutor()
+    client = Client("test", terminal=terminal)
+    client.send()
+
+    out = os.path.join(tempfile.mkdtemp(), "out")
+    script = "import sys; print(sys.argv[1:])"
+    args = [sys.executable, "-c", f'"{script}"', "$DAP_TEST", ">", out]
+    list(
+        client.receive(
+            run_in_terminal(
+                4, args, env={"DAP_TEST": "ok"}, argsCanBeInterpretedByShell=True
+            )
+        )
+    )
+    terminal.shutdown()
+
+    (response,) = messages_of(client.send())
+    assert response["body"]["shellProcessId"] == terminal.processes[0].pid
+    terminal.processes[0].wait(5)
+    # the variable was expanded and the output redirected by the shell
+    assert open(out).read() == repr(["ok"]) + "\n"
@@ -0,0 +1,69 @@
+import json
+import os
+import tempfile
+import time
+from collections import Counter
+
+from dap import Client, FakeAdapter, Tracer
+from dap.base import DAPMessage
+
+
+def test_request_spans():
+    tracer = Tracer()
+    client = Client("fake", tracer=tracer)
+    adapter = FakeAdapter()
+
+    seq = client.threads()
+    adapter.feed(client.send())
+    adapter.stop()
+    for _ in client.receive(adapter.send()):
+        time.sleep(0.001)
+
+    # sent in the stop, answered after the debuggee resumed
+    client.stack_trace(1)
+    stack_trace = client.send()
+    client.continue_(1)
+    adapter.feed(client.send())
+    adapter.feed(stack_trace)
+    for _ in client.receive(adapter.send()):
+        pass
+    resumed = client.threads()
+    adapter.feed(client.send())
+    for _ in client.receive(adapter.send()):
+        pass
+
+    spans = {(span.kind, span.name, span.seq): span for span in tracer.spans}
+    threads = spans[DAPMessage.RESPONSE, "threads", seq]
+    assert threads.seq == seq
+    assert threads.stop_epoch == 0
+    assert (
+        threads.queued
+        <= threads.written
+        <= threads.framed
+        <= threads.decoded
+        <= threads.validated
+        < threads.delivered
+    )
+    assert threads.delivered - threads.validated >= 1_000_000
+
+    assert spans[DAPMessage.EVENT, "stopped", None].queued is None
+    # the superseded stack trace is dropped without a span
+    assert "stackTrace" not in {span.name for span in tracer.spans}
+    assert spans[DAPMessage.RESPONSE, "threads", resumed].stop_epoch == 1
+
+    path = os.path.join(tempfile.mkdtemp(), "trace.json")
+    tracer.write(path)
+    with open(path) as f:
+        events = json.load(f)["traceEvents"]
+
+    balance = Counter()
+    for event in events:
+        if event["ph"] in "be":
+            balance[event["id"]] += 1 if event["ph"] == "b" else -1
+    assert balance[seq] == 0 and not any(balance.values())
+    assert {"queued", "adapter", "client", f"threads #{seq}"} <= {
+        event["name"] for event in events if event.get("id") == seq
+    }
+    assert {"decode", "validate", "deliver"} <= {
+        event["name"] for event in events if event["ph"] == "X"
+    }
@@ -0,0 +1,363 @@
+import asyncio
+import os
+import socket
+import tempfile
+import threading
+import time
+
+import pytest
+from conftest import answer
+
+from dap import (
+    AsyncConnection,
+    AsyncFdConnection,
+    AsyncLoopbackConnection,
+    AsyncServer,
+    AsyncUnixConnection,
+    Connection,
+    FakeAdapter,
+    FdConnection,
+    LoopbackConnection,
+    ThreadedServer,
+    UnixConnection,
+)
+from dap.responses import ThreadsResponse
+
+
+def unix_adapter():
+    path = os.path.join(tempfile.mkdtemp(), "adapter.sock")
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(path)
+    listener.listen()
+
+    def accept():
+        with listener:
+            sock, _ = listener.accept()
+        answer(sock)
+
+    threading.Thread(target=accept, daemon=True).start()
+    return path
+
+
+def socketpair_adapter():
+    ours, theirs = socket.socketpair()
+    threading.Thread(target=answer, args=(theirs,), daemon=True).start()
+    return ours
+
+
+class RecordingServer(ThreadedServer):
+    def __init__(self, *args, **kwargs):
+        self.received = threading.Event()
+        super().__init__(*args, **kwargs)
+
+    def handle_message(self, message):
+        if isinstance(message, ThreadsResponse):
+            self.received.set()
+
+
+class AsyncRecordingServer(AsyncServer):
+    def __init__(self, *args, **kwargs):
+        self.received = asyncio.Event()
+        self.messages = []
+        super().__init__(*args, **kwargs)
+
+    def handle_message(self, message):
+        self.messages.append(message)
+        if isinstance(message, ThreadsResponse):
+            self.received.set()
+
+
+def test_threaded_transports():
+    for connection in (
+        UnixConnection(unix_adapter()),
+        FdConnection(socketpair_adapter().detach()),
+    ):
+        server = RecordingServer("test", connection=connection)
+        server.start()
+
+        server.client.threads()
+        assert server.received.wait(5)
+
+        server.stop()
+
+
+def test_async_transports():
+    async def run(connection):
+        server = AsyncRecordingServer("test", connection=connection)
+        task = asyncio.create_task(server.start())
+
+        server.client.threads()
+        await asyncio.wait_for(server.received.wait(), 5)
+
+        await server.stop()
+        task.cancel()
+
+    asyncio.run(run(AsyncUnixConnection(unix_adapter())))
+    asyncio.run(run(AsyncFdConnection(socketpair_adapter())))
+
+
+def test_tcp_nodelay():
+    listener = socket.create_server(("127.0.0.1", 0))
+    connection = Connection("127.0.0.1", listener.getsockname()[1])
+    connection.start()
+
+    assert connection.sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY)
+
+    connection.stop()
+    listener.close()
+
+
+def test_cork_coalesces_writes():
+    server = RecordingServer("test", connection=FdConnection(socketpair_adapter()))
+    server.start()
+    server.client.threads()
+    assert server.received.wait(5)
+    writes = server.connection.writes
+
+    done = threading.Event()
+    server.client.cork()
+    for _ in range(50):
+        server.client.threads()
+    server.client.send_request("threads", callback=lambda _: done.set())
+    assert not done.wait(0.1)
+    assert server.connection.writes == writes
+
+    server.client.flush()
+    assert done.wait(5)
+    assert server.connection.writes == writes + 1
+    assert server.client.frames_sent == 53
+
+    server.stop()
+
+
+def listen_later(delay, family=socket.AF_INET):
+    # the address the adapter will listen on after `delay` seconds
+    if family == socket.AF_UNIX:
+        address = os.path.join(tempfile.mkdtemp(), "adapter.sock")
+    else:
+        with socket.create_server(("127.0.0.1", 0)) as probe:
+            address = probe.getsockname()
+
+    def listen():
+        listener = socket.socket(family, socket.SOCK_STREAM)
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listener.bind(address)
+        listener.listen()
+        with listener:
+            sock, _ = listener.accept()
+        answer(sock)
+
+    threading.Timer(delay, listen).start()
+    return address
+
+
+def test_connect_retries_until_listening():
+    host, port = listen_later(0.2)
+    server = RecordingServer(
+        "test", connection=Connection(host, port, connect_timeout=5)
+    )
+    assert 0.15 < server.connection.connect_time < 1
+    assert server.connection.connect_attempts > 1
+
+    server.start()
+    server.client.threads()
+    assert server.received.wait(5)
+    server.stop()
+
+
+def test_async_connect_retries_until_listening():
+    async def run():
+        connection = AsyncUnixConnection(
+            listen_later(0.2, socket.AF_UNIX), connect_timeout=5
+        )
+        server = AsyncRecordingServer("test", connection=connection)
+        task = asyncio.create_task(server.start())
+
+        server.client.threads()
+        await asyncio.wait_for(server.received.wait(), 5)
+        assert 0.15 < connection.connect_time < 1
+
+        await server.stop()
+        task.cancel()
+
+    asyncio.run(run())
+
+
+def test_connect_gives_up_at_deadline():
+    with socket.create_server(("127.0.0.1", 0)) as probe:
+        host, port = probe.getsockname()
+
+    connection = Connection(host, port, connect_timeout=0.1)
+    start = time.perf_counter()
+    with pytest.raises(ConnectionRefusedError):
+        connection.start()
+    assert 0.05 < time.perf_counter() - start < 0.5
+
+    async def run():
+        with pytest.raises(ConnectionRefusedError):
+            await AsyncConnection(host, port).start()
+
+    asyncio.run(run())
+
+
+def test_connect_attempt_bounded_by_deadline():
+    # a listener whose backlog is full never answers the handshake, like a
+    # firewalled host
+    with socket.create_server(("127.0.0.1", 0), backlog=0) as listener:
+        held = socket.create_connection(listener.getsockname())
+        filler = socket.socket()
+        filler.settimeout(0.05)
+        try:
+            filler.connect(listener.getsockname())
+        except OSError:
+            pass
+
+        connection = Connection(*listener.getsockname(), connect_timeout=0.2)
+        start = time.perf_counter()
+        with pytest.raises(OSError):
+            connection.start()
+        assert time.perf_counter() - start < 0.5
+        held.close()
+        filler.close()
+
+
+def open_fds():
+    return len(os.listdir("/proc/self/fd"))
+
+
+def test_blocked_read_wakes_up():
+    ours, theirs = socket.socketpair()
+    connection = FdConnection(ours)
+    connection.start()
+
+    # woken up without data
+    threading.Timer(0.05, connection.wakeup).start()
+    assert connection.read() == b""
+
+    # woken up by data
+    threading.Timer(0.05, theirs.sendall, args=(b"hello",)).start()
+    assert connection.read() == b"hello"
+
+    connection.stop()
+    theirs.close()
+
+
+def test_stop_unblocks_reader():
+    ours, theirs = socket.socketpair()
+    connection = FdConnection(ours)
+    connection.start()
+
+    results = []
+    reader = threading.Thread(target=lambda: results.append(connection.read()))
+    reader.start()
+    time.sleep(0.05)
+
+    start = time.perf_counter()
+    connection.stop()
+    reader.join(1)
+    assert time.perf_counter() - start < 0.5
+    assert not reader.is_alive()
+    assert results == [None]
+    theirs.close()
+
+
+def test_stop_twice():
+    connection = LoopbackConnection(FakeAdapter())
+    connection.start()
+    connection.stop()
+    # e.g. the server stopping after the adapter disconnected
+    connection.stop()
+    assert not connection.alive
+
+
+class DeadConnection(LoopbackConnection):
+    def write(self, data):
+        raise ConnectionResetError("adapter gone")
+
+
+def test_server_stop_with_dead_adapter():
+    server = ThreadedServer("test", connection=DeadConnection(FakeAdapter()))
+    with pytest.raises(ConnectionResetError):
+        server.stop()
+    assert not server.running
+    assert not server.connection.alive
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc/self/fd"), reason="needs /proc")
+def test_stop_closes_all_fds():
+    before = open_fds()
+    for _ in range(5):
+        server = RecordingServer("test", connection=FdConnection(socketpair_adapter()))
+        server.start()
+        server.client.threads()
+        assert server.received.wait(5)
+        server.stop()
+    # the adapter threads close their ends once the connection is closed
+    for _ in range(100):
+        if open_fds() <= before:
+            break
+        time.sleep(0.01)
+    assert open_fds() == before
+
+    with socket.create_server(("127.0.0.1", 0)) as probe:
+        host, port = probe.getsockname()
+    before = open_fds()
+    with pytest.raises(ConnectionRefusedError):
+        Connection(host, port).start()
+    assert open_fds() == before
+
+
+def test_reader_and_writer_tasks():
+    async def run():
+        adapter = FakeAdapter()
+        server = AsyncRecordingServer(
+            "fake", connection=AsyncLoopbackConnection(adapter, read_size=256)
+        )
+        task = asyncio.create_task(server.start())
+
+        # requests queued on other threads wake the writer
+        done = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        callback = lambda _: loop.call_soon_threadsafe(done.set)
+        thread = threading.Thread(
+            target=lambda: [
+                server.client.threads(),
+                server.client.send_request("threads", callback=callback),
+            ]
+        )
+        thread.start()
+        await asyncio.wait_for(done.wait(), 5)
+        thread.join()
+
+        assert adapter.received["threads"] == 2
+        responses = [m for m in server.messages if isinstance(m, ThreadsResponse)]
+        assert len(responses) == 2
+        assert server.client.frames_sent == 3
+
+        # stop writes the terminate request and ends the loop
+        await server.stop()
+        await asyncio.wait_for(task, 5)
+        assert adapter.received["terminate"] == 1
+        assert not server.connection.alive
+
+    asyncio.run(run())
+
+
+def test_run_single():
+    async def run():
+        adapter = FakeAdapter()
+        server = AsyncRecordingServer(
+            "fake", connection=AsyncLoopbackConnection(adapter)
+        )
+
+        server.client.threads()
+        while not any(isinstance(m, ThreadsResponse) for m in server.messages):
+            assert await asyncio.wait_for(server.run_single(), 5)
+        assert adapter.received["initialize"] == adapter.received["threads"] == 1
+
+        server.client.disconnect()
+        while await asyncio.wait_for(server.run_single(), 5):
+            ...
+        assert adapter.received["disconnect"] == 1
+
+    asyncio.run(run())